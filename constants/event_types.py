@@ -40,4 +40,14 @@ event_track_custom = "Event_Custom_Log"
 event_track_custom_cf = "Event_Custom_Log_CF"
 event_track_log_intent_result ="Log_Custom_IntentResult_ListForm"
 event_track_log_form_details ="Log_form_details"
-event_track_log_redis_cache ="Log_redis_cache"
\ No newline at end of file
+event_track_log_redis_cache ="Log_redis_cache"
+semantic_cache_hit = "SemanticCacheHit"
+rag_orchestrator_stage_timings = "RagOrchestratorStageTimings"
+speculative_search_result = "SpeculativeSearchResult"
+cqa_cache_hit = "CQACacheHit"
+rag_batch_query_requested_event = "RagBatchQueryRequested"
+rag_batch_query_performed_event = "RagBatchQueryPerformed"
+context_packing = "ContextPacking"
+local_rerank = "LocalRerank"
+local_rerank_skipped = "LocalRerankSkipped"
+runtime_metrics = "RuntimeMetrics"
@@ -1,3 +1,4 @@
 SEARCH_METHOD_HYBRID = "HYBRID"
 SEARCH_METHOD_VECTOR = "VECTOR"
-SEARCH_METHOD_FULL_TEXT = "FULL-TEXT"
\ No newline at end of file
+SEARCH_METHOD_FULL_TEXT = "FULL-TEXT"
+SEARCH_TOKEN_SCOPE = "https://search.azure.com/.default"
@@ -0,0 +1,90 @@
+"""
+Profilo del tempo di import all'avvio del worker.
+
+Importa il modulo indicato (di default function_app) in un processo separato con
+`python -X importtime` e riporta il costo cumulativo per pacchetto di primo livello
+e i moduli più lenti, più la durata complessiva dell'import.
+
+Uso (dalla root del progetto):
+    python devops/profile_imports.py
+    python devops/profile_imports.py --module rag_orchestrator --top 30
+    python devops/profile_imports.py --json > import_profile.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """
+    Restituisce (modulo, self_us, cumulative_us) per ogni riga dell'output di -X importtime.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def build_report(rows: list[tuple[str, int, int]], top: int) -> dict:
+    packages: dict[str, int] = defaultdict(int)
+    for name, self_us, _ in rows:
+        packages[name.split(".")[0]] += self_us
+    slowest = sorted(rows, key=lambda r: r[1], reverse=True)[:top]
+    return {
+        "total_ms": round(sum(r[1] for r in rows) / 1000, 1),
+        "modules": len(rows),
+        "packages_ms": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(packages.items(), key=lambda p: p[1], reverse=True)[:top]
+        },
+        "slowest_modules_ms": [
+            {"module": name, "self_ms": round(self_us / 1000, 1), "cumulative_ms": round(cumulative_us / 1000, 1)}
+            for name, self_us, cumulative_us in slowest
+        ],
+    }
+
+
+def profile(module: str) -> list[tuple[str, int, int]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Import of '{module}' failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="function_app", help="modulo da importare (default: function_app)")
+    parser.add_argument("--top", type=int, default=20, help="numero di pacchetti/moduli da riportare")
+    parser.add_argument("--json", action="store_true", help="stampa il report in JSON")
+    args = parser.parse_args()
+
+    report = build_report(profile(args.module), args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"import {args.module}: {report['total_ms']} ms, {report['modules']} modules")
+    print("\nPer package (self time, ms):")
+    for name, ms in report["packages_ms"].items():
+        print(f"  {ms:>9.1f}  {name}")
+    print("\nSlowest modules (self / cumulative, ms):")
+    for row in report["slowest_modules_ms"]:
+        print(f"  {row['self_ms']:>9.1f} {row['cumulative_ms']:>9.1f}  {row['module']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Esecuzione locale di un batch di domande (valutazione offline, risposte massive).
+
+Legge un file JSONL con una RagOrchestratorRequest per riga e scrive un risultato JSONL per richiesta
+man mano che sono pronti, con la stessa logica dell'endpoint query/batch.
+Usa le impostazioni dell'ambiente (local.settings / variabili d'ambiente) e la chiave di default
+di OpenAI, come una chiamata senza header caller-service.
+
+Uso (dalla root del progetto):
+    python devops/run_batch_queries.py questions.jsonl
+    python devops/run_batch_queries.py questions.jsonl --output answers.jsonl --concurrency 4
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import uuid
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from logics.rag_batch import a_run_batch, parse_batch_lines  # noqa: E402
+from models.configurations.llm_consumer import LLMConsumer  # noqa: E402
+from services.http_session import get_http_session, get_http_session_manager  # noqa: E402
+from services.logging import Logger  # noqa: E402
+from utils.settings import get_batch_query_settings, get_openai_settings  # noqa: E402
+
+
+async def a_main(args: argparse.Namespace) -> int:
+    with open(args.input, encoding="utf-8") as input_file:
+        items = parse_batch_lines(input_file)
+
+    settings = get_batch_query_settings()
+    if args.concurrency:
+        settings = settings.model_copy(update={"max_concurrency": args.concurrency})
+    run_id = str(uuid.uuid4())
+    logger = Logger("run_batch_queries", run_id, run_id.replace("-", ""))
+    consumer = LLMConsumer("default", get_openai_settings().completion_key)
+
+    async def a_get_consumer(request) -> LLMConsumer:
+        return consumer
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    failed = 0
+    try:
+        async for item_result in a_run_batch(items, logger, get_http_session(), a_get_consumer, settings):
+            failed += item_result.status != 200
+            output.write(item_result.to_json_line())
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        await get_http_session_manager().a_close()
+
+    print(f"{len(items)} requests, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run a JSONL batch of RAG queries")
+    parser.add_argument("input", help="JSONL file, one RagOrchestratorRequest per line")
+    parser.add_argument("--output", help="JSONL output file (default: stdout)")
+    parser.add_argument("--concurrency", type=int, help="override BATCH_QUERY_MAX_CONCURRENCY")
+    return asyncio.run(a_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,9 +9,19 @@ import rag_orchestrator
 import metadata_tagging
 import rag_query
 import rag_augment_query
+import rag_batch
 import move_files
 import chunking_empty_rows
 import convert_docx_to_md
+import warmup
+
+# Gli endpoint in streaming richiedono l'estensione HTTP streams (azurefunctions-extensions-http-fastapi)
+try:
+    import rag_stream
+except ModuleNotFoundError as e:
+    if not (e.name or "").startswith("azurefunctions"):
+        raise
+    rag_stream = None
 
 # Configura Azure Monitor solo se la connection string è disponibile (ambiente Azure)
 APPLICATIONINSIGHTS_CONNECTION_STRING = os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING")
@@ -38,7 +48,13 @@ app.register_functions(move_files.bp)
 app.register_functions(rag_augment_query.bp)
 app.register_functions(rag_orchestrator.bp)
 app.register_functions(rag_query.bp)
+app.register_functions(rag_batch.bp)
 app.register_functions(metadata_tagging.bp)
 app.register_functions(chunking_empty_rows.bp)
 app.register_functions(convert_docx_to_md.bp)
 app.register_functions(health_check.bp)
+app.register_functions(warmup.bp)
+if rag_stream:
+    app.register_functions(rag_stream.bp)
+else:
+    logging.info("HTTP streams extension not installed. Streaming endpoints disabled.")
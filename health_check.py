@@ -1,5 +1,8 @@
 import json
 import azure.functions as func
+from logics.runtime_metrics import collect_runtime_metrics
+from logics.warmup import get_warmup_state, start_warm_up
+from utils.settings import get_warmup_settings
 
 bp = func.Blueprint()
 
@@ -11,3 +14,33 @@ async def health_check(req: func.HttpRequest, context: func.Context) -> func.Htt
         status_code=200,
         mimetype="application/json"
     )
+
+
+@bp.route(route="health/ready", auth_level=func.AuthLevel.ANONYMOUS, methods=['GET'])
+async def readiness_check(req: func.HttpRequest, context: func.Context) -> func.HttpResponse:
+    """
+    Readiness: 200 solo a warm-up completato, altrimenti 503.
+    Se il warm-up non è ancora partito (nessun warm-up trigger sul piano), viene avviato in background.
+    """
+    state = get_warmup_state()
+    if not get_warmup_settings().enabled:
+        return func.HttpResponse(
+            json.dumps({"status": "ready", "warmup": "disabled"}), status_code=200, mimetype="application/json"
+        )
+    if not state.ready:
+        start_warm_up()
+    return func.HttpResponse(
+        json.dumps(state.to_dict()),
+        status_code=200 if state.ready else 503,
+        mimetype="application/json"
+    )
+
+
+@bp.route(route="health/metrics", auth_level=func.AuthLevel.FUNCTION, methods=['GET'])
+async def runtime_metrics(req: func.HttpRequest, context: func.Context) -> func.HttpResponse:
+    """
+    Metriche in memoria del worker che serve la richiesta (pool, sessioni HTTP, cache, batcher).
+    """
+    return func.HttpResponse(
+        json.dumps(collect_runtime_metrics(), default=str), status_code=200, mimetype="application/json"
+    )
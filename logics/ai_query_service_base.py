@@ -1,8 +1,10 @@
 from abc import ABC, abstractmethod
 from services.logging import Logger
 import os
+from typing import Optional
 
 from aiohttp import ClientSession
+from logics.rag_query import SpeculativeSearch
 from models.apis.enrichment_query_response import EnrichmentQueryResponse
 from models.apis.prompt_editor_response_body import PromptEditorResponseBody
 from models.apis.rag_orchestrator_request import Interaction, RagOrchestratorRequest
@@ -29,6 +31,7 @@ class AiQueryServiceBase(ABC):
         session: ClientSession,
         consumer: LLMConsumer,
         domusData: str = None,
+        speculative_search: Optional[SpeculativeSearch] = None,
     ) -> RagQueryResponse:
         pass
 
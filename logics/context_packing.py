@@ -0,0 +1,129 @@
+import logging
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Optional
+
+from models.services.openai_rag_context_content import RagContextContent
+from utils.lazy_import import lazy_import
+from utils.settings import get_context_packing_settings
+
+tiktoken = lazy_import("tiktoken")
+
+_WORDS = re.compile(r"\w+")
+
+
+# Dopo un caricamento fallito l'encoding viene ritentato al più ogni ENCODING_RETRY_SECONDS
+ENCODING_RETRY_SECONDS = 60.0
+
+_encodings: dict[str, Any] = {}
+_encoding_failures: dict[str, float] = {}
+
+
+def get_encoding(encoding_name: str):
+    """
+    Encoding tiktoken condiviso; None se non è disponibile (es. file BPE non scaricabile),
+    nel qual caso i token vengono stimati dalla lunghezza del testo.
+    Solo gli encoding caricati restano in memoria: un errore transitorio non rende la stima permanente.
+    """
+    encoding = _encodings.get(encoding_name)
+    if encoding is not None:
+        return encoding
+    failed_at = _encoding_failures.get(encoding_name)
+    if failed_at is not None and time.monotonic() - failed_at < ENCODING_RETRY_SECONDS:
+        return None
+    try:
+        encoding = tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        _encoding_failures[encoding_name] = time.monotonic()
+        logging.warning(f"Tiktoken encoding '{encoding_name}' not available, estimating tokens: {e}")
+        return None
+    _encoding_failures.pop(encoding_name, None)
+    _encodings[encoding_name] = encoding
+    return encoding
+
+
+def clear_encodings():
+    _encodings.clear()
+    _encoding_failures.clear()
+    count_encoded_tokens.cache_clear()
+
+
+@lru_cache(maxsize=4096)
+def count_encoded_tokens(encoding_name: str, text: str) -> int:
+    return len(get_encoding(encoding_name).encode(text, disallowed_special=()))
+
+
+def count_tokens(encoding_name: str, text: str) -> int:
+    if get_encoding(encoding_name) is None:
+        return len(text) // 4 + 1
+    return count_encoded_tokens(encoding_name, text)
+
+
+def get_token_budget(deployment: Optional[str]) -> int:
+    settings = get_context_packing_settings()
+    return settings.deployment_token_budgets.get(deployment or "", settings.token_budget)
+
+
+def _shingles(text: str) -> frozenset:
+    words = _WORDS.findall(text.lower())
+    if len(words) < 3:
+        return frozenset(words)
+    return frozenset(zip(words, words[1:], words[2:]))
+
+
+def _similarity(first: frozenset, second: frozenset) -> float:
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+@dataclass
+class PackedContext:
+    context: list[RagContextContent]
+    tokens: int
+    dropped_duplicates: int
+    dropped_over_budget: int
+
+    def to_event(self) -> dict:
+        return {
+            "packed": len(self.context),
+            "tokens": self.tokens,
+            "dropped_duplicates": self.dropped_duplicates,
+            "dropped_over_budget": self.dropped_over_budget,
+        }
+
+
+def pack_context(
+    context: list[RagContextContent],
+    token_budget: int,
+    encoding_name: str = "o200k_base",
+    duplicate_similarity: float = 0.9,
+) -> PackedContext:
+    """
+    Seleziona i chunk da inviare all'LLM: scarta i quasi duplicati di chunk con score più alto
+    e inserisce gli altri in ordine di score finché rientrano nel budget di token.
+    Il chunk migliore viene sempre incluso, anche se da solo supera il budget.
+    I chunk mantengono il proprio reference, quindi le citazioni restano valide.
+    """
+    packed: list[RagContextContent] = []
+    packed_shingles: list[frozenset] = []
+    tokens = 0
+    dropped_duplicates = 0
+    dropped_over_budget = 0
+
+    for item in sorted(context, key=lambda x: x.score, reverse=True):
+        shingles = _shingles(item.chunk)
+        if any(_similarity(shingles, other) >= duplicate_similarity for other in packed_shingles):
+            dropped_duplicates += 1
+            continue
+        item_tokens = count_tokens(encoding_name, item.chunk)
+        if packed and tokens + item_tokens > token_budget:
+            dropped_over_budget += 1
+            continue
+        packed.append(item)
+        packed_shingles.append(shingles)
+        tokens += item_tokens
+
+    return PackedContext(packed, tokens, dropped_duplicates, dropped_over_budget)
@@ -11,8 +11,11 @@ from services.storage import get_blob_info_container_and_blobName, a_get_blob_st
 from models.apis.convert_docx_to_md_request_body import ConvertDocxToMdRequestBody
 from models.apis.convert_docx_to_md_response_body import ConvertDocxToMdResponseBody, DataToAzAISearch
 from services.storage import generate_blob_sas_from_blob_client, get_blob_client_from_blob_storage_path, a_get_blob_content_from_container
-import mammoth
-from bs4 import BeautifulSoup
+from utils.lazy_import import lazy_import
+
+mammoth = lazy_import("mammoth")
+bs4 = lazy_import("bs4")
+
 
 async def a_extract_hyperlink_from_files(req_body: ConvertDocxToMdRequestBody,
                                context: func.Context) -> ConvertDocxToMdResponseBody:
@@ -73,7 +76,7 @@ def extract_text_and_hyperlink_from_html(stream: bytes) -> str:
 
 
 def get_hyperlink_into_md(htmlText: Any):
-    soup = BeautifulSoup(htmlText, 'html.parser')
+    soup = bs4.BeautifulSoup(htmlText, 'html.parser')
     hyperLinks = soup.find_all('a', href=True)
     for link in hyperLinks:
         text = link.text
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional, Union
+
+from aiohttp import ClientSession
+from pydantic import ValidationError
+
+from exceptions.custom_exceptions import CustomPromptParameterError
+from logics.rag_query import a_execute_query, elapsed_ms
+from models.apis.rag_orchestrator_request import RagOrchestratorRequest
+from models.apis.rag_query_response_body import RagQueryResponse
+from models.configurations.batch_query import BatchQuerySettings
+from models.configurations.llm_consumer import LLMConsumer
+from services.logging import Logger
+from services.openai import a_generate_embeddings_from_texts
+from services.prompt_editor import a_get_completion_prompt_data
+from utils.http_problem import Problem
+from utils.rate_limiter import AsyncRateLimiter
+from utils.settings import get_batch_query_settings
+
+
+@dataclass
+class BatchItemResult:
+    index: int
+    status: int
+    result: Optional[RagQueryResponse] = None
+    problem: Optional[dict] = None
+    timings_ms: dict = field(default_factory=dict)
+
+    def to_json_line(self) -> str:
+        # Stessa serializzazione della risposta di /query
+        return json.dumps(self, ensure_ascii=False, default=lambda x: x.__dict__) + "\n"
+
+
+def parse_batch_lines(lines: Iterable[str]) -> list[Union[RagOrchestratorRequest, Problem]]:
+    """
+    Una RagOrchestratorRequest per ogni riga JSON non vuota; le righe non valide diventano un Problem.
+    """
+    items: list[Union[RagOrchestratorRequest, Problem]] = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            items.append(RagOrchestratorRequest.model_validate_json(line))
+        except ValidationError as e:
+            items.append(Problem(422, "Bad Request", json.loads(e.json()), None, None))
+    return items
+
+
+def build_item_problem(e: Exception) -> Problem:
+    if isinstance(e, CustomPromptParameterError):
+        return Problem(e.error_code, "Error prompt", e.args[0], None, None)
+    if isinstance(e, ValueError):
+        return Problem(422, "Bad Request", str(e), None, None)
+    return Problem(500, "Internal server error", str(e), None, None)
+
+
+_consumer_rate_limiters: dict[str, AsyncRateLimiter] = {}
+
+
+def get_consumer_rate_limiter(consumer_name: str) -> AsyncRateLimiter:
+    """
+    Limite condiviso da tutti i batch dello stesso consumer (caller-service) nel processo.
+    """
+    limiter = _consumer_rate_limiters.get(consumer_name)
+    if limiter is None:
+        limiter = _consumer_rate_limiters[consumer_name] = AsyncRateLimiter(
+            get_batch_query_settings().requests_per_second
+        )
+    return limiter
+
+
+def get_consumer_rate_limiter_metrics() -> dict[str, dict]:
+    return {name: limiter.get_metrics() for name, limiter in _consumer_rate_limiters.items()}
+
+
+class _Once:
+    """
+    Esegue una sola volta per chiave la coroutine richiesta e ne condivide il risultato.
+    """
+
+    def __init__(self):
+        self._tasks: dict = {}
+
+    def a_get(self, key, a_load: Callable[[], Awaitable]) -> "asyncio.Future":
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.ensure_future(a_load())
+        return self._tasks[key]
+
+
+async def a_run_batch(
+    items: list[Union[RagOrchestratorRequest, Problem]],
+    logger: Logger,
+    session: ClientSession,
+    a_get_consumer: Callable[[RagOrchestratorRequest], Awaitable[LLMConsumer]],
+    settings: Optional[BatchQuerySettings] = None,
+) -> AsyncIterator[BatchItemResult]:
+    """
+    Esegue le richieste con la stessa logica di /query (a_execute_query) e restituisce
+    i risultati man mano che sono pronti, con l'indice della richiesta e le durate per fase.
+
+    Gli embedding delle domande vengono calcolati a gruppi di embedding_batch_size richieste
+    dello stesso deployment, consumer e prompt vengono risolti una sola volta per batch;
+    al massimo max_concurrency richieste sono in corso e ogni consumer rispetta il suo limite di richieste al secondo.
+    """
+    settings = settings or get_batch_query_settings()
+    semaphore = asyncio.Semaphore(settings.max_concurrency)
+    consumers = _Once()
+    prompts = _Once()
+    embeddings = _Once()
+
+    # Gruppi per il calcolo degli embedding: richieste dello stesso deployment, in ordine di arrivo
+    embedding_groups: dict[str, list[int]] = {}
+    embedding_chunk_of: dict[int, tuple[str, int]] = {}
+    for index, item in enumerate(items):
+        if isinstance(item, RagOrchestratorRequest):
+            group = embedding_groups.setdefault(item.model_name, [])
+            embedding_chunk_of[index] = (item.model_name, len(group) // settings.embedding_batch_size)
+            group.append(index)
+
+    async def a_embed_chunk(chunk: tuple[str, int], consumer: LLMConsumer) -> dict[int, list[float]]:
+        model_name, chunk_number = chunk
+        start = chunk_number * settings.embedding_batch_size
+        indexes = embedding_groups[model_name][start:start + settings.embedding_batch_size]
+        vectors = await a_generate_embeddings_from_texts(
+            [items[i].query for i in indexes],
+            deployment_model=consumer.deployment_model,
+            api_version=consumer.api_version,
+            secret=consumer.completion_key,
+            logger=logger,
+        )
+        return dict(zip(indexes, vectors))
+
+    async def a_run_item(index: int, request: RagOrchestratorRequest) -> BatchItemResult:
+        timings: dict = {}
+        started = time.perf_counter()
+        try:
+            async with semaphore:
+                timings["queued_ms"] = elapsed_ms(started)
+                consumer = await consumers.a_get(request.model_name, lambda: a_get_consumer(request))
+                await get_consumer_rate_limiter(consumer.name).a_acquire()
+
+                prompts_key = json.dumps([p.model_dump() for p in request.prompts], sort_keys=True)
+                prompt_data = await prompts.a_get(
+                    prompts_key, lambda: a_get_completion_prompt_data(request.prompts, logger, session)
+                )
+                if request.llm_model_id != prompt_data.llm_model:
+                    raise ValueError("The request llm model id is different from prompt editor llm model.")
+
+                embedding_started = time.perf_counter()
+                chunk = embedding_chunk_of[index]
+                chunk_vectors = await embeddings.a_get(chunk, lambda: a_embed_chunk(chunk, consumer))
+                timings["embedding_ms"] = elapsed_ms(embedding_started)
+
+                result = await a_execute_query(
+                    request, prompt_data, logger, session, consumer, embedding=chunk_vectors[index], timings=timings
+                )
+            timings["total_ms"] = elapsed_ms(started)
+            return BatchItemResult(index, 200, result, None, timings)
+        except Exception as e:
+            logger.warning(f"Batch item {index} failed: {e}")
+            timings["total_ms"] = elapsed_ms(started)
+            problem = build_item_problem(e)
+            return BatchItemResult(index, problem.status, None, problem.to_dict(), timings)
+
+    tasks = [
+        asyncio.create_task(a_run_item(index, item))
+        for index, item in enumerate(items)
+        if isinstance(item, RagOrchestratorRequest)
+    ]
+    try:
+        for index, item in enumerate(items):
+            if isinstance(item, Problem):
+                yield BatchItemResult(index, item.status, None, item.to_dict())
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        for task in tasks:
+            task.cancel()
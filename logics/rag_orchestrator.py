@@ -1,9 +1,11 @@
 from dataclasses import asdict
 import json
+from typing import Optional
 from aiohttp import ClientResponseError, ClientSession
 from constants import clog, event_types, monitor_form_app
 from constants import llm as llm_const
 from logics.ai_query_service_factory import AiQueryServiceFactory
+from logics.rag_query import SpeculativeSearch, a_search
 from models.apis.domus_form_application_details_request import DomusFormApplicationDetailsRequest
 from models.apis.domus_form_application_details_response import DomusFormApplicationDetailsResponse
 from models.apis.domus_form_applications_by_fiscal_code_response import DomusFormApplicationsByFiscalCodeResponse
@@ -21,6 +23,7 @@ from models.configurations.prompt import PromptSettings
 from models.configurations.storage import BlobStorageSettings
 from models.services.mssql_tag import EnumMonitorFormApplication, MsSqlTag
 from services.cqa import a_do_query as cqa_do_query
+from services.embedding_cache import normalize_query
 from services.logging import Logger
 from services.prompt_editor import a_get_prompts_data, a_get_form_application_name_by_tag
 from services import openai
@@ -28,12 +31,27 @@ from services.mssql import a_get_prompt_info, a_check_status_tag_for_mst, a_get_
 from services import domus
 from services import storage
 from utils import string
+from utils.stage_graph import StageGraph
 from services import redis as redisService
+from services.search import get_index_name
+from services.semantic_answer_cache import SemanticCacheScope, get_semantic_answer_cache
+from utils.settings import get_search_settings, get_semantic_cache_settings, get_speculative_search_settings
 
 
 async def a_get_query_response(
     request: RagOrchestratorRequest, logger: Logger, session: ClientSession, consumer: LLMConsumer
 ) -> RagOrchestratorResponse:
+    stages = StageGraph()
+    try:
+        return await a_run_query_stages(request, logger, session, consumer, stages)
+    finally:
+        await stages.a_close()
+        logger.track_event(event_types.rag_orchestrator_stage_timings, stages.get_timings())
+
+
+async def a_run_query_stages(
+    request: RagOrchestratorRequest, logger: Logger, session: ClientSession, consumer: LLMConsumer, stages: StageGraph
+) -> RagOrchestratorResponse:
 
     # request.query = f"{request.query}. {request.text_by_card}." if request.text_by_card != None and len(request.text_by_card) > 0 else request.query
     request.query = (
@@ -45,7 +63,24 @@ async def a_get_query_response(
 
     tag = request.tags[0]
 
-    tags_info = await a_get_tags_by_tag_names(logger, request.tags)
+    prompt_type_filter = [
+        llm_const.completion,
+        llm_const.enrichment,
+        llm_const.msd_completion,
+        llm_const.msd_intent_recognition,
+    ]
+
+    # Tag e prompt non dipendono l'uno dall'altro: il caricamento dei prompt parte subito
+    # e viene cancellato se la CQA risponde prima che serva
+    stages.add("tags", lambda: a_get_tags_by_tag_names(logger, request.tags))
+    stages.add("prompt_info", lambda: a_get_prompt_info(logger, tag, prompt_type_filter, request.llm_model_id))
+    stages.add(
+        "prompts",
+        lambda list_prompt_version_info: a_get_prompts_data(request.prompts, list_prompt_version_info, logger, session),
+        depends_on=["prompt_info"],
+    )
+
+    tags_info = await stages.a_result("tags")
 
     if not tags_info or len(tags_info) == 0:
         raise Exception(f"No tags {request.tags} found.")
@@ -87,28 +122,23 @@ async def a_get_query_response(
         {"tag_info": json.dumps(asdict(tag_info), ensure_ascii=False).encode("utf-8")},
     )
 
+    # Domande già inviate al CQA in questa richiesta (normalizzate)
+    cqa_asked_questions: set[str] = set()
     if tag_info.enable_cqa:
         # CQA service response with original query
-        cqa_result = await cqa_do_query(request.query, tag, logger)
+        cqa_asked_questions.add(normalize_query(request.query))
+        cqa_result = await stages.a_run("cqa", lambda: cqa_do_query(request.query, tag, logger))
         if cqa_result:
+            stages.cancel("prompt_info", "prompts")
             return RagOrchestratorResponse(cqa_result.text_answer, None, cqa_result.cqa_data, None)
 
-    prompt_type_filter = [
-        llm_const.completion,
-        llm_const.enrichment,
-        llm_const.msd_completion,
-        llm_const.msd_intent_recognition,
-    ]
-
-    list_prompt_version_info = await a_get_prompt_info(logger, tag, prompt_type_filter, request.llm_model_id)
-
     # API get prompts
     (
         enrichment_prompt_data,
         completion_prompt_data,
         msd_intent_recognition_prompt_data,
         msd_completion_prompt_data,
-    ) = await a_get_prompts_data(request.prompts, list_prompt_version_info, logger, session)
+    ) = await stages.a_result("prompts")
 
     if enrichment_prompt_data == None:
         raise Exception("No enrichment_prompt_data found.")
@@ -123,12 +153,55 @@ async def a_get_query_response(
     # Get AI service (OpenAI or Mistral)
     language_service = AiQueryServiceFactory.get_instance(request.llm_model_id)
 
+    original_query = request.query
     enriched_query = EnrichmentQueryResponse(standalone_question=request.query)
 
+    semantic_cache_scope = None
+    query_embedding = None
+    if is_semantic_cache_eligible(request, tag_info):
+        semantic_cache_scope = build_semantic_cache_scope(
+            request, tag_info, enrichment_prompt_data, completion_prompt_data, consumer
+        )
+        query_embedding = await stages.a_run(
+            "semantic_cache_embedding",
+            lambda: openai.a_generate_embedding_from_text(
+                request.query,
+                deployment_model=consumer.deployment_model,
+                api_version=consumer.api_version,
+                secret=consumer.completion_key,
+                logger=logger,
+            ),
+        )
+        cache_hit = get_semantic_answer_cache().get(semantic_cache_scope, query_embedding)
+        if cache_hit:
+            logger.track_event(
+                event_types.semantic_cache_hit,
+                {"tag": tag, "query": request.query, "similarity": round(cache_hit.similarity, 4)},
+            )
+            return cache_hit.response
+
+    speculative_search = None
+    if (
+        tag_info.enable_enrichment
+        and tag_info.id_monitoring_question != EnumMonitorFormApplication.OnlyMonitoringQuestion.value
+        and get_speculative_search_settings().enabled
+    ):
+        # La ricerca sulla domanda originale parte insieme all'enrichment,
+        # solo nelle modalità che possono arrivare alla query RAG
+        speculative_request = request.model_copy()
+        speculative_search = SpeculativeSearch(
+            speculative_request.query,
+            stages.add(
+                "speculative_search", lambda: a_search(speculative_request, logger, session, consumer)
+            ),
+            get_speculative_search_settings().similarity_threshold,
+        )
+
     if tag_info.enable_enrichment:
         # Compute enrichment
-        enriched_query = await language_service.a_do_query_enrichment(
-            request, enrichment_prompt_data, logger, consumer
+        enriched_query = await stages.a_run(
+            "enrichment",
+            lambda: language_service.a_do_query_enrichment(request, enrichment_prompt_data, logger, consumer),
         )
         if enriched_query.end_conversation:
             answer_to_return = llm_const.default_answer
@@ -139,13 +212,14 @@ async def a_get_query_response(
         request.query = enriched_query.standalone_question
 
     if tag_info.enable_cqa and tag_info.enable_enrichment:
-        # CQA service response with query enriched
-        if enriched_query.standalone_question != request.query:
-            cqa_result = await cqa_do_query(request.query, tag, logger)
+        # CQA service response with query enriched, skipped if the same question was already asked
+        if normalize_query(enriched_query.standalone_question) not in cqa_asked_questions:
+            cqa_asked_questions.add(normalize_query(enriched_query.standalone_question))
+            cqa_result = await stages.a_run("cqa_enriched", lambda: cqa_do_query(request.query, tag, logger))
             if cqa_result:
                 logger.track_event(
                     event_types.cqa_with_enrichment_event,
-                    {"originalQuestion": request.query, "normalizedQuestion": enriched_query.standalone_question},
+                    {"originalQuestion": original_query, "normalizedQuestion": enriched_query.standalone_question},
                 )
                 return RagOrchestratorResponse(
                     cqa_result.text_answer, enriched_query.standalone_question, cqa_result.cqa_data, None
@@ -154,41 +228,95 @@ async def a_get_query_response(
     # monitor_form_app_history = next((interaction for interaction in request.interactions if interaction.type.lower() == monitor_form_app.type), None)
 
     if tag_info.id_monitoring_question == EnumMonitorFormApplication.OnlyRag.value:
-        return await a_do_query(
-            request, completion_prompt_data, language_service, enriched_query, logger, session, consumer
+        response = await stages.a_run(
+            "query",
+            lambda: a_do_query(
+                request,
+                completion_prompt_data,
+                language_service,
+                enriched_query,
+                logger,
+                session,
+                consumer,
+                speculative_search=speculative_search,
+            ),
         )
+        if semantic_cache_scope and response.answer_text and response.clog is None:
+            get_semantic_answer_cache().put(semantic_cache_scope, query_embedding, response)
+        return response
 
-    result = await check_msd_question(
-        request,
-        tag,
-        msd_completion_prompt_data,
-        msd_intent_recognition_prompt_data,
-        language_service,
-        enriched_query,
-        completion_prompt_data,
-        tag_info,
-        logger,
-        session,
-        consumer
-    )
-
-    if tag_info.id_monitoring_question == EnumMonitorFormApplication.Rag_MonitoringQuestion.value and (
-        result is None or (result.monitor_form_application is None and result.clog is not None)
-    ):
-        return await a_do_query(
+    result = await stages.a_run(
+        "msd",
+        lambda: check_msd_question(
             request,
-            completion_prompt_data,
+            tag,
+            msd_completion_prompt_data,
+            msd_intent_recognition_prompt_data,
             language_service,
             enriched_query,
+            completion_prompt_data,
+            tag_info,
             logger,
             session,
-            clog=getattr(result, "clog", None),
-            consumer=consumer,
+            consumer
+        ),
+    )
+
+    if tag_info.id_monitoring_question == EnumMonitorFormApplication.Rag_MonitoringQuestion.value and (
+        result is None or (result.monitor_form_application is None and result.clog is not None)
+    ):
+        return await stages.a_run(
+            "query",
+            lambda: a_do_query(
+                request,
+                completion_prompt_data,
+                language_service,
+                enriched_query,
+                logger,
+                session,
+                clog=getattr(result, "clog", None),
+                consumer=consumer,
+                speculative_search=speculative_search,
+            ),
         )
 
     return result
 
 
+def is_semantic_cache_eligible(request: RagOrchestratorRequest, tag_info: MsSqlTag) -> bool:
+    """
+    La cache semantica vale solo per richieste senza storico e sul solo percorso RAG:
+    le risposte MSD dipendono dall'utente e non possono essere condivise.
+    """
+    return (
+        get_semantic_cache_settings().enabled
+        and not request.interactions
+        and tag_info.id_monitoring_question == EnumMonitorFormApplication.OnlyRag.value
+    )
+
+
+def build_semantic_cache_scope(
+    request: RagOrchestratorRequest,
+    tag_info: MsSqlTag,
+    enrichment_prompt_data: PromptEditorResponseBody,
+    completion_prompt_data: PromptEditorResponseBody,
+    consumer: LLMConsumer,
+) -> SemanticCacheScope:
+    return SemanticCacheScope(
+        tags=tuple(sorted({tag.lower() for tag in request.tags})),
+        environment=request.environment,
+        lang=request.lang,
+        index=get_index_name(request.environment, get_search_settings()),
+        llm_model_id=request.llm_model_id,
+        model_name=request.model_name,
+        consumer=consumer.name,
+        deployment_model=consumer.deployment_model or "",
+        enrichment_enabled=bool(tag_info.enable_enrichment),
+        enrichment_prompt=f"{enrichment_prompt_data.id}:{enrichment_prompt_data.version}",
+        completion_prompt=f"{completion_prompt_data.id}:{completion_prompt_data.version}",
+    )
+
+
 async def a_do_query(
     request: RagOrchestratorRequest,
     completion_prompt_data: PromptEditorResponseBody,
@@ -199,6 +327,7 @@ async def a_do_query(
     consumer: LLMConsumer,
     clog: CLog = None,
     domusData: str = None,
+    speculative_search: Optional[SpeculativeSearch] = None,
 ) -> RagOrchestratorResponse:
 
     if completion_prompt_data == None:
@@ -206,7 +335,7 @@ async def a_do_query(
 
     # Compute completion
     rag_query_result = await language_service.a_do_query(
-        request, completion_prompt_data, logger, session, consumer, domusData
+        request, completion_prompt_data, logger, session, consumer, domusData, speculative_search=speculative_search
     )
 
     return RagOrchestratorResponse(
@@ -262,15 +391,15 @@ async def check_msd_question(
         if not intent_result.numero_domus and not intent_result.numero_protocollo:
             carosello = True
             key = redisService.make_key("list", request.conversation_id)
-            redisCache = redisService.get_from_redis(key)
+            redisCache = await redisService.a_get_from_redis(key)
         elif intent_result.numero_domus:
             dettaglioDomus = True
             key = redisService.make_key("dett", request.conversation_id, intent_result.numero_domus[0])
-            redisCache = redisService.get_from_redis(key)
+            redisCache = await redisService.a_get_from_redis(key)
         elif intent_result.numero_protocollo:
             dettaglioProto = True
             key = redisService.make_key("dett", request.conversation_id, intent_result.numero_protocollo[0])
-            redisCache = redisService.get_from_redis(key)
+            redisCache = await redisService.a_get_from_redis(key)
 
     if not redisCache:
         if msd_intent_recognition_prompt_data == None:
@@ -425,7 +554,7 @@ async def check_msd_question(
                     # save into redis
                     if request.conversation_id:
                         key = redisService.make_key("list", request.conversation_id)
-                        redisService.set_to_redis(key, list_forms.model_dump_json())
+                        await redisService.a_set_to_redis(key, list_forms.model_dump_json(), request.conversation_id)
                     clog_last_status.ret_code = 0
                     clog_last_status.err_desc = None
                     return RagOrchestratorResponse(
@@ -506,7 +635,7 @@ async def check_msd_question(
                     key = redisService.make_key("dett", request.conversation_id, intent_result.numero_domus[0])
                 if dettaglioProto:
                     key = redisService.make_key("dett", request.conversation_id, intent_result.numero_protocollo[0])
-                redisService.set_to_redis(key, form_application_details.model_dump_json())
+                await redisService.a_set_to_redis(key, form_application_details.model_dump_json(), request.conversation_id)
                 logger.track_event(
                     event_types.event_track_log_redis_cache,
                     {
@@ -1,6 +1,9 @@
+import asyncio
+import difflib
 import json
 import os
-from typing import List
+import time
+from typing import List, Optional
 from aiohttp import ClientSession
 from constants import event_types
 from models.apis.prompt_editor_response_body import PromptEditorResponseBody
@@ -16,7 +19,16 @@ from services.openai import (
     a_generate_embedding_from_text as openai_generate_embedding_from_text,
     a_get_answer_from_context as openai_get_answer_from_context,
 )
+from logics.context_packing import get_token_budget, pack_context
+from logics.rerank import Reranker, can_rerank, get_reranker_for_tags, rerank_search_result
+from services.embedding_cache import normalize_query
 from services.search import a_query as query_azure_ai_search
+from utils.settings import (
+    get_context_packing_settings,
+    get_mistralai_settings,
+    get_openai_settings,
+    get_rerank_settings,
+)
 import constants.llm as llm_const
 from models.apis.rag_orchestrator_request import Interaction, RagOrchestratorRequest
 
@@ -41,6 +53,120 @@ def extract_chat_history(interactions: list[Interaction]) -> str:
     return result
 
 
+def query_similarity(first_query: str, second_query: str) -> float:
+    """
+    Similarità testuale (0-1) tra due domande, dopo la stessa normalizzazione della cache degli embedding.
+    """
+    return difflib.SequenceMatcher(None, normalize_query(first_query), normalize_query(second_query)).ratio()
+
+
+class SpeculativeSearch:
+    """
+    Ricerca avviata sulla domanda originale mentre l'enrichment è in corso.
+
+    Il risultato viene riutilizzato solo se la domanda riformulata è abbastanza
+    simile all'originale; altrimenti si esegue una nuova ricerca.
+    """
+
+    def __init__(self, query: str, task: "asyncio.Future[SearchIndexResponse]", similarity_threshold: float):
+        self.query = query
+        self.task = task
+        self.similarity_threshold = similarity_threshold
+
+    async def a_get_result(self, query: str, logger: Logger) -> Optional[SearchIndexResponse]:
+        similarity = query_similarity(self.query, query)
+        reused = similarity >= self.similarity_threshold
+        search_result = None
+        if reused:
+            try:
+                search_result = await self.task
+            except Exception as ex:
+                logger.warning(f"Speculative search failed, searching again: {ex}")
+                reused = False
+
+        logger.track_event(
+            event_types.speculative_search_result,
+            {"original_query": self.query, "query": query, "similarity": round(similarity, 4), "reused": reused},
+        )
+        return search_result
+
+
+async def a_search(
+    request: RagOrchestratorRequest,
+    logger: Logger,
+    session: ClientSession,
+    consumer: LLMConsumer,
+    embedding: Optional[list[float]] = None,
+) -> SearchIndexResponse:
+    if embedding is None:
+        # Passa i parametri dal consumer alla funzione di embedding
+        embedding = await openai_generate_embedding_from_text(
+            request.query,
+            deployment_model=consumer.deployment_model,
+            api_version=consumer.api_version,
+            secret=consumer.completion_key,
+            logger=logger,
+        )
+
+    reranker = get_reranker_for_tags(request.tags)
+    if reranker is not None and reranker.needs_vectors and request.environment in _environments_without_vectors:
+        track_local_rerank_skipped(logger, reranker, request)
+        reranker = None
+    if reranker is None:
+        return await query_azure_ai_search(session, request, embedding, logger)
+
+    settings = get_rerank_settings()
+    semantic_ranking = not settings.disable_semantic_ranking
+    search_result = await query_azure_ai_search(
+        session,
+        request,
+        embedding,
+        logger,
+        include_vectors=reranker.needs_vectors,
+        semantic_ranking=semantic_ranking,
+    )
+    if search_result.value and not can_rerank(search_result, embedding, reranker):
+        _environments_without_vectors.add(request.environment)
+        logger.warning(
+            f"Reranker '{reranker.name()}' skipped: the '{request.environment}' index does not return chunk vectors"
+        )
+        track_local_rerank_skipped(logger, reranker, request)
+        if semantic_ranking:
+            return search_result
+        # Il rerank locale non è stato applicato: si ripete la ricerca con il semantic ranking
+        return await query_azure_ai_search(session, request, embedding, logger)
+
+    started = time.perf_counter()
+    search_result = rerank_search_result(search_result, request.query, embedding, reranker, settings.top_n)
+    logger.track_event(
+        event_types.local_rerank,
+        {
+            "reranker": reranker.name(),
+            "tags": ",".join(request.tags),
+            "documents": len(search_result.value),
+            "semantic_ranking": semantic_ranking,
+            "duration_ms": elapsed_ms(started),
+        },
+    )
+    return search_result
+
+
+# Environment il cui indice non restituisce i vettori dei chunk: i reranker vettoriali
+# non vengono più tentati fino al riavvio del worker
+_environments_without_vectors: set[str] = set()
+
+
+def track_local_rerank_skipped(logger: Logger, reranker: Reranker, request: RagOrchestratorRequest):
+    logger.track_event(
+        event_types.local_rerank_skipped,
+        {"reranker": reranker.name(), "tags": ",".join(request.tags), "environment": request.environment},
+    )
+
+
+def elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 3)
+
+
 async def a_execute_query(
     request: RagOrchestratorRequest,
     prompt_data: PromptEditorResponseBody,
@@ -48,29 +174,43 @@ async def a_execute_query(
     session: ClientSession,
     consumer: LLMConsumer,
     domusData: str = None,
+    speculative_search: Optional[SpeculativeSearch] = None,
+    embedding: Optional[list[float]] = None,
+    timings: Optional[dict] = None,
 ) -> RagQueryResponse:
-    # Passa i parametri dal consumer alla funzione di embedding
-    embedding = await openai_generate_embedding_from_text(
-        request.query,
-        deployment_model=consumer.deployment_model,
-        api_version=consumer.api_version,
-        secret=consumer.completion_key
-    )
-    search_result: SearchIndexResponse = await query_azure_ai_search(session, request, embedding, logger)
+    """
+    embedding: vettore della domanda già calcolato (es. in batch), altrimenti viene generato.
+    timings: se indicato, viene popolato con la durata (ms) della ricerca e della generazione.
+    """
+    started = time.perf_counter()
+    search_result: Optional[SearchIndexResponse] = None
+    if speculative_search:
+        search_result = await speculative_search.a_get_result(request.query, logger)
+    if search_result is None:
+        search_result = await a_search(request, logger, session, consumer, embedding)
+    if timings is not None:
+        timings["search_ms"] = elapsed_ms(started)
     search_result_context = build_question_context_from_search(search_result)
+    if get_context_packing_settings().enabled and search_result_context:
+        search_result_context = pack_search_context(search_result_context, prompt_data, consumer, logger)
 
     if domusData:
+        # Il packing può scartare chunk intermedi: il reference deve seguire il più alto rimasto
+        next_reference = max((c.reference for c in search_result_context), default=0) + 1
         search_result_context.append(
-            RagContextContent("", domusData, len(search_result_context) + 1, "", 100, request.tags[0])
+            RagContextContent("", domusData, next_reference, "", 100, request.tags[0])
         )
 
     if len(search_result_context) == 0:
         return RagQueryResponse(llm_const.default_answer, [], "", [], False, [], [], [])
 
     interactions = extract_chat_history(request.interactions)
+    started = time.perf_counter()
     response_from_llm = await a_get_response_from_llm(
         request.query, request.lang, search_result_context, prompt_data, logger, interactions, consumer
     )
+    if timings is not None:
+        timings["completion_ms"] = elapsed_ms(started)
 
     response_for_user = build_response_for_user(response_from_llm, search_result_context)
     response_to_return = response_for_user[0]
@@ -104,7 +244,8 @@ async def a_execute_query(
 def build_question_context_from_search(search_result: SearchIndexResponse) -> list[RagContextContent]:
     """
     Builds the context for the question from the search result.
-    The results are ordered by the reranker score in descending order.
+    The results are ordered by the reranker score in descending order
+    (the local reranker score when a local rerank stage ran).
     """
     content: list[RagContextContent] = []
     index = 1
@@ -112,6 +253,8 @@ def build_question_context_from_search(search_result: SearchIndexResponse) -> li
         score = value.search_rerankerScore
         if score < 0:
             score = value.search_score
+        if value.local_rerank_score is not None:
+            score = value.local_rerank_score
         content.append(
             RagContextContent(value.chunk_id, value.chunk_text, index, value.filename, score, ", ".join(value.tags))
         )
@@ -120,6 +263,26 @@ def build_question_context_from_search(search_result: SearchIndexResponse) -> li
     return sorted(content, key=lambda x: x.score, reverse=True)
 
 
+def pack_search_context(
+    context: list[RagContextContent], prompt_data: PromptEditorResponseBody, consumer: LLMConsumer, logger: Logger
+) -> list[RagContextContent]:
+    """
+    Riduce il contesto al budget di token del deployment che genera la risposta.
+    """
+    settings = get_context_packing_settings()
+    if prompt_data.llm_model == llm_const.mistralai:
+        deployment = get_mistralai_settings().model
+    else:
+        deployment = consumer.deployment_model or get_openai_settings().completion_deployment_model
+    token_budget = get_token_budget(deployment)
+    packed_context = pack_context(context, token_budget, settings.encoding_name, settings.duplicate_similarity)
+    logger.track_event(
+        event_types.context_packing,
+        {"deployment": deployment, "token_budget": token_budget, **packed_context.to_event()},
+    )
+    return packed_context.context
+
+
 async def a_get_response_from_llm(
     question: str,
     lang: str,
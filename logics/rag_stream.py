@@ -0,0 +1,69 @@
+import asyncio
+import json
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from services.token_stream import TokenStream, reset_token_stream, set_token_stream
+
+SSE_MEDIA_TYPE = "text/event-stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+DELTA_EVENT = "delta"
+RESULT_EVENT = "result"
+ERROR_EVENT = "error"
+
+
+def get_stream_media_type(accept: Optional[str]) -> str:
+    """
+    Formato dello stream scelto dall'header Accept: JSON lines se richiesto esplicitamente, altrimenti SSE.
+    """
+    if accept and NDJSON_MEDIA_TYPE in accept:
+        return NDJSON_MEDIA_TYPE
+    return SSE_MEDIA_TYPE
+
+
+def encode_event(media_type: str, event: str, data_json: str) -> bytes:
+    """
+    Serializza un evento; data_json è già JSON e viene inserito così com'è,
+    in modo che il payload finale sia identico a quello della risposta non in streaming.
+    """
+    if media_type == NDJSON_MEDIA_TYPE:
+        return f'{{"event": "{event}", "data": {data_json}}}\n'.encode("utf-8")
+    # In SSE i dati non possono contenere a capo non codificati
+    data_lines = "".join(f"data: {line}\n" for line in data_json.split("\n"))
+    return f"event: {event}\n{data_lines}\n".encode("utf-8")
+
+
+async def a_stream_events(
+    a_run: Callable[[], Awaitable[str]],
+    media_type: str,
+    on_error: Callable[[Exception], str],
+) -> AsyncIterator[bytes]:
+    """
+    Esegue a_run con uno stream di token attivo e ne inoltra il testo come eventi "delta".
+
+    a_run restituisce il JSON della risposta completa, emesso come evento "result";
+    in caso di errore viene emesso l'evento "error" con il JSON prodotto da on_error.
+    Il testo dei delta è solo un'anteprima: fa fede il payload dell'evento "result".
+    """
+    token_stream = TokenStream()
+    # Il task copia il contesto corrente, e con esso lo stream
+    context_token = set_token_stream(token_stream)
+    try:
+        task = asyncio.create_task(a_run())
+    finally:
+        reset_token_stream(context_token)
+    task.add_done_callback(lambda _: token_stream.close())
+
+    try:
+        async for text in token_stream:
+            yield encode_event(media_type, DELTA_EVENT, json.dumps({"text": text}, ensure_ascii=False))
+        try:
+            payload = await task
+        except Exception as e:
+            yield encode_event(media_type, ERROR_EVENT, on_error(e))
+            return
+        yield encode_event(media_type, RESULT_EVENT, payload)
+    finally:
+        # Client disconnesso: interrompe l'elaborazione
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,182 @@
+import math
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Optional
+
+import numpy as np
+
+from models.configurations.rerank import RerankSettings
+from models.services.search_index_response import SearchIndexResponse, Value
+from utils.settings import get_rerank_settings
+
+_WORDS = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORDS.findall(text.lower())
+
+
+class Reranker(ABC):
+    """
+    Riordina i chunk restituiti dalla ricerca; restituisce (chunk, score) in ordine decrescente di rilevanza.
+    """
+
+    # True se servono i vettori dei chunk (richiesti alla ricerca con include_vectors)
+    needs_vectors = False
+
+    @staticmethod
+    @abstractmethod
+    def name() -> str:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def rerank(self, query: str, query_vector: Optional[list[float]], values: list[Value]) -> list[tuple[Value, float]]:
+        pass
+
+
+class Bm25Reranker(Reranker):
+    """
+    BM25 calcolato sui soli chunk restituiti (IDF sul risultato della ricerca).
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    @staticmethod
+    def name() -> str:
+        return "bm25"
+
+    def rerank(self, query: str, query_vector: Optional[list[float]], values: list[Value]) -> list[tuple[Value, float]]:
+        documents = [Counter(tokenize(value.chunk_text)) for value in values]
+        lengths = [sum(document.values()) for document in documents]
+        average_length = (sum(lengths) / len(lengths)) or 1.0
+        query_terms = set(tokenize(query))
+        idf = {}
+        for term in query_terms:
+            frequency = sum(1 for document in documents if term in document)
+            idf[term] = math.log((len(documents) - frequency + 0.5) / (frequency + 0.5) + 1)
+
+        scores = []
+        for document, length in zip(documents, lengths):
+            score = 0.0
+            for term in query_terms:
+                tf = document.get(term, 0)
+                if tf:
+                    normalization = self.k1 * (1 - self.b + self.b * length / average_length)
+                    score += idf[term] * tf * (self.k1 + 1) / (tf + normalization)
+            scores.append(score)
+        return sorted(zip(values, scores), key=lambda x: x[1], reverse=True)
+
+
+def cosine_similarities(query_vector: list[float], vectors: list[list[float]]) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    query = np.asarray(query_vector, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    return (matrix @ query) / np.where(norms == 0, 1, norms)
+
+
+class CosineReranker(Reranker):
+    """
+    Similarità coseno tra la domanda e i vettori dei chunk.
+    """
+
+    needs_vectors = True
+
+    @staticmethod
+    def name() -> str:
+        return "cosine"
+
+    def rerank(self, query: str, query_vector: Optional[list[float]], values: list[Value]) -> list[tuple[Value, float]]:
+        scores = cosine_similarities(query_vector, [value.chunk_text_vector for value in values])
+        return sorted(zip(values, scores.tolist()), key=lambda x: x[1], reverse=True)
+
+
+class MmrReranker(Reranker):
+    """
+    Maximal Marginal Relevance: alterna rilevanza per la domanda e diversità dai chunk già scelti.
+    Lo score è il valore MMR al momento della selezione.
+    """
+
+    needs_vectors = True
+
+    def __init__(self, mmr_lambda: float = 0.7):
+        self.mmr_lambda = mmr_lambda
+
+    @staticmethod
+    def name() -> str:
+        return "mmr"
+
+    def rerank(self, query: str, query_vector: Optional[list[float]], values: list[Value]) -> list[tuple[Value, float]]:
+        matrix = np.asarray([value.chunk_text_vector for value in values], dtype=np.float32)
+        relevance = cosine_similarities(query_vector, matrix)
+        norms = np.linalg.norm(matrix, axis=1)
+        normalized = matrix / np.where(norms == 0, 1, norms)[:, None]
+        similarity = normalized @ normalized.T
+
+        selected: list[int] = []
+        result: list[tuple[Value, float]] = []
+        remaining = list(range(len(values)))
+        while remaining:
+            redundancy = similarity[np.ix_(remaining, selected)].max(axis=1) if selected else np.zeros(len(remaining))
+            mmr = self.mmr_lambda * relevance[remaining] - (1 - self.mmr_lambda) * redundancy
+            best = int(np.argmax(mmr))
+            index = remaining.pop(best)
+            selected.append(index)
+            result.append((values[index], float(mmr[best])))
+        return result
+
+
+def build_reranker(name: str, settings: RerankSettings) -> Optional[Reranker]:
+    if name == Bm25Reranker.name():
+        return Bm25Reranker(settings.bm25_k1, settings.bm25_b)
+    if name == CosineReranker.name():
+        return CosineReranker()
+    if name == MmrReranker.name():
+        return MmrReranker(settings.mmr_lambda)
+    if name in ("", "none"):
+        return None
+    raise ValueError(f"Unknown reranker '{name}'")
+
+
+def get_reranker_for_tags(tags: list[str]) -> Optional[Reranker]:
+    """
+    Reranker del primo tag che ne ha uno configurato, altrimenti quello di default.
+    """
+    settings = get_rerank_settings()
+    name = next((settings.tag_rerankers[tag] for tag in tags if tag in settings.tag_rerankers), None)
+    return build_reranker(name or settings.default_reranker, settings)
+
+
+def can_rerank(search_result: SearchIndexResponse, query_vector: Optional[list[float]], reranker: Reranker) -> bool:
+    """
+    False se il reranker è vettoriale ma mancano i vettori (es. indice che non li restituisce).
+    """
+    if not reranker.needs_vectors:
+        return True
+    return query_vector is not None and all(v.chunk_text_vector is not None for v in search_result.value)
+
+
+def rerank_search_result(
+    search_result: SearchIndexResponse,
+    query: str,
+    query_vector: Optional[list[float]],
+    reranker: Reranker,
+    top_n: int = 0,
+) -> SearchIndexResponse:
+    """
+    Riordina i chunk e ne imposta local_rerank_score, usato al posto degli score di Azure per il contesto.
+    Se can_rerank è False il risultato resta invariato.
+    """
+    values = search_result.value
+    if not values or not can_rerank(search_result, query_vector, reranker):
+        return search_result
+    reranked = reranker.rerank(query, query_vector, values)
+    if top_n > 0:
+        reranked = reranked[:top_n]
+    for value, score in reranked:
+        value.local_rerank_score = score
+        # I vettori non servono oltre questo punto
+        value.chunk_text_vector = None
+    return SearchIndexResponse(search_result.data_context, search_result.data_count, [v for v, _ in reranked])
@@ -0,0 +1,79 @@
+import json
+import time
+from functools import cache
+from typing import Optional
+
+import constants.event_types as event_types
+from logics.rag_batch import get_consumer_rate_limiter_metrics
+from services.aad_token import get_aad_token_provider
+from services.blob_mapping_cache import get_blob_mapping_cache
+from services.cqa_answer_cache import get_cqa_answer_cache
+from services.embedding_batcher import get_embedding_batcher
+from services.embedding_cache import get_embedding_cache
+from services.http_session import get_http_session_manager
+from services.llm_clients import get_llm_client_registry
+from services.logging import Logger
+from services.mssql_pool import get_mssql_pool
+from services.prompt_cache import get_prompt_cache
+from services.semantic_answer_cache import get_semantic_answer_cache
+from utils.db_config import a_get_api_key_from_vault, a_get_deployment_config
+from utils.settings import get_runtime_metrics_settings
+
+
+def collect_runtime_metrics() -> dict[str, dict]:
+    """
+    Metriche in memoria del worker: pool, sessioni, client condivisi e cache di processo.
+    """
+    return {
+        "mssql_pool": get_mssql_pool().get_metrics(),
+        "http_session": get_http_session_manager(False).get_metrics(),
+        "http_session_trust_env": get_http_session_manager(True).get_metrics(),
+        "aad_token": get_aad_token_provider().get_metrics(),
+        "llm_clients": get_llm_client_registry().get_metrics(),
+        "embedding_cache": get_embedding_cache().get_metrics(),
+        "embedding_batcher": get_embedding_batcher().get_metrics(),
+        "semantic_answer_cache": get_semantic_answer_cache().get_metrics(),
+        "cqa_answer_cache": get_cqa_answer_cache().get_metrics(),
+        "prompt_cache": get_prompt_cache().get_metrics(),
+        "blob_mapping_cache": get_blob_mapping_cache().get_metrics(),
+        "deployment_config_cache": a_get_deployment_config.cache.get_metrics(),
+        "vault_secret_cache": a_get_api_key_from_vault.cache.get_metrics(),
+        "batch_rate_limiters": get_consumer_rate_limiter_metrics(),
+    }
+
+
+class RuntimeMetricsReporter:
+    """
+    Invia le metriche di runtime come evento RuntimeMetrics al più ogni interval_seconds.
+    Non ha un proprio timer: l'invio avviene dalle richieste servite, quindi un worker inattivo non emette eventi.
+    """
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._last_sent_at: Optional[float] = None
+
+    def maybe_track(self, logger: Logger) -> bool:
+        now = time.monotonic()
+        if self._last_sent_at is not None and now - self._last_sent_at < self.interval_seconds:
+            return False
+        self._last_sent_at = now
+        try:
+            metrics = collect_runtime_metrics()
+        except Exception as ex:
+            logger.warning(f"Runtime metrics collection failed: {ex}")
+            return False
+        logger.track_event(
+            event_types.runtime_metrics,
+            {name: json.dumps(values, default=str) for name, values in metrics.items()},
+        )
+        return True
+
+
+@cache
+def get_runtime_metrics_reporter() -> RuntimeMetricsReporter:
+    return RuntimeMetricsReporter(get_runtime_metrics_settings().interval_seconds)
+
+
+def track_runtime_metrics(logger: Logger):
+    if get_runtime_metrics_settings().enabled:
+        get_runtime_metrics_reporter().maybe_track(logger)
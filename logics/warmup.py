@@ -0,0 +1,170 @@
+import asyncio
+import time
+from functools import cache
+from typing import Awaitable, Callable, Optional
+
+import constants.environment as environment
+import constants.prompt_editor as prompt_editor
+import utils.settings as app_settings
+from logics.context_packing import get_encoding
+from services.blob_mapping_cache import get_blob_mapping_cache
+from services.http_session import get_http_session
+from services.logging import Logger
+from services.mssql import get_tag_cache
+from services.mssql_pool import get_mssql_pool
+from services.redis import get_redis_client
+from utils.db_config import a_get_complete_config, a_get_known_deployments
+
+NOT_STARTED = "not_started"
+RUNNING = "running"
+READY = "ready"
+
+
+class WarmupState:
+    """
+    Stato del warm-up del worker, esposto dall'endpoint di readiness.
+
+    Il warm-up parte una sola volta per event loop; le richieste concorrenti attendono lo stesso task.
+    Il worker è pronto quando il warm-up è terminato, anche se alcune fasi sono fallite:
+    gli errori sono riportati per fase e la relativa risorsa verrà caricata alla prima richiesta.
+    """
+
+    def __init__(self):
+        self.status = NOT_STARTED
+        self.steps: dict[str, dict] = {}
+        self.duration_ms: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == READY
+
+    def to_dict(self) -> dict:
+        return {"status": self.status, "duration_ms": self.duration_ms, "steps": dict(self.steps)}
+
+
+@cache
+def get_warmup_state() -> WarmupState:
+    return WarmupState()
+
+
+async def _a_run_step(state: WarmupState, name: str, fn: Callable[[], Awaitable[Optional[dict]]], logger: Logger):
+    started = time.perf_counter()
+    try:
+        details = await fn()
+        state.steps[name] = {"status": "ok", **(details or {})}
+    except Exception as ex:
+        logger.warning(f"Warm-up step '{name}' failed: {ex}")
+        state.steps[name] = {"status": "error", "error": str(ex)}
+    state.steps[name]["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+
+async def a_load_settings() -> dict:
+    """
+    Valida tutte le configurazioni pydantic esposte da utils.settings.
+    Le configurazioni non valorizzate nell'ambiente vengono solo elencate: servono a funzionalità non attive.
+    """
+    getters = [getattr(app_settings, name) for name in dir(app_settings) if name.startswith("get_") and name.endswith("_settings")]
+    missing = []
+    for getter in getters:
+        try:
+            getter()
+        except Exception:
+            missing.append(getter.__name__)
+    return {"loaded": len(getters) - len(missing), "missing": missing}
+
+
+async def a_prefetch_deployments() -> dict:
+    settings = app_settings.get_warmup_settings()
+    if not settings.prefetch_deployments or not app_settings.get_access_control_settings().enable_access_control:
+        return {"skipped": True}
+    deployments = await a_get_known_deployments(settings.max_deployments)
+    results = await asyncio.gather(
+        *(a_get_complete_config(source_identifier, model) for source_identifier, model in deployments),
+        return_exceptions=True,
+    )
+    return {"loaded": sum(1 for r in results if not isinstance(r, Exception)), "failed": sum(1 for r in results if isinstance(r, Exception))}
+
+
+async def a_load_tags(logger: Logger) -> dict:
+    if not app_settings.get_tag_cache_settings().enabled:
+        return {"skipped": True}
+    await get_tag_cache().a_preload(logger)
+    return None
+
+
+async def a_load_mappings() -> dict:
+    if not app_settings.get_mapping_cache_settings().enabled:
+        return {"skipped": True}
+    mapping_cache = get_blob_mapping_cache()
+    await asyncio.gather(
+        mapping_cache.a_preload(app_settings.get_cqa_settings().config_container, environment.TAGS_MAPPING),
+        mapping_cache.a_preload(app_settings.get_prompt_settings().config_container, prompt_editor.MSD_TAGS_MAPPING),
+    )
+    return None
+
+
+async def a_open_pools() -> dict:
+    async with get_mssql_pool().acquire():
+        pass
+    await get_redis_client().ping()
+    get_http_session()
+    get_http_session(trust_env=True)
+    return None
+
+
+async def a_load_tokenizer() -> dict:
+    settings = app_settings.get_context_packing_settings()
+    if not settings.enabled:
+        return None
+    # Il primo caricamento dell'encoding può scaricare il file BPE: fuori dall'event loop
+    encoding = await asyncio.to_thread(get_encoding, settings.encoding_name)
+    return {"encoding": settings.encoding_name, "available": encoding is not None}
+
+
+async def _a_warm_up(state: WarmupState, logger: Logger):
+    started = time.perf_counter()
+    await _a_run_step(state, "settings", a_load_settings, logger)
+    await asyncio.gather(
+        _a_run_step(state, "pools", a_open_pools, logger),
+        _a_run_step(state, "deployments", a_prefetch_deployments, logger),
+        _a_run_step(state, "tags", lambda: a_load_tags(logger), logger),
+        _a_run_step(state, "mappings", a_load_mappings, logger),
+        _a_run_step(state, "tokenizer", a_load_tokenizer, logger),
+    )
+    state.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+    state.status = READY
+    logger.info(f"Warm-up completed in {state.duration_ms} ms: {state.steps}")
+
+
+def start_warm_up(logger: Optional[Logger] = None) -> asyncio.Task:
+    """
+    Avvia il warm-up in background, se non è già stato avviato su questo event loop.
+    """
+    state = get_warmup_state()
+    loop = asyncio.get_running_loop()
+    if state._task is None or state._loop is not loop:
+        state.status = RUNNING
+        state.steps = {}
+        state._task = asyncio.create_task(_a_warm_up(state, logger or Logger("warmup", "warmup", "")))
+        state._loop = loop
+    return state._task
+
+
+async def a_warm_up(logger: Optional[Logger] = None) -> WarmupState:
+    """
+    Esegue il warm-up (o attende quello in corso) entro il timeout configurato.
+    Allo scadere del timeout il warm-up prosegue in background.
+    """
+    state = get_warmup_state()
+    settings = app_settings.get_warmup_settings()
+    if not settings.enabled:
+        state.status = READY
+        return state
+    task = start_warm_up(logger)
+    try:
+        await asyncio.wait_for(asyncio.shield(task), timeout=settings.timeout_seconds)
+    except asyncio.TimeoutError:
+        (logger or Logger("warmup", "warmup", "")).warning("Warm-up still running after timeout")
+    return state
@@ -0,0 +1,7 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class AadTokenSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix='AAD_TOKEN_')
+
+    refresh_margin_seconds: int = 300
@@ -0,0 +1,15 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class BatchQuerySettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix='BATCH_QUERY_')
+
+    # Limite per query/batch/stream e per devops/run_batch_queries.py
+    max_items: int = 1000
+    # Limite per query/batch, che accumula tutti i risultati prima di rispondere: deve
+    # terminare entro il timeout HTTP di 230 s di Azure Functions
+    max_buffered_items: int = 20
+    max_concurrency: int = 8
+    embedding_batch_size: int = 16
+    # Richieste al secondo per consumer (caller-service), 0 = nessun limite
+    requests_per_second: float = 5.0
@@ -0,0 +1,13 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class ContextPackingSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix='CONTEXT_PACKING_')
+
+    enabled: bool = False
+    # Token massimi dei chunk inviati all'LLM; deployment_token_budgets (JSON) sovrascrive il valore per deployment
+    token_budget: int = 6000
+    deployment_token_budgets: dict[str, int] = {}
+    encoding_name: str = "o200k_base"
+    # Similarità (Jaccard sui trigrammi di parole) oltre la quale due chunk sono considerati duplicati
+    duplicate_similarity: float = 0.9
@@ -0,0 +1,9 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class CqaCacheSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix='CQA_CACHE_')
+
+    enabled: bool = True
+    ttl_seconds: int = 600
+    max_entries: int = 1024
@@ -0,0 +1,9 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class EmbeddingBatchSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix='EMBEDDING_BATCH_')
+
+    enabled: bool = True
+    max_batch_size: int = 16
+    max_wait_ms: float = 5.0
@@ -0,0 +1,10 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class EmbeddingCacheSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix='EMBEDDING_CACHE_')
+
+    enabled: bool = True
+    max_entries: int = 2048
+    redis_enabled: bool = False
+    redis_ttl_seconds: int = 86400
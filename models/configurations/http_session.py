@@ -0,0 +1,13 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class HttpSessionSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix='HTTP_SESSION_')
+
+    limit: int = 100
+    # Connessioni massime per host; 0 = nessun limite, come le sessioni per request usate in precedenza
+    limit_per_host: int = 0
+    keepalive_timeout: float = 30.0
+    ttl_dns_cache: int = 300
+    connect_timeout: float = 30.0
+    total_timeout: float = 300.0
@@ -0,0 +1,8 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class MappingCacheSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix='MAPPING_CACHE_')
+
+    enabled: bool = True
+    revalidate_seconds: int = 60
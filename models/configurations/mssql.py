@@ -3,4 +3,10 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class MsSqlSettings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix='AZURE_SQL_')
     
-    connection_string: str
\ No newline at end of file
+    connection_string: str
+
+    # Pool di connessioni condiviso dal worker (vedi services/mssql_pool.py)
+    pool_minsize: int = 1
+    pool_maxsize: int = 10
+    pool_recycle_seconds: int = 1800
+    pool_pre_ping: bool = True
\ No newline at end of file
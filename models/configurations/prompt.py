@@ -13,6 +13,9 @@ class PromptSettings(BaseSettings):
     config_container: str = None
     template_resolve_endpoint: str
     template_api_key: str
+    template_local_rendering_enabled: bool = True
+    template_cache_size: int = 512
+    template_max_concurrency: int = 4
     # msd_intent_recognition_default_id: str
     # msd_intent_recognition_default_version: Optional[str] = None
     # msd_completion_default_id: str
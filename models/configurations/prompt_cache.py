@@ -0,0 +1,10 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class PromptCacheSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix='PROMPT_CACHE_')
+
+    enabled: bool = True
+    info_ttl_seconds: int = 300
+    latest_body_ttl_seconds: int = 300
+    max_bodies: int = 256
@@ -10,3 +10,9 @@ class RedisSettings(BaseSettings):
     port: Optional[int] = 6380
     expiration_seconds: Optional[int] = 180
     ssl:Optional[bool]=True
+    max_connections: int = 20
+    # Secondi di attesa di una connessione libera quando il pool è esaurito
+    pool_timeout: float = 5.0
+    socket_timeout: float = 2.0
+    socket_connect_timeout: float = 2.0
+    health_check_interval: int = 30
@@ -0,0 +1,37 @@
+from pydantic import field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+RERANKER_NAMES = ("none", "bm25", "cosine", "mmr")
+
+
+def validate_reranker_name(name: str) -> str:
+    name = name.strip().lower() or "none"
+    if name not in RERANKER_NAMES:
+        raise ValueError(f"Unknown reranker '{name}', expected one of {', '.join(RERANKER_NAMES)}")
+    return name
+
+
+class RerankSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix='RERANK_')
+
+    # Reranker locale ("none", "bm25", "cosine", "mmr") per tutti i tag e, in JSON, per singolo tag
+    default_reranker: str = "none"
+    tag_rerankers: dict[str, str] = {}
+    # Con un reranker locale attivo la ricerca non usa il semantic ranking (a pagamento) di Azure
+    disable_semantic_ranking: bool = True
+    # Chunk mantenuti dopo il rerank, 0 = tutti
+    top_n: int = 0
+    bm25_k1: float = 1.2
+    bm25_b: float = 0.75
+    # Peso della rilevanza rispetto alla diversità in MMR
+    mmr_lambda: float = 0.7
+
+    @field_validator("default_reranker")
+    @classmethod
+    def validate_default_reranker(cls, v: str) -> str:
+        return validate_reranker_name(v)
+
+    @field_validator("tag_rerankers")
+    @classmethod
+    def validate_tag_rerankers(cls, v: dict[str, str]) -> dict[str, str]:
+        return {tag: validate_reranker_name(name) for tag, name in v.items()}
@@ -0,0 +1,9 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class RuntimeMetricsSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix='RUNTIME_METRICS_')
+
+    enabled: bool = True
+    # Intervallo minimo tra due eventi RuntimeMetrics dello stesso worker
+    interval_seconds: float = 300.0
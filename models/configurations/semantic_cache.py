@@ -0,0 +1,10 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class SemanticCacheSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix='SEMANTIC_CACHE_')
+
+    enabled: bool = False
+    similarity_threshold: float = 0.95
+    ttl_seconds: int = 3600
+    max_entries_per_scope: int = 500
@@ -0,0 +1,8 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class SpeculativeSearchSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix='SPECULATIVE_SEARCH_')
+
+    enabled: bool = False
+    similarity_threshold: float = 0.9
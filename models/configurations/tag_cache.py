@@ -0,0 +1,10 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class TagCacheSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix='TAG_CACHE_')
+
+    enabled: bool = True
+    ttl_seconds: int = 300
+    # Per quanto un tag non trovato viene considerato inesistente senza interrogare SQL
+    negative_ttl_seconds: int = 30
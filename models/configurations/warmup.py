@@ -0,0 +1,10 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class WarmupSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix='WARMUP_')
+
+    enabled: bool = True
+    prefetch_deployments: bool = True
+    max_deployments: int = 100
+    timeout_seconds: float = 60.0
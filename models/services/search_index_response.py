@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass
@@ -9,6 +10,8 @@ class Value:
     chunk_text: str
     filename: str
     tags: list[str]
+    chunk_text_vector: Optional[list[float]] = None
+    local_rerank_score: Optional[float] = None
 
     @staticmethod
     def from_dict(obj: any) -> 'Value':
@@ -18,12 +21,14 @@ class Value:
         _chunk_text = str(obj.get("chunk_text"))
         _filename = str(obj.get("filename"))
         _tags = [str(y) for y in obj.get("tags")]
+        _chunk_text_vector = obj.get("chunk_text_vector")
         return Value(_search_score,
                     _search_rerankerScore,
                     _chunk_id,
                     _chunk_text,
                     _filename,
-                    _tags)
+                    _tags,
+                    _chunk_text_vector)
     
 @dataclass
 class SearchIndexResponse():
@@ -1,9 +1,9 @@
-import aiohttp
 from pydantic import ValidationError
 import requests
 from logics.ai_query_service_factory import AiQueryServiceFactory
 from models.apis.rag_orchestrator_request import RagOrchestratorRequest
 import json
+from services.http_session import get_http_session
 from services.logging import LoggerBuilder
 import azure.functions as func
 from services.prompt_editor import a_get_enrichment_prompt_data
@@ -53,20 +53,20 @@ async def a_augment_query(req: func.HttpRequest, context: func.Context) -> func.
         language_service = AiQueryServiceFactory.get_instance(request.llm_model_id)
 
         # Compute enrichment
-        async with aiohttp.ClientSession(raise_for_status=True) as session:
-            # API get prompts
-            enrichment_prompt_data = await a_get_enrichment_prompt_data(request.prompts, logger, session)
+        session = get_http_session()
+        # API get prompts
+        enrichment_prompt_data = await a_get_enrichment_prompt_data(request.prompts, logger, session)
 
-            # Verify llm model id request and prompts model from editor
-            if request.llm_model_id != enrichment_prompt_data.llm_model:
-                raise requests.exceptions.HTTPError(
-                    "Bad Request: The request llm model id  is different from prompt editor llm model.", response=None
-                )
-            result = await language_service.a_do_query_enrichment(
-                request, enrichment_prompt_data, logger, consumer
+        # Verify llm model id request and prompts model from editor
+        if request.llm_model_id != enrichment_prompt_data.llm_model:
+            raise requests.exceptions.HTTPError(
+                "Bad Request: The request llm model id  is different from prompt editor llm model.", response=None
             )
-            json_content = json.dumps(result.model_dump())
-            return func.HttpResponse(json_content, mimetype="application/json")
+        result = await language_service.a_do_query_enrichment(
+            request, enrichment_prompt_data, logger, consumer
+        )
+        json_content = json.dumps(result.model_dump())
+        return func.HttpResponse(json_content, mimetype="application/json")
 
     except ValidationError as e:
         problem = Problem(422, "Bad Request", e.errors(), None, None)
@@ -0,0 +1,78 @@
+import json
+import azure.functions as func
+from pydantic import ValidationError
+
+import constants.event_types as event_types
+from logics.rag_batch import a_run_batch, parse_batch_lines
+from services.http_session import get_http_session
+from services.logging import LoggerBuilder
+from utils.access_control_handler import handle_access_control
+from utils.http_problem import Problem
+from utils.settings import (
+    get_batch_query_settings,
+    get_mistralai_settings,
+    get_openai_settings,
+    get_prompt_settings,
+    get_rerank_settings,
+    get_search_settings,
+    get_storage_settings,
+)
+
+bp = func.Blueprint()
+
+
+@bp.route(route="query/batch", auth_level=func.AuthLevel.FUNCTION, methods=["POST"])
+async def a_batch_query(req: func.HttpRequest, context: func.Context) -> func.HttpResponse:
+    """
+    Body JSONL: una RagOrchestratorRequest per riga. Risposta JSONL: un risultato per richiesta,
+    nell'ordine di completamento, con l'indice della riga, lo status e le durate per fase.
+    La risposta arriva solo a batch concluso, quindi il numero di righe è limitato a max_buffered_items:
+    i batch più grandi vanno inviati a query/batch/stream.
+    """
+    with LoggerBuilder(__name__, context) as logger:
+        logger.info("Batch query request")
+
+        try:
+            settings = get_batch_query_settings()
+            get_mistralai_settings()
+            get_openai_settings()
+            get_prompt_settings()
+            get_rerank_settings()
+            get_search_settings()
+            get_storage_settings()
+        except ValidationError as e:
+            problem = Problem(500, "Invalid configuration", e.errors(), None, None)
+            logger.exception("Invalid configuration")
+            return func.HttpResponse(
+                json.dumps(problem.to_dict()), status_code=500, mimetype="application/problem+json"
+            )
+
+        items = parse_batch_lines(req.get_body().decode("utf-8").splitlines())
+        if len(items) == 0 or len(items) > settings.max_buffered_items:
+            problem = Problem(
+                422,
+                "Bad Request",
+                f"The batch must contain between 1 and {settings.max_buffered_items} requests, "
+                f"use query/batch/stream for larger batches",
+                None,
+                None,
+            )
+            return func.HttpResponse(
+                json.dumps(problem.to_dict()), status_code=422, mimetype="application/problem+json"
+            )
+        logger.track_event(event_types.rag_batch_query_requested_event, {"items": len(items)})
+
+        lines = []
+        failed = 0
+        async for item_result in a_run_batch(
+            items,
+            logger,
+            get_http_session(),
+            lambda request: handle_access_control(req, logger, model_name=request.model_name),
+            settings,
+        ):
+            lines.append(item_result.to_json_line())
+            failed += item_result.status != 200
+
+        logger.track_event(event_types.rag_batch_query_performed_event, {"items": len(items), "failed": failed})
+        return func.HttpResponse("".join(lines).encode("utf-8"), mimetype="application/x-ndjson")
@@ -1,10 +1,11 @@
-import aiohttp
 import azure.functions as func
 import json
 from pydantic import ValidationError
 from constants import event_types
 from exceptions.custom_exceptions import CustomPromptParameterError
 from logics.rag_orchestrator import a_get_query_response
+from logics.runtime_metrics import track_runtime_metrics
+from services.http_session import get_http_session
 from services.logging import LoggerBuilder
 from utils.http_problem import Problem
 from models.apis.rag_orchestrator_request import RagOrchestratorRequest
@@ -22,6 +23,7 @@ from utils.settings import (
     get_mssql_settings,
     get_openai_settings,
     get_prompt_settings,
+    get_rerank_settings,
     get_search_settings,
     get_storage_settings,
 )
@@ -56,6 +58,7 @@ async def a_rag_orchestrator(req: func.HttpRequest, context: func.Context) -> fu
             get_mistralai_settings()
             get_mssql_settings()
             get_prompt_settings()
+            get_rerank_settings()
             get_search_settings()
             get_storage_settings()
             get_openai_settings()
@@ -147,18 +150,19 @@ async def a_rag_orchestrator(req: func.HttpRequest, context: func.Context) -> fu
                 },
             )
 
-            async with aiohttp.ClientSession(raise_for_status=True, trust_env=True) as session:
-                query_response = await a_get_query_response(request, logger, session, consumer)
-                json_content = json.dumps(query_response, ensure_ascii=False, default=lambda x: x.__dict__).encode(
-                    "utf-8"
-                )
+            session = get_http_session(trust_env=True)
+            query_response = await a_get_query_response(request, logger, session, consumer)
+            json_content = json.dumps(query_response, ensure_ascii=False, default=lambda x: x.__dict__).encode(
+                "utf-8"
+            )
 
-                logger.track_event(
-                    event_types.rag_orchestrator_performed_event,
-                    {"response-body": json_content, "source": "CQA" if query_response.cqa_data else "LLM"},
-                )
+            logger.track_event(
+                event_types.rag_orchestrator_performed_event,
+                {"response-body": json_content, "source": "CQA" if query_response.cqa_data else "LLM"},
+            )
+            track_runtime_metrics(logger)
 
-                return func.HttpResponse(json_content, mimetype="application/json")
+            return func.HttpResponse(json_content, mimetype="application/json")
 
         except ValidationError as e:            
             problem = Problem(422, "Bad Request", e.errors(), None, None)
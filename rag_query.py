@@ -1,20 +1,22 @@
 import json
-import aiohttp
 import azure.functions as func
 from pydantic import ValidationError
 import requests
 
 import constants.event_types as event_types
 from logics.ai_query_service_factory import AiQueryServiceFactory
+from logics.runtime_metrics import track_runtime_metrics
 from models.apis.rag_orchestrator_request import RagOrchestratorRequest
 from services.prompt_editor import a_get_completion_prompt_data
 from utils.http_problem import Problem
+from services.http_session import get_http_session
 from services.logging import LoggerBuilder
 from utils.access_control_handler import handle_access_control
 from utils.settings import (
     get_mistralai_settings,
     get_openai_settings,
     get_prompt_settings,
+    get_rerank_settings,
     get_search_settings,
     get_storage_settings,
 )
@@ -33,6 +35,7 @@ async def a_query(req: func.HttpRequest, context: func.Context) -> func.HttpResp
             get_mistralai_settings()
             get_openai_settings()
             get_prompt_settings()
+            get_rerank_settings()
             get_search_settings()
             get_storage_settings()
         except ValidationError as e:
@@ -53,23 +56,24 @@ async def a_query(req: func.HttpRequest, context: func.Context) -> func.HttpResp
             # Get AI service (OpenAI or Mistral)
             language_service = AiQueryServiceFactory.get_instance(request.llm_model_id)
 
-            async with aiohttp.ClientSession(raise_for_status=True) as session:
-                # API get prompts
-                completion_prompt_data = await a_get_completion_prompt_data(request.prompts, logger, session)
+            session = get_http_session()
+            # API get prompts
+            completion_prompt_data = await a_get_completion_prompt_data(request.prompts, logger, session)
 
-                # Verify llm model id request and prompts model from editor
-                if request.llm_model_id != completion_prompt_data.llm_model:
-                    raise requests.exceptions.HTTPError(
-                        "Bad Request: The request llm model id  is different from prompt editor llm model.",
-                        response=None,
-                    )
-                result = await language_service.a_do_query(
-                    request, completion_prompt_data, logger, session, consumer
+            # Verify llm model id request and prompts model from editor
+            if request.llm_model_id != completion_prompt_data.llm_model:
+                raise requests.exceptions.HTTPError(
+                    "Bad Request: The request llm model id  is different from prompt editor llm model.",
+                    response=None,
                 )
-                json_content = json.dumps(result, ensure_ascii=False, default=lambda x: x.__dict__).encode("utf-8")
-                logger.track_event(event_types.rag_query_performed_event, {"response-body": json_content})
+            result = await language_service.a_do_query(
+                request, completion_prompt_data, logger, session, consumer
+            )
+            json_content = json.dumps(result, ensure_ascii=False, default=lambda x: x.__dict__).encode("utf-8")
+            logger.track_event(event_types.rag_query_performed_event, {"response-body": json_content})
+            track_runtime_metrics(logger)
 
-                return func.HttpResponse(json_content, mimetype="application/json")
+            return func.HttpResponse(json_content, mimetype="application/json")
 
         except ValidationError as e:
             problem = Problem(422, "Bad Request", e.errors(), None, None)
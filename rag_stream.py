@@ -0,0 +1,219 @@
+import json
+from typing import Optional
+import azure.functions as func
+from azurefunctions.extensions.http.fastapi import JSONResponse, Request, StreamingResponse
+from pydantic import ValidationError
+import requests
+
+import constants.event_types as event_types
+from exceptions.custom_exceptions import CustomPromptParameterError
+from logics.ai_query_service_factory import AiQueryServiceFactory
+from logics.rag_batch import a_run_batch, parse_batch_lines
+from logics.rag_orchestrator import a_get_query_response
+from logics.rag_stream import NDJSON_MEDIA_TYPE, a_stream_events, get_stream_media_type
+from models.apis.rag_orchestrator_request import RagOrchestratorRequest
+from services.http_session import get_http_session
+from services.logging import Logger, LoggerBuilder
+from services.prompt_editor import a_get_completion_prompt_data
+from utils.access_control_handler import handle_access_control
+from utils.db_config import (
+    DatabaseConnectionError,
+    DeploymentNotFoundError,
+    IncompleteConfigError,
+    InvalidSecretUrlError,
+    SecretRetrievalError,
+)
+from utils.http_problem import Problem
+from utils.settings import (
+    get_batch_query_settings,
+    get_cqa_settings,
+    get_mistralai_settings,
+    get_mssql_settings,
+    get_openai_settings,
+    get_prompt_settings,
+    get_rerank_settings,
+    get_search_settings,
+    get_storage_settings,
+)
+
+# Versioni in streaming di /rag, /query e /query/batch: richiedono le HTTP streams di Azure Functions
+# (pacchetto azurefunctions-extensions-http-fastapi e app setting PYTHON_ENABLE_INIT_INDEXING=1).
+#
+# rag/stream e query/stream emettono eventi "delta" con il testo generato dall'LLM man mano che arriva,
+# poi un unico evento "result" con lo stesso JSON della risposta non in streaming (oppure "error").
+# La risposta ufficiale è quella di "result": può differire dal testo dei delta, ad esempio quando
+# la risposta senza riferimenti ai documenti viene sostituita con la risposta di default.
+# I client devono sostituire il testo mostrato durante lo streaming con quello di "result".
+bp = func.Blueprint()
+
+
+def to_json(response) -> str:
+    # Stessa serializzazione delle risposte non in streaming
+    return json.dumps(response, ensure_ascii=False, default=lambda x: x.__dict__)
+
+
+def build_problem(e: Exception, logger: Logger) -> Problem:
+    if isinstance(e, ValidationError):
+        return Problem(422, "Bad Request", e.errors(), None, None)
+    if isinstance(e, CustomPromptParameterError):
+        logger.exception(e.args[0])
+        return Problem(e.error_code, "Error prompt", e.args[0], None, None)
+    logger.exception(str(e))
+    if isinstance(e, DeploymentNotFoundError):
+        return Problem(404, "Deployment not found", str(e), None, None)
+    if isinstance(e, DatabaseConnectionError):
+        return Problem(503, "Database connection failed", str(e), None, None)
+    if isinstance(e, (InvalidSecretUrlError, SecretRetrievalError)):
+        return Problem(500, "Secret retrieval failed", str(e), None, None)
+    if isinstance(e, IncompleteConfigError):
+        return Problem(500, "Incomplete configuration", str(e), None, None)
+    if isinstance(e, ValueError):
+        return Problem(422, "Bad Request", str(e), None, None)
+    return Problem(500, "Internal server error", str(e), None, None)
+
+
+def problem_json(e: Exception, logger: Logger) -> str:
+    return json.dumps(build_problem(e, logger).to_dict(), default=str, ensure_ascii=False)
+
+
+def problem_response(problem: Problem) -> JSONResponse:
+    return JSONResponse(
+        json.loads(json.dumps(problem.to_dict(), default=str)),
+        status_code=problem.status,
+        media_type="application/problem+json",
+    )
+
+
+async def a_read_request(req: Request) -> tuple[dict, RagOrchestratorRequest]:
+    req_body = await req.json()
+    return req_body, RagOrchestratorRequest.model_validate(req_body)
+
+
+def bad_request(e: Exception) -> JSONResponse:
+    detail = e.errors() if isinstance(e, ValidationError) else f"Invalid JSON body: {str(e)}"
+    return problem_response(Problem(422, "Bad Request", detail, None, None))
+
+
+def check_settings() -> Optional[JSONResponse]:
+    try:
+        get_cqa_settings()
+        get_mistralai_settings()
+        get_mssql_settings()
+        get_openai_settings()
+        get_prompt_settings()
+        get_rerank_settings()
+        get_search_settings()
+        get_storage_settings()
+    except ValidationError as e:
+        return problem_response(Problem(500, "Invalid configuration", e.errors(), None, None))
+    return None
+
+
+@bp.route(route="rag/stream", auth_level=func.AuthLevel.FUNCTION, methods=["POST"])
+async def a_rag_orchestrator_stream(req: Request, context: func.Context):
+    try:
+        req_body, request = await a_read_request(req)
+    except Exception as e:
+        return bad_request(e)
+    invalid_configuration = check_settings()
+    if invalid_configuration:
+        return invalid_configuration
+    media_type = get_stream_media_type(req.headers.get("accept"))
+
+    async def a_generate():
+        with LoggerBuilder(__name__, context) as logger:
+            logger.info("Rag orchestrator stream request")
+
+            async def a_run() -> str:
+                consumer = await handle_access_control(req, logger, model_name=request.model_name)
+                logger.track_event(
+                    event_types.rag_orchestrator_requested_event,
+                    {
+                        "requestBody": json.dumps(req_body, ensure_ascii=False).encode("utf-8"),
+                        "callerService": consumer.name,
+                        "model_name": request.model_name,
+                    },
+                )
+                query_response = await a_get_query_response(request, logger, get_http_session(trust_env=True), consumer)
+                json_content = to_json(query_response)
+                logger.track_event(
+                    event_types.rag_orchestrator_performed_event,
+                    {"response-body": json_content.encode("utf-8"), "source": "CQA" if query_response.cqa_data else "LLM"},
+                )
+                return json_content
+
+            async for event in a_stream_events(a_run, media_type, lambda e: problem_json(e, logger)):
+                yield event
+
+    return StreamingResponse(a_generate(), media_type=media_type)
+
+
+@bp.route(route="query/stream", auth_level=func.AuthLevel.FUNCTION, methods=["POST"])
+async def a_query_stream(req: Request, context: func.Context):
+    try:
+        req_body, request = await a_read_request(req)
+    except Exception as e:
+        return bad_request(e)
+    invalid_configuration = check_settings()
+    if invalid_configuration:
+        return invalid_configuration
+    media_type = get_stream_media_type(req.headers.get("accept"))
+
+    async def a_generate():
+        with LoggerBuilder(__name__, context) as logger:
+            logger.info("Query stream request")
+
+            async def a_run() -> str:
+                consumer = await handle_access_control(req, logger)
+                logger.track_event(
+                    event_types.rag_query_requested_event,
+                    {"request-body": json.dumps(req_body, ensure_ascii=False).encode("utf-8")},
+                )
+                language_service = AiQueryServiceFactory.get_instance(request.llm_model_id)
+                session = get_http_session()
+                completion_prompt_data = await a_get_completion_prompt_data(request.prompts, logger, session)
+                if request.llm_model_id != completion_prompt_data.llm_model:
+                    raise requests.exceptions.HTTPError(
+                        "Bad Request: The request llm model id  is different from prompt editor llm model.",
+                        response=None,
+                    )
+                result = await language_service.a_do_query(request, completion_prompt_data, logger, session, consumer)
+                json_content = to_json(result)
+                logger.track_event(event_types.rag_query_performed_event, {"response-body": json_content.encode("utf-8")})
+                return json_content
+
+            async for event in a_stream_events(a_run, media_type, lambda e: problem_json(e, logger)):
+                yield event
+
+    return StreamingResponse(a_generate(), media_type=media_type)
+
+
+@bp.route(route="query/batch/stream", auth_level=func.AuthLevel.FUNCTION, methods=["POST"])
+async def a_batch_query_stream(req: Request, context: func.Context):
+    invalid_configuration = check_settings()
+    if invalid_configuration:
+        return invalid_configuration
+    settings = get_batch_query_settings()
+    items = parse_batch_lines((await req.body()).decode("utf-8").splitlines())
+    if len(items) == 0 or len(items) > settings.max_items:
+        return problem_response(
+            Problem(422, "Bad Request", f"The batch must contain between 1 and {settings.max_items} requests", None, None)
+        )
+
+    async def a_generate():
+        with LoggerBuilder(__name__, context) as logger:
+            logger.info("Batch query stream request")
+            logger.track_event(event_types.rag_batch_query_requested_event, {"items": len(items)})
+            failed = 0
+            async for item_result in a_run_batch(
+                items,
+                logger,
+                get_http_session(),
+                lambda request: handle_access_control(req, logger, model_name=request.model_name),
+                settings,
+            ):
+                failed += item_result.status != 200
+                yield item_result.to_json_line().encode("utf-8")
+            logger.track_event(event_types.rag_batch_query_performed_event, {"items": len(items), "failed": failed})
+
+    return StreamingResponse(a_generate(), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from functools import cache
+from typing import Callable, Optional
+
+from azure.core.credentials import AccessToken
+from azure.core.credentials_async import AsyncTokenCredential
+from azure.identity.aio import DefaultAzureCredential
+
+from utils.settings import get_aad_token_settings
+
+
+class AadTokenProvider:
+    """
+    Fornisce token Azure AD tenuti in memoria fino a poco prima della scadenza.
+
+    Il rinnovo è single-flight: le richieste concorrenti per lo stesso scope attendono
+    un'unica chiamata a get_token. La credenziale asincrona è legata all'event loop
+    su cui è stata creata, quindi viene ricreata se il loop cambia; i token restano validi.
+    """
+
+    def __init__(
+        self,
+        credential_factory: Callable[[], AsyncTokenCredential] = DefaultAzureCredential,
+        refresh_margin_seconds: int = 300,
+    ):
+        self.credential_factory = credential_factory
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self._credential: Optional[AsyncTokenCredential] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tokens: dict[str, AccessToken] = {}
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    def _is_valid(self, token: Optional[AccessToken]) -> bool:
+        return token is not None and token.expires_on - self.refresh_margin_seconds > time.time()
+
+    def get_credential(self) -> AsyncTokenCredential:
+        """
+        Credenziale condivisa del worker, per i client Azure SDK che richiedono da sé i token
+        (es. SecretClient). Non va chiusa dal chiamante.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._credential = None
+            self._refreshing = {}
+            self._loop = loop
+        if self._credential is None:
+            self._credential = self.credential_factory()
+        return self._credential
+
+    async def _a_refresh(self, credential: AsyncTokenCredential, scope: str) -> AccessToken:
+        try:
+            token = await credential.get_token(scope)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._refreshing.pop(scope, None)
+        self.refreshes += 1
+        self._tokens[scope] = token
+        return token
+
+    async def a_get_token(self, scope: str) -> str:
+        token = self._tokens.get(scope)
+        if self._is_valid(token):
+            self.hits += 1
+            return token.token
+
+        credential = self.get_credential()
+        task = self._refreshing.get(scope)
+        if task is None:
+            task = self._refreshing[scope] = asyncio.create_task(self._a_refresh(credential, scope))
+        # shield: la cancellazione di un chiamante non interrompe il rinnovo atteso dagli altri
+        return (await asyncio.shield(task)).token
+
+    def invalidate(self, scope: Optional[str] = None):
+        """
+        Da invocare se il servizio rifiuta un token (es. 401): senza argomenti scarta tutti i token.
+        """
+        if scope is None:
+            self._tokens.clear()
+        else:
+            self._tokens.pop(scope, None)
+
+    async def a_close(self):
+        if self._credential is not None and self._loop is asyncio.get_running_loop():
+            await self._credential.close()
+        self._credential = None
+        self._loop = None
+        self._refreshing = {}
+
+    def get_metrics(self) -> dict:
+        return {
+            "scopes": len(self._tokens),
+            "hits": self.hits,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+        }
+
+
+@cache
+def get_aad_token_provider() -> AadTokenProvider:
+    return AadTokenProvider(refresh_margin_seconds=get_aad_token_settings().refresh_margin_seconds)
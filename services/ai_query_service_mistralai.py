@@ -1,8 +1,9 @@
 from logging import Logger
+from typing import Optional
 
 from aiohttp import ClientSession
 from logics.ai_query_service_base import AiQueryServiceBase
-from logics.rag_query import a_execute_query
+from logics.rag_query import SpeculativeSearch, a_execute_query
 from models.apis.enrichment_query_response import EnrichmentQueryResponse
 from models.apis.prompt_editor_response_body import PromptEditorResponseBody
 from models.apis.rag_orchestrator_request import RagOrchestratorRequest
@@ -39,13 +40,15 @@ class AiQueryServiceMistralAI(AiQueryServiceBase):
                         logger: Logger,
                         session: ClientSession, 
                         consumer: LLMConsumer,
-                        domusData: str = None)-> RagQueryResponse:
+                        domusData: str = None,
+                        speculative_search: Optional[SpeculativeSearch] = None)-> RagQueryResponse:
         query_result = await a_execute_query(request,
                                              prompt_data,
                                              logger,
                                              session,
                                              consumer,
-                                             domusData=domusData)
+                                             domusData=domusData,
+                                             speculative_search=speculative_search)
         return query_result
     
     async def a_compute_classify_intent_query(self, request: RagOrchestratorRequest, prompt_data: PromptEditorResponseBody,
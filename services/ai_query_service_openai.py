@@ -1,8 +1,9 @@
+from typing import Optional
 from services.logging import Logger
 
 from aiohttp import ClientSession
 from logics.ai_query_service_base import AiQueryServiceBase
-from logics.rag_query import a_execute_query
+from logics.rag_query import SpeculativeSearch, a_execute_query
 from models.apis.prompt_editor_response_body import PromptEditorResponseBody
 from models.apis.rag_orchestrator_request import RagOrchestratorRequest
 from models.apis.enrichment_query_response import EnrichmentQueryResponse
@@ -43,8 +44,11 @@ class AiQueryServiceOpenAI(AiQueryServiceBase):
         session: ClientSession,
         consumer: LLMConsumer,
         domusData: str = None,
+        speculative_search: Optional[SpeculativeSearch] = None,
     ) -> RagQueryResponse:
-        query_result = await a_execute_query(request, prompt_data, logger, session, consumer, domusData)
+        query_result = await a_execute_query(
+            request, prompt_data, logger, session, consumer, domusData, speculative_search
+        )
         return query_result
 
     async def a_compute_classify_intent_query(
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import time
+from functools import cache
+from typing import Optional
+
+from services.logging import Logger
+from services.storage import a_get_blob_content_if_modified
+from utils.settings import get_mapping_cache_settings
+
+
+class _MappingEntry:
+    def __init__(self, items: list[dict], etag: Optional[str]):
+        self.items = items
+        self.etag = etag
+        self.checked_at = time.monotonic()
+        self.indexes: dict[str, dict[str, dict]] = {}
+
+
+def build_index(items: list[dict], key_field: str) -> dict[str, dict]:
+    """
+    Indicizza gli elementi della mappatura per key_field; a parità di chiave vale il primo,
+    come nella ricerca lineare che l'indice sostituisce.
+    """
+    index: dict[str, dict] = {}
+    for item in items:
+        key = item.get(key_field)
+        if key is not None:
+            index.setdefault(key, item)
+    return index
+
+
+class BlobMappingCache:
+    """
+    Cache dei file di mappatura JSON salvati su blob (tags_mapping.json, msd_tags_mapping.json).
+
+    Ogni blob viene scaricato una volta e indicizzato per i campi richiesti. Trascorsi
+    revalidate_seconds si verifica in background se il blob è cambiato con una GET condizionale
+    sull'ETag: se non è cambiato non viene riscaricato; se la verifica fallisce restano validi i dati presenti.
+    Gli elementi restituiti sono condivisi: i chiamanti non devono modificarli.
+    """
+
+    def __init__(self, revalidate_seconds: int = 60):
+        self.revalidate_seconds = revalidate_seconds
+        self._entries: dict[tuple[str, str], _MappingEntry] = {}
+        self._loading: dict[tuple[str, str], asyncio.Task] = {}
+        self.downloads = 0
+        self.not_modified = 0
+
+    async def _a_load(self, key: tuple[str, str]) -> _MappingEntry:
+        try:
+            entry = self._entries.get(key)
+            content, etag = await a_get_blob_content_if_modified(*key, entry.etag if entry else None)
+            if content is None:
+                self.not_modified += 1
+                entry.checked_at = time.monotonic()
+                return entry
+            self.downloads += 1
+            entry = self._entries[key] = _MappingEntry(json.loads(content), etag)
+            return entry
+        finally:
+            self._loading.pop(key, None)
+
+    def _start_load(self, key: tuple[str, str]) -> asyncio.Task:
+        task = self._loading.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = self._loading[key] = asyncio.create_task(self._a_load(key))
+        return task
+
+    @staticmethod
+    def _log_revalidation_error(logger: Logger, filename: str):
+        def callback(task: asyncio.Task):
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning(f"Revalidation of {filename} failed, serving cached mapping: {task.exception()}")
+
+        return callback
+
+    async def a_get_index(self, logger: Logger, container: str, filename: str, key_field: str) -> dict[str, dict]:
+        key = (container, filename)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = await asyncio.shield(self._start_load(key))
+        elif time.monotonic() - entry.checked_at > self.revalidate_seconds and key not in self._loading:
+            self._start_load(key).add_done_callback(self._log_revalidation_error(logger, filename))
+
+        index = entry.indexes.get(key_field)
+        if index is None:
+            index = entry.indexes[key_field] = build_index(entry.items, key_field)
+        return index
+
+    async def a_preload(self, container: str, filename: str):
+        await self._start_load((container, filename))
+
+    def invalidate(self, container: Optional[str] = None, filename: Optional[str] = None):
+        for key in list(self._entries):
+            if (container is None or key[0] == container) and (filename is None or key[1] == filename):
+                del self._entries[key]
+
+    def get_metrics(self) -> dict:
+        return {"mappings": len(self._entries), "downloads": self.downloads, "not_modified": self.not_modified}
+
+
+@cache
+def get_blob_mapping_cache() -> BlobMappingCache:
+    return BlobMappingCache(revalidate_seconds=get_mapping_cache_settings().revalidate_seconds)
+
+
+async def a_get_mapping_index(logger: Logger, container: str, filename: str, key_field: str) -> dict[str, dict]:
+    if get_mapping_cache_settings().enabled:
+        return await get_blob_mapping_cache().a_get_index(logger, container, filename, key_field)
+    content, _ = await a_get_blob_content_if_modified(container, filename)
+    return build_index(json.loads(content), key_field)
@@ -2,17 +2,21 @@ from functools import cache
 import json
 from services.logging import Logger
 from azure.core.credentials import AzureKeyCredential
-from azure.ai.language.questionanswering.aio import QuestionAnsweringClient
 from constants import event_types, environment
 from models.configurations.cqa import CQASettings
 from models.services.cqa_response import CQAResponse
-from services.storage import a_get_blob_content_from_container
+from services.blob_mapping_cache import a_get_mapping_index
+from services.cqa_answer_cache import MISSING, get_cqa_answer_cache
+from utils.settings import get_cqa_cache_settings
+from utils.lazy_import import lazy_import
+
+questionanswering_aio = lazy_import("azure.ai.language.questionanswering.aio")
  
 @cache
 def get_question_answering_client(key_credential: str,
                                   endpoint: str):
     credential = AzureKeyCredential(key_credential)
-    client = QuestionAnsweringClient(endpoint, credential)
+    client = questionanswering_aio.QuestionAnsweringClient(endpoint, credential)
     return client
 
 async def a_do_query(query: str, topic:str, logger: Logger)-> CQAResponse:
@@ -33,41 +37,56 @@ async def a_do_query(query: str, topic:str, logger: Logger)-> CQAResponse:
             logger.error(f"No project found for topic '{topic}' in CQA Mapping")
             return None
 
-        output = await client.get_answers(
-            question=query,
-            project_name=project_name,
-            deployment_name=deployment_name,
-            ranker_kind="QuestionOnly"
-        )
+        cache_enabled = get_cqa_cache_settings().enabled
+        if cache_enabled:
+            cached_response = get_cqa_answer_cache().get(project_name, deployment_name, query)
+            if cached_response is not MISSING:
+                logger.track_event(event_types.cqa_cache_hit,
+                                   {"question": query, "project": project_name, "answered": cached_response is not None})
+                return cached_response
 
-        logger.track_event(event_types.cqa_answer_event,
-                       {"question": query,
-                        "answer": json.dumps(output.serialize(), ensure_ascii=False).encode('utf-8')})
-        
-        # Verifico se la risposta è accettabile
-        if not output.answers[0] or output.answers[0].answer == str(settings.default_noresult_answer):
-            return None
-        
-        if output.answers[0].confidence < float(settings.confidence_threshold):
-            return None
-        
-        text_response = str(output.answers[0].answer)
-
-        # Rimuovo la proprietà answer perchè è duplicata
-        del output.answers[0].answer
-        
-        return CQAResponse(text_response,output.answers[0])
+        response = await a_get_answer(client, query, project_name, deployment_name, settings, logger)
+        if cache_enabled:
+            get_cqa_answer_cache().put(project_name, deployment_name, query, response)
+        return response
     except Exception as e:
         print("Error executing CQA query:", str(e))
         raise
+
+
+async def a_get_answer(client, query: str, project_name: str, deployment_name: str,
+                       settings: CQASettings, logger: Logger) -> CQAResponse:
+    output = await client.get_answers(
+        question=query,
+        project_name=project_name,
+        deployment_name=deployment_name,
+        ranker_kind="QuestionOnly"
+    )
+
+    logger.track_event(event_types.cqa_answer_event,
+                   {"question": query,
+                    "answer": json.dumps(output.serialize(), ensure_ascii=False).encode('utf-8')})
+    
+    # Verifico se la risposta è accettabile
+    if not output.answers[0] or output.answers[0].answer == str(settings.default_noresult_answer):
+        return None
     
+    if output.answers[0].confidence < float(settings.confidence_threshold):
+        return None
+    
+    text_response = str(output.answers[0].answer)
 
-async def a_get_cqa_project_by_topic(container_name: str,topic:str, logger: Logger)-> tuple:
-    file_content = await a_get_blob_content_from_container(container_name, environment.TAGS_MAPPING)
-    maps = json.loads(file_content)
-    for elemento in maps:
-        if elemento["ai_service"] == topic:
-            return elemento["cqa_project"], elemento["cqa_deployment"]
+    # Rimuovo la proprietà answer perchè è duplicata
+    del output.answers[0].answer
     
+    return CQAResponse(text_response,output.answers[0])
+
+
+async def a_get_cqa_project_by_topic(container_name: str,topic:str, logger: Logger)-> tuple:
+    maps = await a_get_mapping_index(logger, container_name, environment.TAGS_MAPPING, "ai_service")
+    elemento = maps.get(topic)
+    if elemento:
+        return elemento["cqa_project"], elemento["cqa_deployment"]
+
     logger.warning(f"Topic '{topic}' not found in CQA mapping")
     return None, None  
\ No newline at end of file
@@ -0,0 +1,73 @@
+import copy
+import time
+from collections import OrderedDict
+from functools import cache
+from typing import Optional
+
+from models.services.cqa_response import CQAResponse
+from services.embedding_cache import normalize_query
+from utils.settings import get_cqa_cache_settings
+
+# Distingue "nessuna voce in cache" da una voce che memorizza l'assenza di risposta (None)
+MISSING = object()
+
+
+class CqaAnswerCache:
+    """
+    Cache LRU delle risposte CQA per (progetto, deployment, domanda normalizzata).
+
+    Vengono memorizzati anche gli esiti senza risposta utilizzabile (None): per la stessa
+    domanda sullo stesso deployment il servizio restituirebbe lo stesso risultato fino al TTL.
+    Le risposte restituite sono copie.
+    """
+
+    def __init__(self, ttl_seconds: int = 600, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str, str], tuple[float, Optional[CQAResponse]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(project_name: str, deployment_name: str, question: str) -> tuple[str, str, str]:
+        return (project_name, deployment_name, normalize_query(question))
+
+    def get(self, project_name: str, deployment_name: str, question: str):
+        """
+        Restituisce la risposta memorizzata (eventualmente None) oppure MISSING.
+        """
+        key = self._key(project_name, deployment_name, question)
+        entry = self._entries.get(key)
+        if entry is not None:
+            created_at, response = entry
+            if time.monotonic() - created_at <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(response)
+            del self._entries[key]
+        self.misses += 1
+        return MISSING
+
+    def put(self, project_name: str, deployment_name: str, question: str, response: Optional[CQAResponse]):
+        key = self._key(project_name, deployment_name, question)
+        self._entries[key] = (time.monotonic(), copy.deepcopy(response))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, project_name: Optional[str] = None):
+        """
+        Da invocare dopo la pubblicazione di un progetto CQA: senza argomenti svuota l'intera cache.
+        """
+        for key in list(self._entries):
+            if project_name is None or key[0] == project_name:
+                del self._entries[key]
+
+    def get_metrics(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+@cache
+def get_cqa_answer_cache() -> CqaAnswerCache:
+    settings = get_cqa_cache_settings()
+    return CqaAnswerCache(ttl_seconds=settings.ttl_seconds, max_entries=settings.max_entries)
@@ -1,14 +1,20 @@
 from functools import cache
+from typing import TYPE_CHECKING
 from azure.core.credentials import AzureKeyCredential
-from azure.ai.documentintelligence.aio import DocumentIntelligenceClient
-from azure.ai.documentintelligence.models import AnalyzeResult
-from azure.ai.documentintelligence.models import AnalyzeDocumentRequest
 from tenacity import retry, stop_after_attempt, wait_exponential
+from utils.lazy_import import lazy_import
 from utils.settings import get_document_intelligence_settings
 
+if TYPE_CHECKING:
+    from azure.ai.documentintelligence.aio import DocumentIntelligenceClient
+    from azure.ai.documentintelligence.models import AnalyzeResult
+
+documentintelligence_aio = lazy_import("azure.ai.documentintelligence.aio")
+documentintelligence_models = lazy_import("azure.ai.documentintelligence.models")
+
 @cache
-def get_document_intelligence_client(endpoint, key) -> DocumentIntelligenceClient:
-    document_intelligence_client = DocumentIntelligenceClient(
+def get_document_intelligence_client(endpoint, key) -> "DocumentIntelligenceClient":
+    document_intelligence_client = documentintelligence_aio.DocumentIntelligenceClient(
         endpoint=endpoint, credential=AzureKeyCredential(key)
     )
     return document_intelligence_client
@@ -25,10 +31,10 @@ async def a_analyze_layout(url_source: str,
                                                                         settings.key)
     poller = await document_intelligence_client.begin_analyze_document(
         "prebuilt-layout", 
-        AnalyzeDocumentRequest(url_source=url_source),
+        documentintelligence_models.AnalyzeDocumentRequest(url_source=url_source),
         output_content_format=outputFormat)
 
-    result: AnalyzeResult = await poller.result()
+    result: "AnalyzeResult" = await poller.result()
 
     contentToReturn = result.content
 
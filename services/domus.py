@@ -41,7 +41,8 @@ async def a_get_form_applications_by_fiscal_code(request: DomusFormApplicationsB
     
         async with session.post(endpoint,
                         headers=headers,
-                        ssl=ssl_context if ssl_context is not None else None) as result:
+                        ssl=ssl_context if ssl_context is not None else None,
+                        raise_for_status=True) as result:
                 result_json = await result.json()
                 
                 logger.track_event(event_types.event_track_custom_cf, {"result_json_con Spazi": json.dumps(result_json)})
@@ -82,7 +83,8 @@ async def a_get_form_application_details(request: DomusFormApplicationDetailsReq
 
         async with session.post(endpoint,
                                 headers=headers,
-                                ssl=ssl_context if ssl_context is not None else None) as result:
+                                ssl=ssl_context if ssl_context is not None else None,
+                                raise_for_status=True) as result:
                 result_json = await result.json()
                 
                 logger.track_event(event_types.event_track_custom, {"result_json_con Spazi": json.dumps(result_json)})
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from functools import cache
+from typing import Any, Optional
+
+from utils.histogram import Histogram
+from utils.settings import get_embedding_batch_settings
+
+
+class _PendingBatch:
+    def __init__(self, loop: asyncio.AbstractEventLoop, embeddings: Any):
+        self.loop = loop
+        self.embeddings = embeddings
+        # Testi distinti in ordine di arrivo, con i chiamanti in attesa di ciascuno
+        self.waiters: dict[str, list[asyncio.Future]] = {}
+        self.enqueued_at: list[float] = []
+        self.timer: Optional[asyncio.Handle] = None
+
+
+class EmbeddingBatcher:
+    """
+    Raccoglie le richieste di embedding che arrivano entro max_wait_ms e le invia con una sola
+    chiamata aembed_documents (al massimo max_batch_size testi distinti), restituendo a ogni
+    chiamante il proprio vettore.
+
+    Le richieste vengono raggruppate per client di embedding (endpoint, deployment, chiave):
+    i client sono condivisi dal registry di services.llm_clients. Un batch di un solo testo usa aembed_query.
+
+    Se nessun altro batch è in corso la richiesta non attende max_wait_ms: il batch parte alla
+    successiva iterazione dell'event loop, raccogliendo solo le richieste arrivate nello stesso tick.
+    """
+
+    def __init__(self, max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max_wait_ms
+        self._pending: dict[tuple[int, int], _PendingBatch] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+        self.errors = 0
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64])
+        self.queue_wait_ms = Histogram([1, 2, 5, 10, 25, 50, 100])
+
+    async def a_embed(self, embeddings: Any, text: str) -> list[float]:
+        loop = asyncio.get_running_loop()
+        key = (id(loop), id(embeddings))
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch(loop, embeddings)
+            if self._tasks:
+                batch.timer = loop.call_later(self.max_wait_ms / 1000, self._flush, key)
+            else:
+                batch.timer = loop.call_soon(self._flush, key)
+
+        future = loop.create_future()
+        batch.waiters.setdefault(text, []).append(future)
+        batch.enqueued_at.append(time.monotonic())
+        if len(batch.waiters) >= self.max_batch_size:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key: tuple[int, int]):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        task = batch.loop.create_task(self._a_run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _a_run(self, batch: _PendingBatch):
+        started = time.monotonic()
+        for enqueued_at in batch.enqueued_at:
+            self.queue_wait_ms.observe((started - enqueued_at) * 1000)
+        texts = list(batch.waiters)
+        self.batch_sizes.observe(len(texts))
+        self.batches += 1
+
+        try:
+            if len(texts) == 1:
+                vectors = [await batch.embeddings.aembed_query(texts[0])]
+            else:
+                vectors = await batch.embeddings.aembed_documents(texts)
+        except Exception as e:
+            self.errors += 1
+            for futures in batch.waiters.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for text, vector in zip(texts, vectors):
+            for future in batch.waiters[text]:
+                # Il chiamante potrebbe essere stato cancellato nel frattempo
+                if not future.done():
+                    future.set_result(list(vector))
+
+    def get_metrics(self) -> dict:
+        return {
+            "batches": self.batches,
+            "errors": self.errors,
+            "pending": sum(len(batch.enqueued_at) for batch in self._pending.values()),
+            "batch_size": self.batch_sizes.to_dict(),
+            "queue_wait_ms": self.queue_wait_ms.to_dict(),
+        }
+
+
+@cache
+def get_embedding_batcher() -> EmbeddingBatcher:
+    settings = get_embedding_batch_settings()
+    return EmbeddingBatcher(max_batch_size=settings.max_batch_size, max_wait_ms=settings.max_wait_ms)
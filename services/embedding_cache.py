@@ -0,0 +1,128 @@
+import base64
+import hashlib
+import re
+import unicodedata
+from collections import OrderedDict
+from functools import cache
+from typing import Optional
+
+import numpy as np
+
+from services import redis as redis_service
+from services.logging import Logger
+from utils.settings import get_embedding_cache_settings
+
+_REDIS_KEY_PREFIX = "emb_"
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalizza il testo della domanda per il lookup: maiuscole/minuscole,
+    spazi multipli e punteggiatura finale non cambiano la chiave.
+    """
+    normalized = unicodedata.normalize("NFKC", text or "").casefold()
+    normalized = re.sub(r"\s+", " ", normalized).strip()
+    return normalized.rstrip("?!.;: ")
+
+
+def encode_vector(vector: list[float]) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def decode_vector(data: bytes) -> list[float]:
+    return np.frombuffer(data, dtype=np.float32).tolist()
+
+
+class EmbeddingCache:
+    """
+    Cache degli embedding delle domande, indicizzata per endpoint + deployment + testo normalizzato.
+
+    Primo livello: LRU in memoria con i vettori salvati come byte float32.
+    Secondo livello opzionale: Redis, condiviso tra le istanze della Function App
+    (il client Redis decodifica le risposte come stringhe, quindi i byte sono in base64).
+    Gli errori di Redis non bloccano la richiesta: si prosegue calcolando l'embedding.
+    """
+
+    def __init__(self, max_entries: int = 2048, redis_enabled: bool = False, redis_ttl_seconds: int = 86400):
+        self.max_entries = max_entries
+        self.redis_enabled = redis_enabled
+        self.redis_ttl_seconds = redis_ttl_seconds
+        self._vectors: OrderedDict[str, bytes] = OrderedDict()
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.redis_errors = 0
+
+    @staticmethod
+    def make_key(endpoint: str, deployment: str, text: str) -> str:
+        raw_key = f"{endpoint}|{deployment}|{normalize_query(text)}"
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def _store(self, key: str, data: bytes):
+        self._vectors[key] = data
+        self._vectors.move_to_end(key)
+        while len(self._vectors) > self.max_entries:
+            self._vectors.popitem(last=False)
+
+    async def a_get(self, logger: Optional[Logger], endpoint: str, deployment: str, text: str) -> Optional[list[float]]:
+        key = self.make_key(endpoint, deployment, text)
+        data = self._vectors.get(key)
+        if data is not None:
+            self._vectors.move_to_end(key)
+            self.hits += 1
+            return decode_vector(data)
+
+        if self.redis_enabled:
+            try:
+                encoded = await redis_service.get_redis_client().get(_REDIS_KEY_PREFIX + key)
+            except Exception as ex:
+                self.redis_errors += 1
+                if logger:
+                    logger.warning(f"Embedding cache: Redis lookup failed: {ex}")
+                encoded = None
+            if encoded:
+                data = base64.b64decode(encoded)
+                self._store(key, data)
+                self.redis_hits += 1
+                return decode_vector(data)
+
+        self.misses += 1
+        return None
+
+    async def a_set(self, logger: Optional[Logger], endpoint: str, deployment: str, text: str, vector: list[float]):
+        key = self.make_key(endpoint, deployment, text)
+        data = encode_vector(vector)
+        self._store(key, data)
+        if self.redis_enabled:
+            try:
+                await redis_service.get_redis_client().set(
+                    _REDIS_KEY_PREFIX + key, base64.b64encode(data).decode("ascii"), ex=self.redis_ttl_seconds
+                )
+            except Exception as ex:
+                self.redis_errors += 1
+                if logger:
+                    logger.warning(f"Embedding cache: Redis write failed: {ex}")
+
+    def clear(self):
+        self._vectors = OrderedDict()
+
+    def get_metrics(self) -> dict:
+        lookups = self.hits + self.redis_hits + self.misses
+        return {
+            "size": len(self._vectors),
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "redis_errors": self.redis_errors,
+            "hit_ratio": round((self.hits + self.redis_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+
+@cache
+def get_embedding_cache() -> EmbeddingCache:
+    settings = get_embedding_cache_settings()
+    return EmbeddingCache(
+        max_entries=settings.max_entries,
+        redis_enabled=settings.redis_enabled,
+        redis_ttl_seconds=settings.redis_ttl_seconds,
+    )
@@ -0,0 +1,168 @@
+import asyncio
+import atexit
+from functools import cache
+from typing import Optional
+
+import aiohttp
+from aiohttp.resolver import AsyncResolver
+
+from utils.settings import get_http_session_settings
+
+
+class HttpSessionManager:
+    """
+    Sessione aiohttp condivisa tra le invocazioni del worker.
+
+    Il connettore mantiene le connessioni keep-alive verso Azure AI Search, Prompt Editor e Domus
+    e mette in cache le risoluzioni DNS (via aiodns), così le richieste successive non rifanno
+    DNS, TCP e TLS. Come gli altri client asincroni, la sessione è legata all'event loop:
+    se il loop cambia, o la sessione è stata chiusa, ne viene creata una nuova.
+
+    La sessione non imposta raise_for_status: ogni chiamata lo indica se gli errori HTTP devono sollevare eccezioni.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 30.0,
+        ttl_dns_cache: int = 300,
+        connect_timeout: float = 30.0,
+        total_timeout: float = 300.0,
+        trust_env: bool = False,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self.connect_timeout = connect_timeout
+        self.total_timeout = total_timeout
+        self.trust_env = trust_env
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sessions_created = 0
+        self._requests = 0
+        self._request_errors = 0
+        self._connections_created = 0
+        self._connections_reused = 0
+        self._dns_cache_hits = 0
+        self._dns_cache_misses = 0
+
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self._requests += 1
+
+        async def on_request_exception(session, context, params):
+            self._request_errors += 1
+
+        async def on_connection_create_end(session, context, params):
+            self._connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self._connections_reused += 1
+
+        async def on_dns_cache_hit(session, context, params):
+            self._dns_cache_hits += 1
+
+        async def on_dns_cache_miss(session, context, params):
+            self._dns_cache_misses += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        try:
+            resolver = AsyncResolver()
+        except (ImportError, RuntimeError):
+            # aiodns non disponibile: si usa il resolver di default (thread pool)
+            resolver = None
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.ttl_dns_cache,
+            use_dns_cache=True,
+            resolver=resolver,
+        )
+        self._sessions_created += 1
+        return aiohttp.ClientSession(
+            connector=connector,
+            # sock_connect come il default di aiohttp: l'attesa di una connessione libera nel pool non è un timeout di connessione
+            timeout=aiohttp.ClientTimeout(total=self.total_timeout, sock_connect=self.connect_timeout),
+            trust_env=self.trust_env,
+            trace_configs=[self._build_trace_config()],
+        )
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """
+        Restituisce la sessione condivisa; va invocato all'interno dell'event loop.
+        I chiamanti non devono chiuderla.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = self._create_session()
+            self._loop = loop
+        return self._session
+
+    async def a_close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    def close_on_exit(self):
+        """
+        Chiusura alla terminazione del worker: possibile solo se il loop della sessione non è più in esecuzione.
+        """
+        loop = self._loop
+        if self._session is None or loop is None or loop.is_closed() or loop.is_running():
+            return
+        try:
+            loop.run_until_complete(self.a_close())
+        except Exception:
+            pass
+
+    def get_metrics(self) -> dict:
+        session = self._session
+        return {
+            "open": session is not None and not session.closed,
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "sessions_created": self._sessions_created,
+            "requests": self._requests,
+            "request_errors": self._request_errors,
+            "connections_created": self._connections_created,
+            "connections_reused": self._connections_reused,
+            "dns_cache_hits": self._dns_cache_hits,
+            "dns_cache_misses": self._dns_cache_misses,
+        }
+
+
+@cache
+def get_http_session_manager(trust_env: bool = False) -> HttpSessionManager:
+    """
+    trust_env: sessione che usa le impostazioni proxy dell'ambiente (usata dall'orchestratore); le altre no.
+    """
+    settings = get_http_session_settings()
+    manager = HttpSessionManager(
+        limit=settings.limit,
+        limit_per_host=settings.limit_per_host,
+        keepalive_timeout=settings.keepalive_timeout,
+        ttl_dns_cache=settings.ttl_dns_cache,
+        connect_timeout=settings.connect_timeout,
+        total_timeout=settings.total_timeout,
+        trust_env=trust_env,
+    )
+    atexit.register(manager.close_on_exit)
+    return manager
+
+
+def get_http_session(trust_env: bool = False) -> aiohttp.ClientSession:
+    return get_http_session_manager(trust_env).get_session()
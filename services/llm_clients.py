@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from functools import cache
+from typing import TYPE_CHECKING, Any, Callable, Optional, TypeVar
+
+from utils.lazy_import import lazy_import
+
+if TYPE_CHECKING:
+    from langchain_mistralai import ChatMistralAI
+    from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
+
+langchain_mistralai = lazy_import("langchain_mistralai")
+langchain_openai = lazy_import("langchain_openai")
+
+T = TypeVar("T")
+
+
+def key_hash(secret: Optional[str]) -> str:
+    """
+    Impronta della chiave API: la chiave non viene mai tenuta in chiaro nella chiave del registry.
+    """
+    return hashlib.sha256((secret or "").encode("utf-8")).hexdigest()[:16]
+
+
+class LlmClientRegistry:
+    """
+    Registry LRU dei client LLM di langchain.
+
+    Ogni client mantiene il proprio pool httpx: riutilizzandolo tra le richieste
+    (e tra consumer con le stesse credenziali) le connessioni keep-alive restano aperte.
+    Quando una chiave ruota il nuovo client prende il posto del meno usato.
+    I client asincroni sono legati all'event loop: se il loop cambia il registry si svuota.
+    """
+
+    def __init__(self, max_size: int = 16):
+        self.max_size = max_size
+        self._clients: OrderedDict[tuple, Any] = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple, factory: Callable[[], T]) -> T:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not self._loop:
+            self._clients = OrderedDict()
+            self._loop = loop
+
+        client = self._clients.get(key)
+        if client is not None:
+            self._clients.move_to_end(key)
+            self.hits += 1
+            return client
+
+        self.misses += 1
+        client = factory()
+        self._clients[key] = client
+        while len(self._clients) > self.max_size:
+            self._clients.popitem(last=False)
+            self.evictions += 1
+        return client
+
+    def clear(self):
+        self._clients = OrderedDict()
+
+    def get_metrics(self) -> dict:
+        return {
+            "size": len(self._clients),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+@cache
+def get_llm_client_registry() -> LlmClientRegistry:
+    return LlmClientRegistry()
+
+
+def get_azure_chat_openai(
+    endpoint: str,
+    deployment: str,
+    api_version: str,
+    api_key: str,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    timeout: float = 30,
+) -> "AzureChatOpenAI":
+    """
+    Restituisce un AzureChatOpenAI che condivide il client HTTP con le altre richieste
+    verso lo stesso deployment. temperature e max_tokens variano per prompt, quindi
+    si applicano su una copia leggera del client condiviso.
+    """
+    key = ("azure_chat_openai", endpoint, deployment, api_version, key_hash(api_key), timeout)
+    llm = get_llm_client_registry().get(
+        key,
+        lambda: langchain_openai.AzureChatOpenAI(
+            azure_endpoint=endpoint,
+            azure_deployment=deployment,
+            api_version=api_version,
+            api_key=api_key,
+            timeout=timeout,
+        ),
+    )
+    return llm.model_copy(update={"temperature": temperature, "max_tokens": max_tokens})
+
+
+def get_azure_openai_embeddings(endpoint: str, deployment: str, api_version: str, api_key: str) -> "AzureOpenAIEmbeddings":
+    key = ("azure_openai_embeddings", endpoint, deployment, api_version, key_hash(api_key))
+    return get_llm_client_registry().get(
+        key,
+        lambda: langchain_openai.AzureOpenAIEmbeddings(
+            azure_endpoint=endpoint,
+            azure_deployment=deployment,
+            api_key=api_key,
+            api_version=api_version,
+            check_embedding_ctx_length=False,
+        ),
+    )
+
+
+def get_chat_mistralai(
+    endpoint: str,
+    api_key: str,
+    model: str,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    timeout: int = 120,
+) -> "ChatMistralAI":
+    """
+    Come get_azure_chat_openai: un ChatMistralAI condiviso per endpoint/modello/chiave
+    e una copia leggera per i parametri del prompt.
+    """
+    key = ("chat_mistralai", endpoint, model, key_hash(api_key), timeout)
+    llm = get_llm_client_registry().get(
+        key,
+        lambda: langchain_mistralai.ChatMistralAI(endpoint=endpoint, api_key=api_key, model_name=model, timeout=timeout),
+    )
+    return llm.model_copy(update={"temperature": temperature, "max_tokens": max_tokens})
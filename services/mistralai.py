@@ -3,10 +3,7 @@ import json
 from services.logging import Logger
 from typing import List
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_mistralai import ChatMistralAI
 from langchain_core.output_parsers.pydantic import PydanticOutputParser
-from langchain_openai import AzureChatOpenAI
-from openai import APIConnectionError
 from exceptions.custom_exceptions import CustomPromptParameterError
 from models.apis.enrichment_query_response import EnrichmentQueryResponse
 from models.apis.prompt_editor_response_body import PromptEditorResponseBody
@@ -15,10 +12,15 @@ from models.services.openai_domus_response import DomusAnswerResponse
 from models.services.openai_intent_response import ClassifyIntentResponse
 from models.services.openai_rag_response import RagResponse, RagResponseOutputParser
 import constants.event_types as event_types
+from services.llm_clients import get_chat_mistralai
 from services.openai import a_resolve_template, check_prompt_variables
 from services.prompt_editor import build_prompt_messages
+from services.token_stream import a_stream_rag_answer, get_token_stream
 from utils.settings import get_mistralai_settings
 from constants import llm as llm_const
+from utils.lazy_import import lazy_import
+
+openai_sdk = lazy_import("openai")
 
 
 async def a_get_answer_from_context(question: str, lang: str,
@@ -50,11 +52,11 @@ async def a_get_answer_from_context(question: str, lang: str,
 
     prompt = ChatPromptTemplate.from_messages(prompt_messages)
 
-    llm = ChatMistralAI(endpoint=settings.endpoint,
-                        api_key=settings.key,
-                        model_name=settings.model,
-                        temperature=prompt_data.model_parameters.temperature,
-                        max_tokens=prompt_data.model_parameters.max_length)
+    llm = get_chat_mistralai(endpoint=settings.endpoint,
+                             api_key=settings.key,
+                             model=settings.model,
+                             temperature=prompt_data.model_parameters.temperature,
+                             max_tokens=prompt_data.model_parameters.max_length)
 
     chain = prompt | llm.with_retry()
 
@@ -71,7 +73,11 @@ async def a_get_answer_from_context(question: str, lang: str,
     logger.track_event(event_types.llm_answer_generation_mistralai_request,
                        data_to_log)
 
-    prompt_and_model_result = await chain.ainvoke(dict_langchain_variables)
+    token_stream = get_token_stream()
+    if token_stream:
+        prompt_and_model_result = await a_stream_rag_answer(prompt | llm, dict_langchain_variables, token_stream)
+    else:
+        prompt_and_model_result = await chain.ainvoke(dict_langchain_variables)
 
     logger.track_event(event_types.llm_answer_generation_response_event,
                        {"answer": prompt_and_model_result.json(ensure_ascii=False).encode('utf-8')})
@@ -117,12 +123,12 @@ async def a_get_enriched_query(question: str,
 
     prompt = ChatPromptTemplate.from_messages(prompt_messages)
 
-    llm = ChatMistralAI(endpoint=settings.endpoint,
-                        api_key=settings.key,
-                        model_name=settings.model,
-                        temperature=prompt_data.model_parameters.temperature,
-                        max_tokens=prompt_data.model_parameters.max_length,
-                        timeout=30)
+    llm = get_chat_mistralai(endpoint=settings.endpoint,
+                             api_key=settings.key,
+                             model=settings.model,
+                             temperature=prompt_data.model_parameters.temperature,
+                             max_tokens=prompt_data.model_parameters.max_length,
+                             timeout=30)
 
     chain = prompt | llm.with_retry()
 
@@ -146,7 +152,7 @@ async def a_get_enriched_query(question: str,
         result_content_parser = PydanticOutputParser(
             pydantic_object=EnrichmentQueryResponse)
         result_content = await result_content_parser.ainvoke(prompt_and_model_result)
-    except APIConnectionError as e:
+    except openai_sdk.APIConnectionError as e:
         logger.exception(f"APIConnectionError: {e}")
         result_content = EnrichmentQueryResponse(standalone_question="",
                                                  end_conversation=True,
@@ -193,12 +199,12 @@ async def a_get_intent_from_enriched_query(question: str,
 
     prompt = ChatPromptTemplate.from_messages(prompt_messages)
 
-    llm = ChatMistralAI(endpoint=settings.endpoint,
-                        api_key=settings.key,
-                        model_name=settings.model,
-                        temperature=prompt_data.model_parameters.temperature,
-                        max_tokens=prompt_data.model_parameters.max_length,
-                        timeout=30)
+    llm = get_chat_mistralai(endpoint=settings.endpoint,
+                             api_key=settings.key,
+                             model=settings.model,
+                             temperature=prompt_data.model_parameters.temperature,
+                             max_tokens=prompt_data.model_parameters.max_length,
+                             timeout=30)
 
     chain = prompt | llm.with_retry()
 
@@ -255,12 +261,12 @@ async def a_get_answer_from_domus(question: str,
 
     prompt = ChatPromptTemplate.from_messages(prompt_messages)
 
-    llm = ChatMistralAI(endpoint=settings.endpoint,
-                        api_key=settings.key,
-                        model_name=settings.model,
-                        temperature=prompt_data.model_parameters.temperature,
-                        max_tokens=prompt_data.model_parameters.max_length,
-                        timeout=30)
+    llm = get_chat_mistralai(endpoint=settings.endpoint,
+                             api_key=settings.key,
+                             model=settings.model,
+                             temperature=prompt_data.model_parameters.temperature,
+                             max_tokens=prompt_data.model_parameters.max_length,
+                             timeout=30)
 
     chain = prompt | llm.with_retry()
 
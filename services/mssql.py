@@ -1,14 +1,52 @@
+from functools import cache
+from typing import Optional
 from services.logging import Logger
 
-from aioodbc import create_pool
 from models.apis.rag_orchestrator_request import PromptEditorCredential
 from models.services.mssql_tag import MsSqlTag
-from utils.settings import get_mssql_settings
+from services.mssql_pool import get_mssql_pool
+from services.mssql_tag_cache import MsSqlTagCache
+from services.prompt_cache import get_prompt_cache
+from services.semantic_answer_cache import get_semantic_answer_cache
+from utils.settings import get_prompt_cache_settings, get_tag_cache_settings
+
+
+@cache
+def get_tag_cache() -> MsSqlTagCache:
+    settings = get_tag_cache_settings()
+    return MsSqlTagCache(
+        a_query_all_tags,
+        a_query_tags_by_tag_names,
+        ttl_seconds=settings.ttl_seconds,
+        negative_ttl_seconds=settings.negative_ttl_seconds,
+    )
+
+
+def invalidate_tags_cache(tag_names: Optional[list[str]] = None):
+    """
+    Da invocare dopo una modifica di dbo.Tags: senza argomenti svuota l'intera cache.
+    Le risposte in cache semantica dei tag modificati non sono più valide e vengono rimosse.
+    """
+    get_tag_cache().invalidate(tag_names)
+    get_semantic_answer_cache().invalidate(tag_names)
 
 
 async def a_get_tags_by_tag_names(logger: Logger, tag_names: list[str]) -> list[MsSqlTag]:
-    settings = get_mssql_settings()
+    if not get_tag_cache_settings().enabled:
+        return await a_query_tags_by_tag_names(logger, tag_names)
+    return await get_tag_cache().a_get(logger, tag_names)
+
+
+async def a_query_tags_by_tag_names(logger: Logger, tag_names: list[str]) -> list[MsSqlTag]:
     tags_filter = ",".join(["'" + str(x) + "'" for x in tag_names])
+    return await _a_query_tags(logger, f"WHERE [Name] IN ({tags_filter})")
+
+
+async def a_query_all_tags(logger: Logger) -> list[MsSqlTag]:
+    return await _a_query_tags(logger, "")
+
+
+async def _a_query_tags(logger: Logger, where_clause: str) -> list[MsSqlTag]:
     sql_query = f"""
     SELECT [Name]
     ,[Description]
@@ -16,93 +54,105 @@ async def a_get_tags_by_tag_names(logger: Logger, tag_names: list[str]) -> list[
     ,[EnableEnrichment]
     ,[IdMonitoringQuestion]
     FROM [dbo].[Tags]
-    WHERE [Name] IN ({tags_filter})
+    {where_clause}
     """
     tags_to_return: list[MsSqlTag] = []
     logger.info(f"before a_get_tags_by_tag_names")
     try:
-        async with create_pool(dsn=settings.connection_string, minsize=1) as pool:
-            async with pool.acquire() as conn:
-                logger.info(f"connection established")
-                async with conn.cursor() as cursor:
-                    await cursor.execute(sql_query)
-                    records = await cursor.fetchall()
-                    for r in records:
-                        tags_to_return.append(MsSqlTag(
-                        r.Name, 
-                        r.Description, 
-                        r.EnableCQA,
-                        r.EnableEnrichment,
-                        r.IdMonitoringQuestion))
-
-            logger.info(f"after a_get_tags_by_tag_names")
-            return tags_to_return
+        async with get_mssql_pool().acquire() as conn:
+            logger.info(f"connection established")
+            async with conn.cursor() as cursor:
+                await cursor.execute(sql_query)
+                records = await cursor.fetchall()
+                for r in records:
+                    tags_to_return.append(MsSqlTag(
+                    r.Name, 
+                    r.Description, 
+                    r.EnableCQA,
+                    r.EnableEnrichment,
+                    r.IdMonitoringQuestion))
+
+        logger.info(f"after a_get_tags_by_tag_names")
+        return tags_to_return
     except Exception as ex:
         logger.exception(ex)
         raise ex
 
 async def a_get_prompt_info(logger: Logger, tag_name: str, type_filters: list[str], llm_id: str) -> list[PromptEditorCredential]:
+    if not get_prompt_cache_settings().enabled:
+        return await a_query_prompt_info(logger, tag_name, type_filters, llm_id)
+
+    prompt_cache = get_prompt_cache()
+    prompt_version_infos = prompt_cache.get_prompt_info(tag_name, llm_id, type_filters)
+    if prompt_version_infos is not None:
+        logger.info("a_get_prompt_info served from cache")
+        return prompt_version_infos
+
+    prompt_version_infos = await a_query_prompt_info(logger, tag_name, type_filters, llm_id)
+    if prompt_cache.set_prompt_info(tag_name, llm_id, type_filters, prompt_version_infos):
+        # Nuova versione dei prompt del tag: le risposte generate con la precedente vengono rimosse
+        get_semantic_answer_cache().invalidate([tag_name])
+    return prompt_version_infos
+
+async def a_query_prompt_info(logger: Logger, tag_name: str, type_filters: list[str], llm_id: str) -> list[PromptEditorCredential]:
     logger.info("before a_get_prompt_info")
-    settings = get_mssql_settings()
     try:
-        async with create_pool(dsn=settings.connection_string, minsize=1) as pool:
-            async with pool.acquire() as conn:
-                logger.info("connection established")
-                async with conn.cursor() as cursor:
-                    # Trasmormo l'array in una lista di valori separati da rigola
-                    type_filters_str = ','.join(f"{type_}" for type_ in type_filters)
-                    
-                    sql_query = f"""
-                    WITH FilteredRows AS (
-                        SELECT 
-                            PromptDetails.ID,
-                            PromptId,
-                            PromptVersion,
-                            PromptType,
-                            TagName,
-                            ROW_NUMBER() OVER (
-                                PARTITION BY PromptType 
-                                ORDER BY CASE 
-                                    WHEN TagName = ? THEN 1 
-                                    WHEN TagName IS NULL THEN 2 
-                                    ELSE 3
-                                END
-                            ) AS RowNum
-                        FROM PromptDetails JOIN
-                        Llms ON PromptDetails.LlmId = Llms.Id
-                        WHERE PromptType IN (SELECT value FROM STRING_SPLIT('{type_filters_str}', ','))
-                        AND Llms.Code = ?
-                    )
+        async with get_mssql_pool().acquire() as conn:
+            logger.info("connection established")
+            async with conn.cursor() as cursor:
+                # Trasmormo l'array in una lista di valori separati da rigola
+                type_filters_str = ','.join(f"{type_}" for type_ in type_filters)
+                
+                sql_query = f"""
+                WITH FilteredRows AS (
                     SELECT 
-                        PromptId, PromptVersion, PromptType
-                    FROM 
-                        FilteredRows
-                    WHERE 
-                        RowNum = 1;
-                    """
-                    
-                    # Eseguo...
-                    await cursor.execute(sql_query, tag_name, llm_id)
-                    
-                    # Itera sui risultati e costruisce la lista da restituire
-                    prompt_version_infos = []
-                    async for record in cursor:
-                        prompt_version_infos.append(
-                            PromptEditorCredential(
-                                id=record.PromptId,
-                                version=record.PromptVersion,
-                                type=record.PromptType,
-                            )
+                        PromptDetails.ID,
+                        PromptId,
+                        PromptVersion,
+                        PromptType,
+                        TagName,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY PromptType 
+                            ORDER BY CASE 
+                                WHEN TagName = ? THEN 1 
+                                WHEN TagName IS NULL THEN 2 
+                                ELSE 3
+                            END
+                        ) AS RowNum
+                    FROM PromptDetails JOIN
+                    Llms ON PromptDetails.LlmId = Llms.Id
+                    WHERE PromptType IN (SELECT value FROM STRING_SPLIT('{type_filters_str}', ','))
+                    AND Llms.Code = ?
+                )
+                SELECT 
+                    PromptId, PromptVersion, PromptType
+                FROM 
+                    FilteredRows
+                WHERE 
+                    RowNum = 1;
+                """
+                
+                # Eseguo...
+                await cursor.execute(sql_query, tag_name, llm_id)
+                
+                # Itera sui risultati e costruisce la lista da restituire
+                prompt_version_infos = []
+                async for record in cursor:
+                    prompt_version_infos.append(
+                        PromptEditorCredential(
+                            id=record.PromptId,
+                            version=record.PromptVersion,
+                            type=record.PromptType,
                         )
-                    
-                    logger.info("after a_get_prompt_info")
-                    return prompt_version_infos
+                    )
+                
+                logger.info("after a_get_prompt_info")
+                return prompt_version_infos
     except Exception as ex:
         logger.exception(ex)
         raise ex
 
 async def a_check_status_tag_for_mst(logger: Logger, tag_name: str, status: bool) -> bool:
-    settings = get_mssql_settings()
     sql_query = f"""
     SELECT IdMonitoringQuestion
     FROM [dbo].[Tags]
@@ -110,14 +160,13 @@ async def a_check_status_tag_for_mst(logger: Logger, tag_name: str, status: bool
     """
     logger.info(f"before a_check_status_tag_for_mst")
     try:
-        async with create_pool(dsn=settings.connection_string, minsize=1) as pool:
-            async with pool.acquire() as conn:
-                    logger.info(f"connection established")
-                    async with conn.cursor() as cursor:
-                        await cursor.execute(sql_query)
-                        records = await cursor.fetchall()
-                        logger.info(f"after a_check_status_tag_for_mst")
-                        return len(records) > 0
+        async with get_mssql_pool().acquire() as conn:
+            logger.info(f"connection established")
+            async with conn.cursor() as cursor:
+                await cursor.execute(sql_query)
+                records = await cursor.fetchall()
+                logger.info(f"after a_check_status_tag_for_mst")
+                return len(records) > 0
     except Exception as ex:
         logger.exception(ex)
         raise ex    
\ No newline at end of file
@@ -0,0 +1,162 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from functools import cache
+from typing import AsyncIterator, Optional
+
+import pyodbc
+from aioodbc import Connection, Pool, create_pool
+
+from utils.settings import get_mssql_settings
+
+# SQLSTATE che indicano una connessione non più utilizzabile (classe 08 + timeout)
+_CONNECTION_SQLSTATES = ("HYT00", "HYT01")
+
+
+def is_connection_error(ex: Exception) -> bool:
+    """
+    True se l'eccezione indica che la connessione ODBC è compromessa
+    e deve essere scartata invece che restituita al pool.
+    """
+    if isinstance(ex, (pyodbc.OperationalError, pyodbc.InterfaceError)):
+        return True
+    if isinstance(ex, pyodbc.Error) and len(ex.args) > 0:
+        sqlstate = str(ex.args[0])
+        return sqlstate.startswith("08") or sqlstate in _CONNECTION_SQLSTATES
+    return False
+
+
+class MsSqlPool:
+    """
+    Pool aioodbc condiviso tra le invocazioni del worker.
+
+    Il pool viene creato alla prima acquisizione e ricreato solo se cambia
+    l'event loop (riavvio host, test) o se è stato chiuso esplicitamente.
+    Le connessioni che falliscono il ping o sollevano errori di connessione
+    vengono chiuse, così il pool ne apre di nuove al posto loro.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        minsize: int = 1,
+        maxsize: int = 10,
+        pool_recycle: int = -1,
+        pre_ping: bool = True,
+    ):
+        self.dsn = dsn
+        self.minsize = minsize
+        self.maxsize = maxsize
+        self.pool_recycle = pool_recycle
+        self.pre_ping = pre_ping
+        self._pool: Optional[Pool] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._pools_created = 0
+        self._acquired = 0
+        self._errors = 0
+        self._recycled = 0
+        self._acquire_wait_ms_total = 0.0
+
+    async def _a_get_pool(self) -> Pool:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Un pool è legato all'event loop su cui è stato creato
+            self._pool = None
+            self._lock = asyncio.Lock()
+            self._loop = loop
+
+        if self._pool is None or self._pool.closed:
+            async with self._lock:
+                if self._pool is None or self._pool.closed:
+                    self._pool = await create_pool(
+                        dsn=self.dsn,
+                        minsize=self.minsize,
+                        maxsize=self.maxsize,
+                        pool_recycle=self.pool_recycle,
+                    )
+                    self._pools_created += 1
+        return self._pool
+
+    async def _a_discard(self, conn: Connection):
+        self._recycled += 1
+        try:
+            await conn.close()
+        except pyodbc.Error:
+            pass
+
+    async def _a_ping(self, conn: Connection) -> bool:
+        try:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT 1")
+                await cursor.fetchone()
+            return True
+        except pyodbc.Error:
+            return False
+
+    async def _a_acquire_healthy(self, pool: Pool) -> Connection:
+        conn = await pool.acquire()
+        if not self.pre_ping or await self._a_ping(conn):
+            return conn
+
+        # Connessione caduta mentre era inattiva: la scarto e ne chiedo una nuova
+        await self._a_discard(conn)
+        await pool.release(conn)
+        return await pool.acquire()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Connection]:
+        """
+        Acquisisce una connessione dal pool condiviso e la restituisce all'uscita.
+        """
+        pool = await self._a_get_pool()
+        started = time.perf_counter()
+        conn = await self._a_acquire_healthy(pool)
+        self._acquire_wait_ms_total += (time.perf_counter() - started) * 1000
+        self._acquired += 1
+        try:
+            yield conn
+        except Exception as ex:
+            self._errors += 1
+            if is_connection_error(ex):
+                await self._a_discard(conn)
+            raise
+        finally:
+            await pool.release(conn)
+
+    async def a_close(self):
+        if self._pool is not None and not self._pool.closed:
+            self._pool.close()
+            await self._pool.wait_closed()
+        self._pool = None
+
+    def get_metrics(self) -> dict:
+        pool = self._pool
+        return {
+            "size": pool.size if pool else 0,
+            "freesize": pool.freesize if pool else 0,
+            "minsize": self.minsize,
+            "maxsize": self.maxsize,
+            "pools_created": self._pools_created,
+            "acquired": self._acquired,
+            "errors": self._errors,
+            "recycled": self._recycled,
+            "acquire_wait_ms_avg": (
+                round(self._acquire_wait_ms_total / self._acquired, 3) if self._acquired else 0.0
+            ),
+        }
+
+
+@cache
+def get_mssql_pool() -> MsSqlPool:
+    """
+    Restituisce il pool condiviso per la connection string AZURE_SQL_CONNECTION_STRING
+    """
+    settings = get_mssql_settings()
+    return MsSqlPool(
+        settings.connection_string,
+        minsize=settings.pool_minsize,
+        maxsize=settings.pool_maxsize,
+        pool_recycle=settings.pool_recycle_seconds,
+        pre_ping=settings.pool_pre_ping,
+    )
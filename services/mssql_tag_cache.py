@@ -0,0 +1,127 @@
+import asyncio
+import time
+from dataclasses import replace
+from typing import Awaitable, Callable, Optional
+
+from models.services.mssql_tag import MsSqlTag
+from services.logging import Logger
+from utils.single_flight_cache import SingleFlightCache
+
+
+class MsSqlTagCache:
+    """
+    Cache in memoria delle righe di dbo.Tags.
+
+    Alla prima richiesta carica tutti i tag in blocco; scaduto il TTL continua a
+    servire i dati presenti e li aggiorna in background. Se SQL non risponde
+    durante l'aggiornamento restano validi i dati precedenti.
+    Le richieste concorrenti a cache vuota attendono un unico caricamento; i tag
+    inesistenti sono memorizzati per negative_ttl_seconds, senza rifare la query.
+    I tag restituiti sono copie: l'orchestratore li modifica in base alla request.
+    """
+
+    def __init__(
+        self,
+        a_load_all: Callable[[Logger], Awaitable[list[MsSqlTag]]],
+        a_load_by_names: Callable[[Logger, list[str]], Awaitable[list[MsSqlTag]]],
+        ttl_seconds: int = 300,
+        negative_ttl_seconds: int = 30,
+    ):
+        self._a_load_all = a_load_all
+        self._a_load_by_names = a_load_by_names
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._tags: dict[str, MsSqlTag] = {}
+        # Tag non trovati su SQL, con la scadenza dell'informazione
+        self._unknown: dict[str, float] = {}
+        # Solo single-flight: il risultato vive in self._tags, non nella cache
+        self._initial_load = SingleFlightCache(ttl_seconds=0)
+        self._loaded_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(tag_name: str) -> str:
+        return str(tag_name).lower()
+
+    def _is_expired(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    def _store(self, tags: list[MsSqlTag]):
+        for tag in tags:
+            self._tags[self._key(tag.name)] = tag
+            self._unknown.pop(self._key(tag.name), None)
+
+    def _is_unknown(self, key: str) -> bool:
+        expires_at = self._unknown.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            del self._unknown[key]
+            return False
+        return True
+
+    async def a_preload(self, logger: Logger):
+        """
+        Carica tutti i tag, sostituendo il contenuto della cache.
+        """
+        tags = await self._a_load_all(logger)
+        self._tags = {}
+        self._store(tags)
+        self._loaded_at = time.monotonic()
+
+    async def _a_refresh(self, logger: Logger):
+        try:
+            await self.a_preload(logger)
+        except Exception as ex:
+            logger.warning(f"Tag cache refresh failed, serving stale data: {ex}")
+
+    def _schedule_refresh(self, logger: Logger):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._a_refresh(logger))
+
+    async def a_get(self, logger: Logger, tag_names: list[str]) -> list[MsSqlTag]:
+        if self._loaded_at is None:
+            await self._initial_load.a_get("all", lambda: self.a_preload(logger))
+        elif self._is_expired():
+            self._schedule_refresh(logger)
+
+        tags: list[MsSqlTag] = []
+        missing: list[str] = []
+        for tag_name in tag_names:
+            tag = self._tags.get(self._key(tag_name))
+            if tag:
+                tags.append(replace(tag))
+            elif not self._is_unknown(self._key(tag_name)):
+                missing.append(tag_name)
+
+        if missing:
+            # Tag creati dopo l'ultimo caricamento: li cerco puntualmente
+            try:
+                loaded = await self._a_load_by_names(logger, missing)
+            except Exception as ex:
+                if len(tags) == 0:
+                    raise
+                logger.warning(f"Tag lookup for {missing} failed, serving cached tags only: {ex}")
+                return tags
+            self._store(loaded)
+            tags.extend(replace(tag) for tag in loaded)
+            found = {self._key(tag.name) for tag in loaded}
+            expires_at = time.monotonic() + self.negative_ttl_seconds
+            for tag_name in missing:
+                if self._key(tag_name) not in found:
+                    self._unknown[self._key(tag_name)] = expires_at
+
+        return tags
+
+    def invalidate(self, tag_names: Optional[list[str]] = None):
+        """
+        Invalida i tag indicati, oppure l'intera cache se tag_names è None.
+        """
+        if tag_names is None:
+            self._tags = {}
+            self._unknown = {}
+            self._loaded_at = None
+            return
+        for tag_name in tag_names:
+            self._tags.pop(self._key(tag_name), None)
+            self._unknown.pop(self._key(tag_name), None)
@@ -1,30 +1,46 @@
+import asyncio
 from dataclasses import asdict
 import json
+import time
+import aiohttp
 from models.apis.rag_orchestrator_request import Interaction
 from models.configurations.llm_consumer import LLMConsumer
 from services.logging import Logger
-from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers.pydantic import PydanticOutputParser
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from openai import APIConnectionError
 from exceptions.custom_exceptions import CustomPromptParameterError
 from models.apis.enrichment_query_response import EnrichmentQueryResponse
 from models.apis.prompt_editor_response_body import PromptEditorResponseBody
+from models.apis.prompt_template_response_body import TemplateResolveResponse
 from models.services.llm_context_document import LlmContextContent
 from models.services.openai_domus_response import DomusAnswerResponse
 from models.services.openai_intent_response import ClassifyIntentResponse
 from models.services.openai_rag_response import RagResponse, RagResponseOutputParser
 import constants.event_types as event_types
 import constants.llm as llm_const
+from services.embedding_batcher import get_embedding_batcher
+from services.embedding_cache import get_embedding_cache
+from services.http_session import get_http_session
+from services.llm_clients import get_azure_chat_openai, get_azure_openai_embeddings
 from services.prompt_editor import a_get_prompt_from_resolve_jinja_template_api, build_prompt_messages
-from utils.settings import get_openai_settings
+from services.template_renderer import UnsupportedTemplateError, get_template_renderer
+from services.token_stream import a_stream_rag_answer, get_token_stream
+from utils.lazy_import import lazy_import
+from utils.settings import (
+    get_embedding_batch_settings,
+    get_embedding_cache_settings,
+    get_openai_settings,
+    get_prompt_settings,
+)
 
 #Bypassa il passaggio del "Context" che genera un errore bloccante su python>=3.12
 import langchain_core.runnables.utils as asyncioord
 asyncioord.asyncio_accepts_context = lambda: False
 
+openai_sdk = lazy_import("openai")
+
 # --- SOLUZIONE NON SICURA: SOLO PER SVILUPPO, MAI IN PRODUZIONE ---
 # Crea un client HTTPX che non verifica i certificati SSL
 # Questo è l'equivalente di verify=False
@@ -37,7 +53,8 @@ async def a_generate_embedding_from_text(
     text: str, 
     deployment_model: Optional[str] = None,
     api_version: Optional[str] = None,
-    secret: Optional[str] = None
+    secret: Optional[str] = None,
+    logger: Optional[Logger] = None,
 ):
     """
     Generate an embedding from text
@@ -47,6 +64,7 @@ async def a_generate_embedding_from_text(
         deployment_model: Optional deployment model (falls back to settings if not provided)
         api_version: Optional API version (falls back to settings if not provided)
         secret: Optional API key (falls back to settings if not provided)
+        logger: Optional logger for the embedding cache warnings
     """
     settings = get_openai_settings()
     
@@ -55,15 +73,71 @@ async def a_generate_embedding_from_text(
     final_api_version = api_version or settings.api_version
     final_secret = secret or settings.embedding_key
     
-    embeddings = AzureOpenAIEmbeddings(
-        azure_endpoint=settings.embedding_endpoint,
-        azure_deployment=final_deployment,
-        api_key=final_secret,
+    embedding_cache = get_embedding_cache() if get_embedding_cache_settings().enabled else None
+    if embedding_cache:
+        cached_embedding = await embedding_cache.a_get(logger, settings.embedding_endpoint, final_deployment, text)
+        if cached_embedding is not None:
+            return cached_embedding
+
+    embeddings = get_azure_openai_embeddings(
+        endpoint=settings.embedding_endpoint,
+        deployment=final_deployment,
         api_version=final_api_version,
-        check_embedding_ctx_length=False,
- #       http_async_client=unsafe_httpx_async_client,
+        api_key=final_secret,
     )
-    return await embeddings.aembed_query(text)
+    if get_embedding_batch_settings().enabled:
+        # Le richieste concorrenti verso lo stesso deployment vengono accorpate in un'unica chiamata
+        embedding = await get_embedding_batcher().a_embed(embeddings, text)
+    else:
+        embedding = await embeddings.aembed_query(text)
+
+    if embedding_cache:
+        await embedding_cache.a_set(logger, settings.embedding_endpoint, final_deployment, text, embedding)
+    return embedding
+
+
+async def a_generate_embeddings_from_texts(
+    texts: list[str],
+    deployment_model: Optional[str] = None,
+    api_version: Optional[str] = None,
+    secret: Optional[str] = None,
+    logger: Optional[Logger] = None,
+) -> list[list[float]]:
+    """
+    Generate the embeddings of several texts with a single call to the embeddings API.
+    Texts already in the embedding cache are not sent; the result follows the order of texts.
+    """
+    settings = get_openai_settings()
+
+    final_deployment = deployment_model or settings.embedding_deployment_model
+    final_api_version = api_version or settings.api_version
+    final_secret = secret or settings.embedding_key
+
+    embedding_cache = get_embedding_cache() if get_embedding_cache_settings().enabled else None
+    vectors: dict[str, list[float]] = {}
+    if embedding_cache:
+        for text in texts:
+            if text not in vectors:
+                cached_embedding = await embedding_cache.a_get(
+                    logger, settings.embedding_endpoint, final_deployment, text
+                )
+                if cached_embedding is not None:
+                    vectors[text] = cached_embedding
+
+    texts_to_embed = list(dict.fromkeys(text for text in texts if text not in vectors))
+    if texts_to_embed:
+        embeddings = get_azure_openai_embeddings(
+            endpoint=settings.embedding_endpoint,
+            deployment=final_deployment,
+            api_version=final_api_version,
+            api_key=final_secret,
+        )
+        for text, embedding in zip(texts_to_embed, await embeddings.aembed_documents(texts_to_embed)):
+            vectors[text] = embedding
+            if embedding_cache:
+                await embedding_cache.a_set(logger, settings.embedding_endpoint, final_deployment, text, embedding)
+
+    return [vectors[text] for text in texts]
 
 
 async def a_get_answer_from_context(
@@ -109,15 +183,14 @@ async def a_get_answer_from_context(
 
     prompt = ChatPromptTemplate.from_messages(prompt_messages)
 
-    llm = AzureChatOpenAI(
-        azure_endpoint=settings.completion_endpoint,
-        azure_deployment=deployment_model,
+    llm = get_azure_chat_openai(
+        endpoint=settings.completion_endpoint,
+        deployment=deployment_model,
         api_version=api_version,
         api_key=consumer.completion_key,
         temperature=prompt_data.model_parameters.temperature,
         max_tokens=prompt_data.model_parameters.max_length,
         timeout=30,
- #       http_async_client=unsafe_httpx_async_client,
     )
     chain = prompt | llm.with_retry()
 
@@ -134,7 +207,11 @@ async def a_get_answer_from_context(
     logger.track_event(event_types.llm_answer_generation_openai_request, data_to_log)
 
     try:
-        prompt_and_model_result = await chain.ainvoke(dict_langchain_variables)
+        token_stream = get_token_stream()
+        if token_stream:
+            prompt_and_model_result = await a_stream_rag_answer(prompt | llm, dict_langchain_variables, token_stream)
+        else:
+            prompt_and_model_result = await chain.ainvoke(dict_langchain_variables)
 
         # logger.track_event(
         #     event_types.llm_answer_generation_response_event,
@@ -197,15 +274,14 @@ async def a_get_enriched_query(
 
     prompt = ChatPromptTemplate.from_messages(prompt_messages)
 
-    llm = AzureChatOpenAI(
-        azure_endpoint=settings.completion_endpoint,
-        azure_deployment=deployment_model,
+    llm = get_azure_chat_openai(
+        endpoint=settings.completion_endpoint,
+        deployment=deployment_model,
         api_version=api_version,
         api_key=consumer.completion_key,
         temperature=prompt_data.model_parameters.temperature,
         max_tokens=prompt_data.model_parameters.max_length,
         timeout=30,
- #       http_async_client=unsafe_httpx_async_client,
     )
 
     chain = prompt | llm.with_retry()
@@ -238,7 +314,7 @@ async def a_get_enriched_query(
 
         result_content_parser = PydanticOutputParser(pydantic_object=EnrichmentQueryResponse)
         result_content = await result_content_parser.ainvoke(prompt_and_model_result)
-    except APIConnectionError as e:
+    except openai_sdk.APIConnectionError as e:
         logger.exception(f"APIConnectionError: {e}")
         result_content = EnrichmentQueryResponse(
             standalone_question="",
@@ -274,15 +350,14 @@ async def a_get_intent_from_enriched_query(
 
     prompt = ChatPromptTemplate.from_messages(prompt_messages)
 
-    llm = AzureChatOpenAI(
-        azure_endpoint=settings.completion_endpoint,
-        azure_deployment=deployment_model,
+    llm = get_azure_chat_openai(
+        endpoint=settings.completion_endpoint,
+        deployment=deployment_model,
         api_version=api_version,
         api_key=consumer.completion_key,
         temperature=prompt_data.model_parameters.temperature,
         max_tokens=prompt_data.model_parameters.max_length,
         timeout=30,
- #       http_async_client=unsafe_httpx_async_client,
     )
 
     chain = prompt | llm.with_retry()
@@ -348,15 +423,14 @@ async def a_get_answer_from_domus(
 
     prompt = ChatPromptTemplate.from_messages(prompt_messages)
 
-    llm = AzureChatOpenAI(
-        azure_endpoint=settings.completion_endpoint,
-        azure_deployment=deployment_model,
+    llm = get_azure_chat_openai(
+        endpoint=settings.completion_endpoint,
+        deployment=deployment_model,
         api_version=api_version,
         api_key=consumer.completion_key,
         temperature=prompt_data.model_parameters.temperature,
         max_tokens=prompt_data.model_parameters.max_length,
         timeout=30,
- #       http_async_client=unsafe_httpx_async_client,
     )
 
     chain = prompt | llm.with_retry()
@@ -396,14 +470,41 @@ async def a_get_answer_from_domus(
 
 async def a_resolve_template(logger: Logger, prompt_data: PromptEditorResponseBody, template_context: Dict[str, Any]):
     messages = prompt_data.prompt
+    # (risposta, motore, durata in ms) per ogni messaggio, nello stesso ordine del prompt
+    resolved_messages: List[Optional[Tuple[TemplateResolveResponse, str, float]]] = [None] * len(messages)
+    remote_indices = []
+    for i, m in enumerate(messages):
+        started = time.perf_counter()
+        resolved_message = resolve_message_locally(logger, prompt_data, m.content, template_context)
+        if resolved_message is None:
+            remote_indices.append(i)
+        else:
+            resolved_messages[i] = (resolved_message, "local", (time.perf_counter() - started) * 1000)
+
+    if remote_indices:
+        # I messaggi non risolvibili in locale partono insieme, su un'unica sessione
+        semaphore = asyncio.Semaphore(get_prompt_settings().template_max_concurrency)
+
+        async def a_resolve_remote(i: int, session: aiohttp.ClientSession):
+            async with semaphore:
+                started = time.perf_counter()
+                resolved_message = await a_get_prompt_from_resolve_jinja_template_api(
+                    logger, messages[i].content, template_context, session
+                )
+                resolved_messages[i] = (resolved_message, "api", (time.perf_counter() - started) * 1000)
+
+        session = get_http_session()
+        await asyncio.gather(*(a_resolve_remote(i, session) for i in remote_indices))
+
     prompt_variables = []
-    for m in messages:
-        resolved_message = await a_get_prompt_from_resolve_jinja_template_api(logger, m.content, template_context)
+    for m, (resolved_message, renderer, duration_ms) in zip(messages, resolved_messages):
         logger.track_event(
             event_types.resolve_template_api_response,
             {
                 "promptId": prompt_data.id,
                 "message_role": m.role,
+                "renderer": renderer,
+                "duration_ms": round(duration_ms, 3),
                 "resolved_message": json.dumps(resolved_message.__dict__, ensure_ascii=False).encode("utf-8"),
             },
         )
@@ -414,6 +515,23 @@ async def a_resolve_template(logger: Logger, prompt_data: PromptEditorResponseBo
     return prompt_data
 
 
+def resolve_message_locally(
+    logger: Logger, prompt_data: PromptEditorResponseBody, message: str, template_context: Dict[str, Any]
+) -> Optional[TemplateResolveResponse]:
+    """
+    Risolve il template Jinja di un messaggio in locale.
+    Restituisce None se il motore locale è disabilitato o non supporta il template:
+    in quel caso il messaggio va risolto con la Resolve Template API.
+    """
+    if not get_prompt_settings().template_local_rendering_enabled:
+        return None
+    try:
+        return get_template_renderer().render(prompt_data.id, prompt_data.version, message, template_context)
+    except UnsupportedTemplateError as ex:
+        logger.info(f"Local template rendering not supported for prompt {prompt_data.id}: {ex}")
+        return None
+
+
 def check_prompt_variables(prompt_data: PromptEditorResponseBody, fixed_parameters: list[str]):
     prompt_parameters = prompt_data.parameters
     parameters_indices = []
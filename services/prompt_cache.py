@@ -0,0 +1,117 @@
+import copy
+import time
+from collections import OrderedDict
+from functools import cache
+from typing import Optional
+
+from models.apis.rag_orchestrator_request import PromptEditorCredential
+from utils.settings import get_prompt_cache_settings
+
+
+class PromptCache:
+    """
+    Cache a due livelli per la risoluzione dei prompt.
+
+    Livello 1: (tag, llm_model_id, prompt types) -> risultato di a_get_prompt_info,
+    con TTL perché la tabella PromptDetails cambia quando si pubblica un prompt.
+    Livello 2: (prompt id, version, label) -> JSON restituito dal Prompt Editor.
+    Una versione pubblicata non cambia più, quindi queste voci scadono solo per LRU;
+    le voci senza versione ("ultima versione") scadono dopo latest_body_ttl_seconds.
+    Quando il livello 1 rileva una nuova versione di un prompt, le voci del
+    livello 2 delle versioni precedenti vengono rimosse.
+    """
+
+    def __init__(self, info_ttl_seconds: int = 300, latest_body_ttl_seconds: int = 300, max_bodies: int = 256):
+        self.info_ttl_seconds = info_ttl_seconds
+        self.latest_body_ttl_seconds = latest_body_ttl_seconds
+        self.max_bodies = max_bodies
+        self._infos: dict[tuple, tuple[float, list[PromptEditorCredential]]] = {}
+        self._bodies: OrderedDict[tuple, tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def info_key(tag_name: str, llm_id: str, type_filters: list[str]) -> tuple:
+        return (str(tag_name).lower(), llm_id, tuple(sorted(type_filters)))
+
+    @staticmethod
+    def _body_key(prompt_id: str, version: Optional[str], label: str) -> tuple:
+        return (prompt_id, version, label)
+
+    def get_prompt_info(self, tag_name: str, llm_id: str, type_filters: list[str]) -> Optional[list[PromptEditorCredential]]:
+        entry = self._infos.get(self.info_key(tag_name, llm_id, type_filters))
+        if entry is None or time.monotonic() - entry[0] > self.info_ttl_seconds:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [info.model_copy() for info in entry[1]]
+
+    def set_prompt_info(
+        self, tag_name: str, llm_id: str, type_filters: list[str], infos: list[PromptEditorCredential]
+    ) -> bool:
+        """
+        Restituisce True se rispetto ai dati precedenti è stata pubblicata una nuova versione di un prompt.
+        """
+        key = self.info_key(tag_name, llm_id, type_filters)
+        previous = self._infos.get(key)
+        changed = False
+        if previous is not None:
+            current_versions = {(info.id, info.version) for info in infos}
+            for old_info in previous[1]:
+                if (old_info.id, old_info.version) not in current_versions:
+                    # Pubblicata una nuova versione: i body memorizzati per questo prompt sono superati
+                    self.invalidate_prompt(old_info.id)
+                    changed = True
+        self._infos[key] = (time.monotonic(), [info.model_copy() for info in infos])
+        return changed
+
+    def get_body(self, prompt_id: str, version: Optional[str], label: str) -> Optional[dict]:
+        key = self._body_key(prompt_id, version, label)
+        entry = self._bodies.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if not version and time.monotonic() - entry[0] > self.latest_body_ttl_seconds:
+            del self._bodies[key]
+            self.misses += 1
+            return None
+        self._bodies.move_to_end(key)
+        self.hits += 1
+        # Copia: from_dict riusa le liste del dizionario e i body vengono modificati durante la request
+        return copy.deepcopy(entry[1])
+
+    def set_body(self, prompt_id: str, version: Optional[str], label: str, body: dict):
+        key = self._body_key(prompt_id, version, label)
+        self._bodies[key] = (time.monotonic(), body)
+        self._bodies.move_to_end(key)
+        while len(self._bodies) > self.max_bodies:
+            self._bodies.popitem(last=False)
+
+    def invalidate_prompt(self, prompt_id: str):
+        """
+        Rimuove dal livello 2 tutte le versioni del prompt indicato.
+        """
+        for key in [k for k in self._bodies if k[0] == prompt_id]:
+            del self._bodies[key]
+
+    def invalidate(self):
+        self._infos = {}
+        self._bodies = OrderedDict()
+
+    def get_metrics(self) -> dict:
+        return {
+            "prompt_infos": len(self._infos),
+            "prompt_bodies": len(self._bodies),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+@cache
+def get_prompt_cache() -> PromptCache:
+    settings = get_prompt_cache_settings()
+    return PromptCache(
+        info_ttl_seconds=settings.info_ttl_seconds,
+        latest_body_ttl_seconds=settings.latest_body_ttl_seconds,
+        max_bodies=settings.max_bodies,
+    )
@@ -1,5 +1,5 @@
+import copy
 import json
-import aiohttp
 import azure.functions as func
 from exceptions.custom_exceptions import CustomPromptParameterError
 from models.apis.prompt_template_response_body import TemplateResolveResponse
@@ -18,7 +18,10 @@ from constants import llm as llm_const
 from models.apis.prompt_editor_request_body import PromptEditorRequest
 from constants import misc as misc_const
 from dataclasses import asdict
-from services.storage import a_get_blob_content_from_container
+from services.blob_mapping_cache import a_get_mapping_index
+from services.http_session import get_http_session
+from services.prompt_cache import get_prompt_cache
+from utils.settings import get_prompt_cache_settings
 
 
 @retry(
@@ -43,7 +46,7 @@ async def a_get_response_from_prompt_retrieval_api(
  #       misc_const.HTTP_HEADER_APIM_SUBSCRIPTION_KEY: settings.template_ocp_apim_subscription_key,
     }
     try:
-        async with session.post(endpoint, data="{}", headers=headers) as result:
+        async with session.post(endpoint, data="{}", headers=headers, raise_for_status=True) as result:
             result_json = await result.json()
             result_json_string = json.dumps(result_json, ensure_ascii=False).encode("utf-8")
             track_event_data = {
@@ -83,7 +86,28 @@ async def a_get_prompts_data(
         prompt_data = await get_prompt_id_and_version(prompt_editor, list_prompt_version_info, prompt_type)
         payload.append(PromptEditorRequest(prompt_data.id, prompt_data.version, prompt_data.label))
 
-    listPrompt = await a_get_response_from_prompts_api(logger, session, payload)
+    prompt_cache = get_prompt_cache() if get_prompt_cache_settings().enabled else None
+    listPrompt = []
+    missing_payload = payload
+    if prompt_cache:
+        missing_payload = []
+        for request in payload:
+            cached_data = prompt_cache.get_body(request.id, request.version, request.label)
+            if cached_data is None:
+                missing_payload.append(request)
+            else:
+                listPrompt.append(cached_data)
+
+    if missing_payload:
+        response_list = await a_get_response_from_prompts_api(logger, session, missing_payload)
+        if prompt_cache:
+            for request in missing_payload:
+                data = next((p for p in response_list if p["label"] == request.label), None)
+                if data is not None:
+                    prompt_cache.set_body(request.id, request.version, request.label, copy.deepcopy(data))
+        listPrompt.extend(response_list)
+    else:
+        logger.info("a_get_prompts_data served from cache")
 
     enrichment_data = next((p for p in listPrompt if p["label"] == llm_const.enrichment), None)
     completion_data = next((p for p in listPrompt if p["label"] == llm_const.completion), None)
@@ -113,7 +137,7 @@ async def a_get_response_from_prompts_api(
  #       misc_const.HTTP_HEADER_APIM_SUBSCRIPTION_KEY: settings.template_ocp_apim_subscription_key
     }
     async with session.post(
-        endpoint, data=json.dumps(body, ensure_ascii=False).encode("utf-8"), headers=headers
+        endpoint, data=json.dumps(body, ensure_ascii=False).encode("utf-8"), headers=headers, raise_for_status=True
     ) as result:
         result_json = await result.json()
         result_json_string = json.dumps(result_json, ensure_ascii=False).encode("utf-8")
@@ -168,8 +192,11 @@ async def get_prompt_id_and_version(
 
 
 async def a_get_prompt_from_resolve_jinja_template_api(
-    logger: Logger, message: str, template_context: Dict[str, Any]
+    logger: Logger, message: str, template_context: Dict[str, Any], session: Optional[ClientSession] = None
 ) -> TemplateResolveResponse:
+    if session is None:
+        session = get_http_session()
+
     settings = PromptSettings()
     resolve_endpoint = settings.template_resolve_endpoint
 
@@ -181,31 +208,29 @@ async def a_get_prompt_from_resolve_jinja_template_api(
  #       misc_const.HTTP_HEADER_APIM_SUBSCRIPTION_KEY: settings.template_ocp_apim_subscription_key,
     }
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            resolve_endpoint, data=json.dumps(body.to_dict(), ensure_ascii=False).encode("utf-8"), headers=headers
-        ) as result:
-            result_json = await result.json()
-            result_json_string = json.dumps(result_json, ensure_ascii=False).encode("utf-8")
-            if result.status == 200:
+    async with session.post(
+        resolve_endpoint, data=json.dumps(body.to_dict(), ensure_ascii=False).encode("utf-8"), headers=headers
+    ) as result:
+        result_json = await result.json()
+        result_json_string = json.dumps(result_json, ensure_ascii=False).encode("utf-8")
+        if result.status == 200:
 
-                track_event_data = {"request_endpoint": resolve_endpoint, "response": result_json_string}
-                logger.track_event(event_types.resolve_template_api_request, track_event_data)
-                result_object = TemplateResolveResponse.from_dict(result_json)
-            else:
-                error_message = result_json_string.decode("utf-8")
-                logger.exception(error_message)
-                raise Exception(f"API: {resolve_endpoint} " + error_message)
+            track_event_data = {"request_endpoint": resolve_endpoint, "response": result_json_string}
+            logger.track_event(event_types.resolve_template_api_request, track_event_data)
+            result_object = TemplateResolveResponse.from_dict(result_json)
+        else:
+            error_message = result_json_string.decode("utf-8")
+            logger.exception(error_message)
+            raise Exception(f"API: {resolve_endpoint} " + error_message)
 
     return result_object
 
 
 async def a_get_form_application_name_by_tag(container_name: str, tag: str, logger: Logger) -> tuple:
-    file_content = await a_get_blob_content_from_container(container_name, prompt_editor.MSD_TAGS_MAPPING)
-    maps = json.loads(file_content)
-    for elemento in maps:
-        if elemento["tag"] == tag.lower():
-            return elemento["domus_form_application_code"], elemento["domus_form_application_name"]
+    maps = await a_get_mapping_index(logger, container_name, prompt_editor.MSD_TAGS_MAPPING, "tag")
+    elemento = maps.get(tag.lower())
+    if elemento:
+        return elemento["domus_form_application_code"], elemento["domus_form_application_name"]
 
     raise Exception(f"No domus form application name or code found for '{tag}'.")
 
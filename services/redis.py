@@ -1,62 +1,141 @@
-from typing import Optional,List
-from redis import Redis
+import asyncio
+from typing import Optional, List
+from redis.asyncio import BlockingConnectionPool, Redis
 
-from models.configurations.redis import RedisSettings
+from utils.settings import get_redis_settings
 
-def get_from_redis(key: str) -> Optional[str]:
-    settings = RedisSettings()
-    pwd = None if settings.password == "" else settings.password
-    redis_instance = Redis(host=settings.host, password=pwd,
-                            port=settings.port, decode_responses=True, ssl=settings.ssl)
+_redis_client: Optional[Redis] = None
+_redis_loop: Optional[asyncio.AbstractEventLoop] = None
 
-    return redis_instance.get(key.lower())
 
+def get_redis_client() -> Redis:
+    """
+    Restituisce il client asincrono condiviso, appoggiato a un unico pool di connessioni.
+    Le connessioni asyncio sono legate all'event loop: se il loop cambia il pool viene ricreato.
+    Con tutte le connessioni in uso le richieste attendono una connessione libera (al massimo pool_timeout secondi).
+    """
+    global _redis_client, _redis_loop
+    loop = asyncio.get_running_loop()
+    if _redis_client is None or _redis_loop is not loop:
+        settings = get_redis_settings()
+        pwd = None if settings.password == "" else settings.password
+        pool = BlockingConnectionPool.from_url(
+            f"{'rediss' if settings.ssl else 'redis'}://{settings.host}:{settings.port}",
+            password=pwd,
+            decode_responses=True,
+            max_connections=settings.max_connections,
+            timeout=settings.pool_timeout,
+            socket_timeout=settings.socket_timeout,
+            socket_connect_timeout=settings.socket_connect_timeout,
+            health_check_interval=settings.health_check_interval,
+        )
+        _redis_client = Redis(connection_pool=pool)
+        _redis_loop = loop
+    return _redis_client
+
+
+async def a_close_redis():
+    global _redis_client, _redis_loop
+    if _redis_client is not None:
+        await _redis_client.aclose(close_connection_pool=True)
+    _redis_client = None
+    _redis_loop = None
+
+
+async def a_get_from_redis(key: str) -> Optional[str]:
+    return await get_redis_client().get(key.lower())
 
-def set_to_redis(key: str, value: str):
-    settings = RedisSettings()
-    pwd = None if settings.password == "" else settings.password
-    redis_instance = Redis(host=settings.host, password=pwd,
-                            port=settings.port, decode_responses=True, ssl=settings.ssl)
-    redis_instance.set(key.lower(), value, ex=settings.expiration_seconds)
+
+async def a_set_to_redis(key: str, value: str, conversation_id: Optional[str] = None):
+    await a_set_many_to_redis({key: value}, conversation_id)
+
+
+async def a_get_many_from_redis(keys: List[str]) -> List[Optional[str]]:
+    """
+    Legge più chiavi con un solo round-trip; i valori sono nello stesso ordine delle chiavi.
+    """
+    if not keys:
+        return []
+    return await get_redis_client().mget([key.lower() for key in keys])
+
+
+async def a_set_many_to_redis(values: dict[str, str], conversation_id: Optional[str] = None):
+    """
+    Scrive più chiavi in pipeline, tutte con la scadenza configurata.
+    Se è indicata la conversazione, le chiavi vengono aggiunte anche al suo indice
+    (un set con la stessa scadenza), usato per elencarle senza SCAN.
+    """
+    if not values:
+        return
+    settings = get_redis_settings()
+    keys = [key.lower() for key in values]
+    async with get_redis_client().pipeline(transaction=False) as pipe:
+        for key, value in zip(keys, values.values()):
+            pipe.set(key, value, ex=settings.expiration_seconds)
+        if conversation_id:
+            index_key = make_key("conv", conversation_id)
+            pipe.sadd(index_key, *keys)
+            pipe.expire(index_key, settings.expiration_seconds)
+        await pipe.execute()
 
 
 def make_key(prefix_type: str, convid: str, dettid: str = None) -> str:
     """
     Crea una chiave univoca per Redis combinando un prefisso statico con il nome fornito.
 
-    :param prefix_type: Può essere "list" o "dett" per indicare il tipo di prefisso.
+    :param prefix_type: Può essere "list" o "dett" per indicare il tipo di prefisso,
+        oppure "conv" per l'indice delle chiavi della conversazione.
     :param name: Nome da concatenare alla chiave.
     :return: Chiave formattata per Redis.
     """
     prefix_map = {
         "list": "list_",
-        "dett": "dett_"
+        "dett": "dett_",
+        "conv": "conv_"
     }
 
     prefix = prefix_map.get(prefix_type.lower())
     if not prefix:
-        raise ValueError(f"Prefisso non valido: {prefix_type}. Usa 'list' o 'dett'.")
+        raise ValueError(f"Prefisso non valido: {prefix_type}. Usa 'list', 'dett' o 'conv'.")
 
     return f"{prefix}{convid.lower()}{'_' + dettid if dettid else ''}"
 
 
-def get_all_keys_by_conv_id(substring: str) -> List[str]:
-    settings = RedisSettings()
-    pwd = None if settings.password == "" else settings.password
-    redis_instance = Redis(
-        host=settings.host,
-        password=pwd,
-        port=settings.port,
-        decode_responses=True,
-        ssl=settings.ssl
-    )
+async def a_get_all_keys_by_conv_id(conversation_id: str) -> List[str]:
+    """
+    Restituisce le chiavi ancora valide della conversazione leggendo il suo indice.
+    Le chiavi già scadute vengono rimosse dall'indice.
+    """
+    client = get_redis_client()
+    index_key = make_key("conv", conversation_id)
+    members = sorted(await client.smembers(index_key))
+    if not members:
+        return []
 
-    substring_lower = substring.lower()
+    async with client.pipeline(transaction=False) as pipe:
+        for key in members:
+            pipe.exists(key)
+        exists = await pipe.execute()
 
-    # Prende tutte le chiavi Redis e filtra quelle che contengono la sottostringa (case-insensitive)
-    keys = [
-        key for key in redis_instance.scan_iter(match="*")
-        if substring_lower in key.lower()
-    ]
+    keys = [key for key, found in zip(members, exists) if found]
+    expired = [key for key, found in zip(members, exists) if not found]
+    if expired:
+        await client.srem(index_key, *expired)
 
     return keys
+
+
+async def a_delete_keys_by_conv_id(conversation_id: str) -> int:
+    """
+    Elimina tutte le chiavi della conversazione e il relativo indice.
+    Restituisce il numero di chiavi eliminate, indice escluso.
+    """
+    client = get_redis_client()
+    index_key = make_key("conv", conversation_id)
+    members = list(await client.smembers(index_key))
+    async with client.pipeline(transaction=False) as pipe:
+        if members:
+            pipe.delete(*members)
+        pipe.delete(index_key)
+        results = await pipe.execute()
+    return results[0] if members else 0
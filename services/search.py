@@ -1,18 +1,27 @@
 import json
-from aiohttp import ClientSession
+from aiohttp import ClientResponseError, ClientSession
 from tenacity import retry, stop_after_attempt, wait_exponential
 from models.configurations.search import SearchSettings
 from models.services.search_index_response import SearchIndexResponse
 import constants.event_types as event_types
 import constants.search as search_constants
 from models.apis.rag_orchestrator_request import RagOrchestratorRequest
-from azure.identity import DefaultAzureCredential
 
+from services.aad_token import get_aad_token_provider
 from services.logging import Logger
 from utils.tenacity import retry_if_http_error, wait_for_retry_after_header
 import constants.environment as env_const
 
 
+def get_index_name(environment: str, settings: SearchSettings) -> str:
+    if environment == env_const.STAGING:
+        return settings.index
+    elif environment == env_const.PRODUCTION:
+        return settings.index_production
+    errMsg = "env_const ({env_const}) not found"
+    raise Exception(errMsg.format(env_const=environment))
+
+
 @retry(
     retry=retry_if_http_error(),
     wait=wait_for_retry_after_header(fallback=wait_exponential(multiplier=1, min=4, max=10)),
@@ -20,29 +29,33 @@ import constants.environment as env_const
     reraise=True,
 )
 async def a_query(
-    session: ClientSession, request: RagOrchestratorRequest, embedding: list[str], logger: Logger
+    session: ClientSession,
+    request: RagOrchestratorRequest,
+    embedding: list[str],
+    logger: Logger,
+    include_vectors: bool = False,
+    semantic_ranking: bool = True,
 ) -> SearchIndexResponse:
+    """
+    include_vectors: restituisce anche i vettori dei chunk (per il rerank locale).
+    semantic_ranking: False per non usare il semantic ranking anche se abilitato nelle impostazioni.
+    """
     settings = SearchSettings()
     headers = {"Content-Type": "application/json"}
     if settings.authentication_method == "APIKey":
         headers["api-key"] = settings.key
     else:
-        credential = DefaultAzureCredential()
-        token = credential.get_token("https://search.azure.com/.default").token
+        token = await get_aad_token_provider().a_get_token(search_constants.SEARCH_TOKEN_SCOPE)
         headers["Authorization"] = f"Bearer {token}"
     params = {"api-version": settings.api_version}
     # index = settings.index
     k = settings.k
     top = settings.top
     payload = {"select": "chunk_id, chunk_text, filename, tags", "top": top}
+    if include_vectors:
+        payload["select"] += ", chunk_text_vector"
 
-    if request.environment == env_const.STAGING:
-        index = settings.index
-    elif request.environment == env_const.PRODUCTION:
-        index = settings.index_production
-    else:
-        errMsg = "env_const ({env_const}) not found"
-        raise Exception(errMsg.format(env_const=request.environment))
+    index = get_index_name(request.environment, settings)
 
     if len(request.tags) > 0:
         tagsToSearch = ",".join(request.tags)
@@ -68,7 +81,7 @@ async def a_query(
             }
         ]
 
-    if settings.semantic_ranking_enabled:
+    if settings.semantic_ranking_enabled and semantic_ranking:
         payload["queryType"] = "semantic"
         payload["semanticConfiguration"] = settings.index_semantic_configuration
         payload["captions"] = "extractive"
@@ -76,14 +89,18 @@ async def a_query(
     data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
     endpoint: str = settings.endpoint + "/indexes/" + index + "/docs/search"
     try:
-        async with session.post(endpoint, data=data, headers=headers, params=params) as result:
+        async with session.post(
+            endpoint, data=data, headers=headers, params=params, raise_for_status=True
+        ) as result:
             result_json = await result.json()
             track_event_data = {"requestPayload": json.dumps(payload, ensure_ascii=False).encode("utf-8")}
             values_to_log: list = result_json.get("value", [])
             index = 0
             for value in values_to_log:
+                # I vettori non servono nella telemetria
+                value_to_log = {key: item for key, item in value.items() if key != "chunk_text_vector"}
                 track_event_data["resultDocument_" + str(index).zfill(2)] = json.dumps(
-                    value, ensure_ascii=False
+                    value_to_log, ensure_ascii=False
                 ).encode("utf-8")
                 index += 1
             
@@ -91,5 +108,8 @@ async def a_query(
 
             return SearchIndexResponse.from_dict(result_json)
     except Exception as ex:
+        if isinstance(ex, ClientResponseError) and ex.status == 401 and "Authorization" in headers:
+            # Token revocato o non più valido: la prossima richiesta ne ottiene uno nuovo
+            get_aad_token_provider().invalidate(search_constants.SEARCH_TOKEN_SCOPE)
         logger.exception(ex)
         raise ex
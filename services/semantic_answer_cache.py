@@ -0,0 +1,136 @@
+import copy
+import time
+from dataclasses import dataclass
+from functools import cache
+from typing import Optional
+
+import numpy as np
+
+from models.apis.rag_orchestrator_response import RagOrchestratorResponse
+from utils.settings import get_semantic_cache_settings
+
+
+@dataclass(frozen=True)
+class SemanticCacheScope:
+    """
+    Ambito entro cui due domande simili possono condividere la stessa risposta.
+    Un cambio di tag, indice, versione dei prompt, modello o consumer produce un ambito diverso,
+    quindi le risposte calcolate in precedenza non vengono più restituite.
+    """
+
+    # Tutti i tag della richiesta, normalizzati e ordinati
+    tags: tuple[str, ...]
+    environment: str
+    lang: str
+    index: str
+    llm_model_id: str
+    model_name: str
+    consumer: str
+    deployment_model: str
+    enrichment_enabled: bool
+    enrichment_prompt: str
+    completion_prompt: str
+
+
+@dataclass
+class SemanticCacheHit:
+    response: RagOrchestratorResponse
+    similarity: float
+
+
+class _ScopeEntries:
+    def __init__(self, dimensions: int):
+        self.vectors = np.empty((0, dimensions), dtype=np.float32)
+        self.responses: list[RagOrchestratorResponse] = []
+        self.created_at: list[float] = []
+
+
+class SemanticAnswerCache:
+    """
+    Cache delle risposte del RAG per domande semanticamente equivalenti.
+
+    Per ogni ambito tiene gli embedding normalizzati delle domande già servite:
+    la similarità coseno con la nuova domanda è un prodotto matrice-vettore.
+    Le voci scadono dopo ttl_seconds; oltre max_entries_per_scope si scartano le più vecchie.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.95, ttl_seconds: int = 3600, max_entries_per_scope: int = 500):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries_per_scope = max_entries_per_scope
+        self._scopes: dict[SemanticCacheScope, _ScopeEntries] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
+
+    def _purge_expired(self, entries: _ScopeEntries):
+        limit = time.monotonic() - self.ttl_seconds
+        first_valid = next((i for i, created_at in enumerate(entries.created_at) if created_at >= limit), None)
+        if first_valid is None:
+            first_valid = len(entries.created_at)
+        if first_valid > 0:
+            entries.vectors = entries.vectors[first_valid:]
+            entries.responses = entries.responses[first_valid:]
+            entries.created_at = entries.created_at[first_valid:]
+
+    def get(self, scope: SemanticCacheScope, embedding: list[float]) -> Optional[SemanticCacheHit]:
+        entries = self._scopes.get(scope)
+        vector = self._normalize(embedding)
+        if entries is not None and vector is not None and entries.vectors.shape[1] == vector.shape[0]:
+            self._purge_expired(entries)
+            if len(entries.responses) > 0:
+                similarities = entries.vectors @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    self.hits += 1
+                    return SemanticCacheHit(copy.deepcopy(entries.responses[best]), float(similarities[best]))
+        self.misses += 1
+        return None
+
+    def put(self, scope: SemanticCacheScope, embedding: list[float], response: RagOrchestratorResponse):
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        entries = self._scopes.get(scope)
+        if entries is None or entries.vectors.shape[1] != vector.shape[0]:
+            entries = self._scopes[scope] = _ScopeEntries(vector.shape[0])
+        self._purge_expired(entries)
+        # Le voci sono in ordine di inserimento: le prime sono le più vecchie
+        entries.vectors = np.vstack([entries.vectors, vector])[-self.max_entries_per_scope:]
+        entries.responses = (entries.responses + [copy.deepcopy(response)])[-self.max_entries_per_scope:]
+        entries.created_at = (entries.created_at + [time.monotonic()])[-self.max_entries_per_scope:]
+
+    def invalidate(self, tag_names: Optional[list[str]] = None, index: Optional[str] = None):
+        """
+        Rimuove le risposte degli ambiti che contengono uno dei tag indicati (e/o dell'indice indicato);
+        senza argomenti svuota l'intera cache.
+        """
+        tags = None if tag_names is None else {tag.lower() for tag in tag_names}
+        for scope in list(self._scopes):
+            if (tags is None or tags.intersection(scope.tags)) and (index is None or scope.index == index):
+                del self._scopes[scope]
+
+    def get_metrics(self) -> dict:
+        return {
+            "scopes": len(self._scopes),
+            "entries": sum(len(e.responses) for e in self._scopes.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+@cache
+def get_semantic_answer_cache() -> SemanticAnswerCache:
+    settings = get_semantic_cache_settings()
+    return SemanticAnswerCache(
+        similarity_threshold=settings.similarity_threshold,
+        ttl_seconds=settings.ttl_seconds,
+        max_entries_per_scope=settings.max_entries_per_scope,
+    )
@@ -1,7 +1,10 @@
 from datetime import datetime, timedelta, timezone
 import io
 from functools import cache
+from typing import Optional
+from azure.core import MatchConditions
 from azure.core.credentials import AzureNamedKeyCredential
+from azure.core.exceptions import ResourceNotModifiedError
 from azure.storage.blob.aio import BlobClient, BlobServiceClient
 from azure.storage.blob import (
     generate_blob_sas,
@@ -74,14 +77,42 @@ async def a_get_blob_content_from_container(container: str, filename: str):
                                                       filename)
     downloader = await blob_client.download_blob(max_concurrency=1)
     blob_text = await downloader.readall()
-    try:
-        text = blob_text.decode('utf-8')
-    except UnicodeDecodeError:
-        text = blob_text.decode('cp1252')
+    text = decode_blob_text(blob_text)
     await blob_client.close()
     return text
 
 
+async def a_get_blob_content_if_modified(
+    container: str, filename: str, etag: Optional[str] = None
+) -> tuple[Optional[str], Optional[str]]:
+    """
+    Get a blob from a container only if its ETag differs from the given one (conditional GET).
+    Returns (content, etag); content is None if the blob has not been modified.
+    """
+    blob_service_client = get_blob_service_client()
+    blob_client = blob_service_client.get_blob_client(container,
+                                                      filename)
+    try:
+        if etag:
+            downloader = await blob_client.download_blob(
+                max_concurrency=1, etag=etag, match_condition=MatchConditions.IfModified)
+        else:
+            downloader = await blob_client.download_blob(max_concurrency=1)
+        blob_text = await downloader.readall()
+    except ResourceNotModifiedError:
+        return (None, etag)
+    finally:
+        await blob_client.close()
+    return (decode_blob_text(blob_text), downloader.properties.etag)
+
+
+def decode_blob_text(blob_text: bytes) -> str:
+    try:
+        return blob_text.decode('utf-8')
+    except UnicodeDecodeError:
+        return blob_text.decode('cp1252')
+
+
 async def a_get_blob_stream_from_container(container: str, filename: str):
     """
     Get a blob from a container
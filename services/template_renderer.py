@@ -0,0 +1,81 @@
+import hashlib
+from collections import OrderedDict
+from functools import cache
+from typing import Any, Dict, Optional
+
+from jinja2 import StrictUndefined, TemplateError
+from jinja2.sandbox import SandboxedEnvironment
+from langchain_core.prompts.string import get_template_variables
+
+from models.apis.prompt_template_response_body import TemplateResolveResponse
+from utils.settings import get_prompt_settings
+
+
+class UnsupportedTemplateError(Exception):
+    """
+    Il template usa costrutti che il motore locale non gestisce:
+    va risolto tramite la Resolve Template API.
+    """
+
+
+class LocalTemplateRenderer:
+    """
+    Risolve in processo i template Jinja dei messaggi di prompt.
+
+    I template compilati sono tenuti in una LRU indicizzata per
+    (prompt id, version, hash del messaggio). Le variabili non presenti nel
+    contesto, i filtri sconosciuti e gli errori di sintassi sollevano
+    UnsupportedTemplateError, così il chiamante può ripiegare sull'API remota.
+    """
+
+    def __init__(self, max_templates: int = 512):
+        self.max_templates = max_templates
+        self._environment = SandboxedEnvironment(
+            undefined=StrictUndefined,
+            autoescape=False,
+            keep_trailing_newline=True,
+        )
+        # None = template già risultato non supportato
+        self._templates: OrderedDict[tuple, Optional[Any]] = OrderedDict()
+
+    @staticmethod
+    def template_key(prompt_id: Optional[str], version: Optional[str], message: str) -> tuple:
+        return (prompt_id, version, hashlib.sha256(message.encode("utf-8")).hexdigest())
+
+    def _get_template(self, key: tuple, message: str):
+        if key in self._templates:
+            self._templates.move_to_end(key)
+            template = self._templates[key]
+        else:
+            try:
+                template = self._environment.from_string(message)
+            except TemplateError:
+                template = None
+            self._templates[key] = template
+            while len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+
+        if template is None:
+            raise UnsupportedTemplateError(f"Template {key[0]}/{key[1]} cannot be compiled locally")
+        return template
+
+    def render(
+        self, prompt_id: Optional[str], version: Optional[str], message: str, template_context: Dict[str, Any]
+    ) -> TemplateResolveResponse:
+        key = self.template_key(prompt_id, version, message)
+        template = self._get_template(key, message)
+        try:
+            resolved_template = template.render(**(template_context or {}))
+            # Variabili f-string lasciate nel testo: le valorizza la chain di langchain
+            parameters = get_template_variables(resolved_template, "f-string")
+        except (TemplateError, ValueError) as ex:
+            raise UnsupportedTemplateError(str(ex)) from ex
+        if any(not p.isidentifier() for p in parameters):
+            raise UnsupportedTemplateError(f"Template {prompt_id}/{version} has non-identifier placeholders {parameters}")
+
+        return TemplateResolveResponse(resolved_template=resolved_template, parameters=parameters, validation_messages=[])
+
+
+@cache
+def get_template_renderer() -> LocalTemplateRenderer:
+    return LocalTemplateRenderer(max_templates=get_prompt_settings().template_cache_size)
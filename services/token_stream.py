@@ -0,0 +1,144 @@
+import asyncio
+import json
+import re
+from contextvars import ContextVar, Token
+from typing import Any, Optional
+
+# Fine dello stream: inserito in coda quando l'elaborazione della richiesta termina
+_END = object()
+
+_RESPONSE_FIELD_START = re.compile(r'"response"\s*:\s*"')
+
+
+class TokenStream:
+    """
+    Coda dei frammenti di testo della risposta generati dall'LLM durante una richiesta in streaming.
+    """
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def put(self, text: str):
+        if text:
+            self._queue.put_nowait(text)
+
+    def close(self):
+        self._queue.put_nowait(_END)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        text = await self._queue.get()
+        if text is _END:
+            raise StopAsyncIteration
+        return text
+
+
+_current_token_stream: ContextVar[Optional[TokenStream]] = ContextVar("token_stream", default=None)
+
+
+def get_token_stream() -> Optional[TokenStream]:
+    """
+    Stream della richiesta corrente, None se la richiesta non è in streaming.
+    """
+    return _current_token_stream.get()
+
+
+def set_token_stream(token_stream: Optional[TokenStream]) -> Token:
+    return _current_token_stream.set(token_stream)
+
+
+def reset_token_stream(token: Token):
+    _current_token_stream.reset(token)
+
+
+class RagResponseStreamParser:
+    """
+    Parser incrementale dell'output JSON di RagResponseOutputParser ({"response": "...", "references": [...]}).
+
+    Ad ogni frammento restituisce il testo di "response" decodificato fino a quel punto e non ancora
+    restituito; le sequenze di escape incomplete vengono trattenute fino al frammento successivo.
+    Le references e il payload finale si ottengono dal parsing completo dell'output.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._position: Optional[int] = None
+        self.completed = False
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        if self.completed:
+            return ""
+        if self._position is None:
+            match = _RESPONSE_FIELD_START.search(self._buffer)
+            if match is None:
+                return ""
+            self._position = match.end()
+
+        decoded = []
+        position = self._position
+        while position < len(self._buffer):
+            char = self._buffer[position]
+            if char == '"':
+                self.completed = True
+                break
+            if char != "\\":
+                decoded.append(char)
+                position += 1
+                continue
+            escape_length = self._escape_length(position)
+            if escape_length is None:
+                break
+            decoded.append(json.loads(f'"{self._buffer[position:position + escape_length]}"'))
+            position += escape_length
+
+        self._position = position
+        return "".join(decoded)
+
+    def _escape_length(self, position: int) -> Optional[int]:
+        """
+        Lunghezza della sequenza di escape che inizia in position, None se non è ancora arrivata per intero.
+        """
+        if position + 1 >= len(self._buffer):
+            return None
+        if self._buffer[position + 1] != "u":
+            return 2
+        if position + 6 > len(self._buffer):
+            return None
+        if 0xD800 <= int(self._buffer[position + 2:position + 6], 16) < 0xDC00:
+            # Coppia surrogata: serve anche la seconda metà
+            return 12 if position + 12 <= len(self._buffer) else None
+        return 6
+
+
+async def a_stream_rag_answer(
+    chain: Any, variables: dict, token_stream: TokenStream, max_attempts: int = 3, retry_wait_seconds: float = 1.0
+) -> Any:
+    """
+    Esegue la chain in streaming inoltrando il testo di "response" man mano che arriva.
+    Restituisce il messaggio completo, equivalente a quello di chain.ainvoke.
+
+    Come llm.with_retry() nel caso non in streaming, gli errori (es. 429, connessione) vengono
+    ritentati fino a max_attempts volte con attesa esponenziale, ma solo finché nessun testo
+    è stato inoltrato: dopo il primo delta il client ha già ricevuto parte della risposta.
+    """
+    attempt = 1
+    while True:
+        parser = RagResponseStreamParser()
+        message = None
+        forwarded = False
+        try:
+            async for chunk in chain.astream(variables):
+                message = chunk if message is None else message + chunk
+                text = parser.feed(chunk.content)
+                if text:
+                    token_stream.put(text)
+                    forwarded = True
+            return message
+        except Exception:
+            if forwarded or attempt >= max_attempts:
+                raise
+            await asyncio.sleep(retry_wait_seconds * 2 ** (attempt - 1))
+            attempt += 1
@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+from azure.core.credentials import AccessToken
+
+
+class FakeTokenCredential:
+    """
+    Credenziale asincrona locale: restituisce token fittizi con la durata indicata
+    e conta le chiamate a get_token.
+    """
+
+    def __init__(self, lifetime_seconds: int = 3600, delay_seconds: float = 0, error: Exception = None):
+        self.lifetime_seconds = lifetime_seconds
+        self.delay_seconds = delay_seconds
+        self.error = error
+        self.calls = 0
+        self.closed = False
+
+    async def get_token(self, *scopes, **kwargs) -> AccessToken:
+        self.calls += 1
+        if self.delay_seconds:
+            await asyncio.sleep(self.delay_seconds)
+        if self.error:
+            raise self.error
+        return AccessToken(f"token-{self.calls}-{scopes[0]}", int(time.time()) + self.lifetime_seconds)
+
+    async def close(self):
+        self.closed = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
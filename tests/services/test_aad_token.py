@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from services.aad_token import AadTokenProvider
+from tests.mock_credential import FakeTokenCredential
+
+SCOPE = "https://search.azure.com/.default"
+
+
+@pytest.mark.asyncio
+async def test_token_is_cached_until_refresh_margin():
+    credential = FakeTokenCredential(lifetime_seconds=3600)
+    provider = AadTokenProvider(lambda: credential, refresh_margin_seconds=300)
+
+    first = await provider.a_get_token(SCOPE)
+    second = await provider.a_get_token(SCOPE)
+
+    assert first == second == f"token-1-{SCOPE}"
+    assert credential.calls == 1
+    assert provider.get_metrics() == {"scopes": 1, "hits": 1, "refreshes": 1, "errors": 0}
+
+
+@pytest.mark.asyncio
+async def test_token_close_to_expiry_is_refreshed():
+    credential = FakeTokenCredential(lifetime_seconds=60)
+    provider = AadTokenProvider(lambda: credential, refresh_margin_seconds=300)
+
+    await provider.a_get_token(SCOPE)
+    token = await provider.a_get_token(SCOPE)
+
+    assert token == f"token-2-{SCOPE}"
+    assert credential.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_refresh():
+    credential = FakeTokenCredential(delay_seconds=0.01)
+    provider = AadTokenProvider(lambda: credential)
+
+    tokens = await asyncio.gather(*(provider.a_get_token(SCOPE) for _ in range(5)))
+
+    assert set(tokens) == {f"token-1-{SCOPE}"}
+    assert credential.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_is_not_cached():
+    credential = FakeTokenCredential(error=RuntimeError("identity endpoint down"))
+    provider = AadTokenProvider(lambda: credential)
+
+    with pytest.raises(RuntimeError):
+        await provider.a_get_token(SCOPE)
+
+    credential.error = None
+    assert await provider.a_get_token(SCOPE) == f"token-2-{SCOPE}"
+    assert provider.get_metrics()["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_and_close():
+    credential = FakeTokenCredential()
+    provider = AadTokenProvider(lambda: credential)
+
+    await provider.a_get_token(SCOPE)
+    provider.invalidate(SCOPE)
+    assert await provider.a_get_token(SCOPE) == f"token-2-{SCOPE}"
+
+    await provider.a_close()
+    assert credential.closed
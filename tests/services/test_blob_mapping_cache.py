@@ -0,0 +1,104 @@
+import asyncio
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.blob_mapping_cache import BlobMappingCache, build_index
+
+MAPPING = [
+    {"ai_service": "naspi", "tag": "naspi", "cqa_project": "p1", "cqa_deployment": "d1"},
+    {"ai_service": "assegno", "tag": "assegno", "cqa_project": "p2", "cqa_deployment": "d2"},
+    {"ai_service": "naspi", "tag": "naspi-dup", "cqa_project": "p3", "cqa_deployment": "d3"},
+]
+
+
+class FakeBlob:
+    """Simula la GET condizionale: restituisce il contenuto solo se l'ETag è cambiato."""
+
+    def __init__(self, items):
+        self.items = items
+        self.etag = '"1"'
+        self.calls = []
+        self.error = None
+
+    async def __call__(self, container, filename, etag=None):
+        self.calls.append(etag)
+        if self.error:
+            raise self.error
+        if etag == self.etag:
+            return (None, etag)
+        return (json.dumps(self.items), self.etag)
+
+
+@pytest.fixture
+def fake_blob(mocker):
+    blob = FakeBlob(MAPPING)
+    mocker.patch("services.blob_mapping_cache.a_get_blob_content_if_modified", new=blob)
+    return blob
+
+
+def test_build_index_keeps_first_match():
+    index = build_index(MAPPING, "ai_service")
+    assert index["naspi"]["cqa_project"] == "p1"
+    assert set(index) == {"naspi", "assegno"}
+
+
+@pytest.mark.asyncio
+async def test_blob_is_downloaded_once_for_concurrent_lookups(fake_blob):
+    cache = BlobMappingCache(revalidate_seconds=60)
+
+    indexes = await asyncio.gather(
+        *(cache.a_get_index(MagicMock(), "config", "tags_mapping.json", "ai_service") for _ in range(5))
+    )
+
+    assert all(index["assegno"]["cqa_project"] == "p2" for index in indexes)
+    assert fake_blob.calls == [None]
+    tags = await cache.a_get_index(MagicMock(), "config", "tags_mapping.json", "tag")
+    assert tags["naspi-dup"]["cqa_project"] == "p3"
+    assert cache.get_metrics()["downloads"] == 1
+
+
+@pytest.mark.asyncio
+async def test_revalidation_uses_etag(fake_blob, mocker):
+    clock = mocker.patch("services.blob_mapping_cache.time")
+    clock.monotonic.return_value = 0
+    cache = BlobMappingCache(revalidate_seconds=60)
+    logger = MagicMock()
+    await cache.a_get_index(logger, "config", "tags_mapping.json", "ai_service")
+
+    # Non modificato: nessun nuovo download
+    clock.monotonic.return_value = 61
+    await cache.a_get_index(logger, "config", "tags_mapping.json", "ai_service")
+    await asyncio.sleep(0)
+    assert fake_blob.calls == [None, '"1"']
+    assert cache.get_metrics()["not_modified"] == 1
+
+    # Modificato: il nuovo contenuto sostituisce il precedente dopo il refresh in background
+    fake_blob.items = [{"ai_service": "naspi", "cqa_project": "new", "cqa_deployment": "d"}]
+    fake_blob.etag = '"2"'
+    clock.monotonic.return_value = 200
+    stale = await cache.a_get_index(logger, "config", "tags_mapping.json", "ai_service")
+    assert stale["naspi"]["cqa_project"] == "p1"
+    await asyncio.sleep(0)
+    fresh = await cache.a_get_index(logger, "config", "tags_mapping.json", "ai_service")
+    assert fresh["naspi"]["cqa_project"] == "new"
+
+
+@pytest.mark.asyncio
+async def test_failed_revalidation_serves_cached_mapping(fake_blob, mocker):
+    clock = mocker.patch("services.blob_mapping_cache.time")
+    clock.monotonic.return_value = 0
+    cache = BlobMappingCache(revalidate_seconds=60)
+    logger = MagicMock()
+    await cache.a_get_index(logger, "config", "tags_mapping.json", "ai_service")
+
+    fake_blob.error = Exception("storage unavailable")
+    clock.monotonic.return_value = 61
+    index = await cache.a_get_index(logger, "config", "tags_mapping.json", "ai_service")
+    # Il task di refresh termina, poi viene eseguita la sua callback
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert index["naspi"]["cqa_project"] == "p1"
+    logger.warning.assert_called_once()
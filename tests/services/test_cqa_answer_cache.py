@@ -0,0 +1,59 @@
+from models.services.cqa_response import CQAResponse
+from services.cqa_answer_cache import MISSING, CqaAnswerCache
+
+
+def test_hit_on_normalized_question():
+    answer_cache = CqaAnswerCache()
+    answer_cache.put("progetto", "production", "Cos'è l'Assegno Unico?", CQAResponse("risposta", {"id": 1}))
+
+    cached = answer_cache.get("progetto", "production", "  cos'è l'assegno   unico ")
+
+    assert cached == CQAResponse("risposta", {"id": 1})
+    assert answer_cache.get("progetto", "staging", "cos'è l'assegno unico") is MISSING
+    assert answer_cache.get_metrics() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_returns_copies():
+    answer_cache = CqaAnswerCache()
+    answer_cache.put("progetto", "production", "domanda", CQAResponse("risposta", {"id": 1}))
+
+    answer_cache.get("progetto", "production", "domanda").cqa_data["id"] = 2
+
+    assert answer_cache.get("progetto", "production", "domanda").cqa_data == {"id": 1}
+
+
+def test_no_answer_is_cached():
+    answer_cache = CqaAnswerCache()
+    answer_cache.put("progetto", "production", "domanda", None)
+
+    assert answer_cache.get("progetto", "production", "domanda") is None
+
+
+def test_entries_expire(mocker):
+    clock = mocker.patch("services.cqa_answer_cache.time")
+    clock.monotonic.return_value = 100.0
+    answer_cache = CqaAnswerCache(ttl_seconds=10)
+    answer_cache.put("progetto", "production", "domanda", None)
+
+    clock.monotonic.return_value = 111.0
+
+    assert answer_cache.get("progetto", "production", "domanda") is MISSING
+    assert answer_cache.get_metrics()["entries"] == 0
+
+
+def test_lru_eviction_and_invalidate():
+    answer_cache = CqaAnswerCache(max_entries=2)
+    answer_cache.put("uno", "production", "a", None)
+    answer_cache.put("due", "production", "b", None)
+    answer_cache.get("uno", "production", "a")
+    answer_cache.put("due", "production", "c", None)
+
+    assert answer_cache.get("due", "production", "b") is MISSING
+    assert answer_cache.get("uno", "production", "a") is None
+
+    answer_cache.invalidate("uno")
+    assert answer_cache.get("uno", "production", "a") is MISSING
+    assert answer_cache.get("due", "production", "c") is None
+
+    answer_cache.invalidate()
+    assert answer_cache.get_metrics()["entries"] == 0
@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from services.embedding_batcher import EmbeddingBatcher
+
+
+def fake_embeddings():
+    embeddings = MagicMock()
+    embeddings.aembed_documents = AsyncMock(side_effect=lambda texts: [[float(len(t))] for t in texts])
+    embeddings.aembed_query = AsyncMock(side_effect=lambda text: [float(len(text))])
+    return embeddings
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_call():
+    embeddings = fake_embeddings()
+    batcher = EmbeddingBatcher(max_batch_size=16, max_wait_ms=5)
+
+    results = await asyncio.gather(
+        batcher.a_embed(embeddings, "a"), batcher.a_embed(embeddings, "bb"), batcher.a_embed(embeddings, "a")
+    )
+
+    assert results == [[1.0], [2.0], [1.0]]
+    embeddings.aembed_documents.assert_awaited_once_with(["a", "bb"])
+    metrics = batcher.get_metrics()
+    assert metrics["batches"] == 1
+    assert metrics["batch_size"]["buckets"]["le_2"] == 1
+    assert metrics["queue_wait_ms"]["count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_without_waiting():
+    embeddings = fake_embeddings()
+    batcher = EmbeddingBatcher(max_batch_size=2, max_wait_ms=10_000)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(*(batcher.a_embed(embeddings, text) for text in ["a", "bb", "ccc", "dddd"])), timeout=1
+    )
+
+    assert results == [[1.0], [2.0], [3.0], [4.0]]
+    assert [c.args[0] for c in embeddings.aembed_documents.await_args_list] == [["a", "bb"], ["ccc", "dddd"]]
+
+
+@pytest.mark.asyncio
+async def test_single_request_uses_embed_query():
+    embeddings = fake_embeddings()
+    batcher = EmbeddingBatcher(max_wait_ms=1)
+
+    assert await batcher.a_embed(embeddings, "abc") == [3.0]
+    embeddings.aembed_documents.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_clients_are_batched_separately():
+    first, second = fake_embeddings(), fake_embeddings()
+    batcher = EmbeddingBatcher(max_wait_ms=1)
+
+    await asyncio.gather(batcher.a_embed(first, "a"), batcher.a_embed(second, "b"))
+
+    first.aembed_query.assert_awaited_once_with("a")
+    second.aembed_query.assert_awaited_once_with("b")
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller():
+    embeddings = fake_embeddings()
+    embeddings.aembed_documents.side_effect = ConnectionError("quota")
+    batcher = EmbeddingBatcher(max_wait_ms=1)
+
+    results = await asyncio.gather(
+        batcher.a_embed(embeddings, "a"), batcher.a_embed(embeddings, "b"), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert batcher.get_metrics()["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_idle_batcher_does_not_wait():
+    embeddings = fake_embeddings()
+    batcher = EmbeddingBatcher(max_wait_ms=10_000)
+
+    assert await asyncio.wait_for(batcher.a_embed(embeddings, "abc"), timeout=1) == [3.0]
+
+
+@pytest.mark.asyncio
+async def test_requests_wait_while_a_batch_is_running():
+    release = asyncio.Event()
+    embeddings = fake_embeddings()
+
+    async def slow_query(text):
+        await release.wait()
+        return [float(len(text))]
+
+    embeddings.aembed_query = AsyncMock(side_effect=slow_query)
+    batcher = EmbeddingBatcher(max_batch_size=16, max_wait_ms=10)
+
+    first = asyncio.create_task(batcher.a_embed(embeddings, "a"))
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    others = asyncio.gather(batcher.a_embed(embeddings, "bb"), batcher.a_embed(embeddings, "ccc"))
+    await asyncio.sleep(0.05)
+    release.set()
+
+    assert await first == [1.0]
+    assert await others == [[2.0], [3.0]]
+    embeddings.aembed_documents.assert_awaited_once_with(["bb", "ccc"])
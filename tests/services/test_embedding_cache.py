@@ -0,0 +1,73 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from services.embedding_cache import EmbeddingCache, decode_vector, encode_vector, normalize_query
+from tests.mock_env import set_mock_env
+from tests.mock_logging import MockLogger
+
+
+def test_normalize_query():
+    assert normalize_query("  Quando arriva   l'Assegno Unico? ") == "quando arriva l'assegno unico"
+
+
+def test_vectors_are_stored_as_float32():
+    data = encode_vector([0.5, -1.25, 3.0])
+    assert len(data) == 12
+    assert decode_vector(data) == [0.5, -1.25, 3.0]
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_hit_and_lru():
+    embedding_cache = EmbeddingCache(max_entries=1)
+    await embedding_cache.a_set(None, "endpoint", "ada", "Domanda uno", [1.0])
+
+    assert await embedding_cache.a_get(None, "endpoint", "ada", "domanda  UNO?") == [1.0]
+    assert await embedding_cache.a_get(None, "endpoint", "other-deployment", "domanda uno") is None
+
+    await embedding_cache.a_set(None, "endpoint", "ada", "domanda due", [2.0])
+    assert await embedding_cache.a_get(None, "endpoint", "ada", "domanda uno") is None
+    assert embedding_cache.get_metrics()["hits"] == 1
+    assert embedding_cache.get_metrics()["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_redis_tier(mocker):
+    store = {}
+    client = MagicMock()
+    client.get = AsyncMock(side_effect=lambda key: store.get(key))
+    client.set = AsyncMock(side_effect=lambda key, value, ex: store.__setitem__(key, value))
+    mocker.patch("services.embedding_cache.redis_service.get_redis_client", return_value=client)
+
+    writer = EmbeddingCache(redis_enabled=True)
+    await writer.a_set(None, "endpoint", "ada", "domanda", [0.25, 0.5])
+    reader = EmbeddingCache(redis_enabled=True)
+
+    assert await reader.a_get(None, "endpoint", "ada", "domanda") == [0.25, 0.5]
+    assert reader.get_metrics()["redis_hits"] == 1
+    assert client.set.await_args.kwargs["ex"] == 86400
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_are_not_fatal(mocker):
+    client = MagicMock()
+    client.get = AsyncMock(side_effect=ConnectionError("redis down"))
+    mocker.patch("services.embedding_cache.redis_service.get_redis_client", return_value=client)
+    embedding_cache = EmbeddingCache(redis_enabled=True)
+
+    assert await embedding_cache.a_get(MockLogger(), "endpoint", "ada", "domanda") is None
+    assert embedding_cache.get_metrics()["redis_errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_a_generate_embedding_from_text_uses_cache(mocker, monkeypatch):
+    set_mock_env(monkeypatch)
+    mocker.patch("services.openai.get_embedding_cache", return_value=EmbeddingCache())
+    embeddings = MagicMock()
+    embeddings.aembed_query = AsyncMock(return_value=[0.5, 0.25])
+    mocker.patch("services.openai.get_azure_openai_embeddings", return_value=embeddings)
+
+    from services.openai import a_generate_embedding_from_text
+    first = await a_generate_embedding_from_text("Quando arriva l'assegno unico?", deployment_model="ada")
+    second = await a_generate_embedding_from_text("quando arriva l'assegno unico", deployment_model="ada")
+
+    assert first == second == [0.5, 0.25]
+    assert embeddings.aembed_query.await_count == 1
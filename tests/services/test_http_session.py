@@ -0,0 +1,76 @@
+import pytest
+from aiohttp import ClientResponseError, web
+from aiohttp.test_utils import TestServer
+
+from services.http_session import HttpSessionManager
+
+
+@pytest.mark.asyncio
+async def test_get_session_is_shared_until_closed():
+    manager = HttpSessionManager()
+
+    first = manager.get_session()
+    assert manager.get_session() is first
+    assert first.connector.limit == 100
+    assert first.connector.limit_per_host == 0
+    assert first.timeout.sock_connect == 30.0
+    assert first.timeout.connect is None
+
+    await manager.a_close()
+    assert first.closed
+
+    second = manager.get_session()
+    assert second is not first
+    assert manager.get_metrics()["sessions_created"] == 2
+    await manager.a_close()
+    assert manager.get_metrics()["open"] is False
+
+
+@pytest.mark.asyncio
+async def test_connections_are_reused_between_requests():
+    async def handler(request):
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    server = TestServer(app)
+    await server.start_server()
+    manager = HttpSessionManager(limit_per_host=5)
+    try:
+        session = manager.get_session()
+        for _ in range(3):
+            async with session.get(server.make_url("/")) as response:
+                assert await response.json() == {"ok": True}
+    finally:
+        await manager.a_close()
+        await server.close()
+
+    metrics = manager.get_metrics()
+    assert metrics["requests"] == 3
+    assert metrics["connections_created"] == 1
+    assert metrics["connections_reused"] == 2
+    assert metrics["request_errors"] == 0
+
+
+@pytest.mark.asyncio
+async def test_error_status_is_raised_only_on_request():
+    async def handler(request):
+        return web.json_response({"error": "boom"}, status=500)
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    server = TestServer(app)
+    await server.start_server()
+    manager = HttpSessionManager()
+    try:
+        session = manager.get_session()
+        assert session.trust_env is False
+        async with session.get(server.make_url("/")) as response:
+            assert response.status == 500
+            assert await response.json() == {"error": "boom"}
+        with pytest.raises(ClientResponseError):
+            async with session.get(server.make_url("/"), raise_for_status=True):
+                pass
+    finally:
+        await manager.a_close()
+        await server.close()
@@ -0,0 +1,58 @@
+import pytest
+from services.llm_clients import (
+    LlmClientRegistry,
+    get_azure_chat_openai,
+    get_chat_mistralai,
+    get_llm_client_registry,
+    key_hash,
+)
+
+
+def test_registry_reuses_clients_and_evicts_lru():
+    registry = LlmClientRegistry(max_size=2)
+    created = []
+
+    def factory(name):
+        return lambda: created.append(name) or name
+
+    registry.get(("a",), factory("a"))
+    registry.get(("b",), factory("b"))
+    registry.get(("a",), factory("a"))
+    registry.get(("c",), factory("c"))
+    registry.get(("b",), factory("b"))
+
+    assert created == ["a", "b", "c", "b"]
+    assert registry.get_metrics()["evictions"] == 2
+    assert registry.get_metrics()["hits"] == 1
+
+
+def test_key_hash_does_not_expose_secret():
+    assert "secret" not in key_hash("secret")
+    assert key_hash("secret") != key_hash("rotated")
+
+
+@pytest.mark.asyncio
+async def test_azure_chat_openai_views_share_http_client():
+    get_llm_client_registry().clear()
+    kwargs = dict(endpoint="https://test.openai.azure.com/", deployment="gpt", api_version="2024-06-01", api_key="key")
+
+    first = get_azure_chat_openai(temperature=0.0, max_tokens=100, **kwargs)
+    second = get_azure_chat_openai(temperature=0.7, max_tokens=500, **kwargs)
+    rotated = get_azure_chat_openai(temperature=0.0, max_tokens=100, **{**kwargs, "api_key": "new-key"})
+
+    assert first.async_client is second.async_client
+    assert (first.temperature, first.max_tokens) == (0.0, 100)
+    assert (second.temperature, second.max_tokens) == (0.7, 500)
+    assert rotated.async_client is not first.async_client
+
+
+@pytest.mark.asyncio
+async def test_chat_mistralai_views_share_http_client():
+    get_llm_client_registry().clear()
+
+    first = get_chat_mistralai("https://mistral", "key", "mistral-large", temperature=0.0, max_tokens=100, timeout=30)
+    second = get_chat_mistralai("https://mistral", "key", "mistral-large", temperature=0.5, max_tokens=800, timeout=30)
+
+    assert first.async_client is second.async_client
+    assert (second.temperature, second.max_tokens) == (0.5, 800)
+    assert get_llm_client_registry().get_metrics()["size"] == 1
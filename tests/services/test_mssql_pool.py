@@ -0,0 +1,145 @@
+import pyodbc
+import pytest
+from services.mssql_pool import MsSqlPool, is_connection_error
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+    async def execute(self, sql):
+        if self.conn.broken:
+            raise pyodbc.OperationalError("08S01", "Communication link failure")
+
+    async def fetchone(self):
+        return (1,)
+
+
+class FakeConnection:
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakePool:
+    """Simula il Pool di aioodbc restituendo le connessioni nell'ordine indicato."""
+
+    def __init__(self, connections):
+        self.connections = list(connections)
+        self.released = []
+        self.closed = False
+        self.size = len(connections)
+        self.freesize = 0
+
+    async def acquire(self):
+        return self.connections.pop(0)
+
+    async def release(self, conn):
+        self.released.append(conn)
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_pool_is_created_once(monkeypatch):
+    created = []
+
+    async def fake_create_pool(**kwargs):
+        created.append(kwargs)
+        return FakePool([FakeConnection(), FakeConnection()])
+
+    monkeypatch.setattr("services.mssql_pool.create_pool", fake_create_pool)
+    pool = MsSqlPool("dsn", minsize=1, maxsize=5)
+
+    async with pool.acquire():
+        pass
+    async with pool.acquire():
+        pass
+
+    assert len(created) == 1
+    assert created[0]["maxsize"] == 5
+    metrics = pool.get_metrics()
+    assert metrics["acquired"] == 2
+    assert metrics["pools_created"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pre_ping_replaces_broken_connection(monkeypatch):
+    broken = FakeConnection(broken=True)
+    healthy = FakeConnection()
+    fake_pool = FakePool([broken, healthy])
+
+    async def fake_create_pool(**kwargs):
+        return fake_pool
+
+    monkeypatch.setattr("services.mssql_pool.create_pool", fake_create_pool)
+    pool = MsSqlPool("dsn", pre_ping=True)
+
+    async with pool.acquire() as conn:
+        assert conn is healthy
+
+    assert broken.closed
+    assert fake_pool.released == [broken, healthy]
+    assert pool.get_metrics()["recycled"] == 1
+
+
+@pytest.mark.asyncio
+async def test_connection_error_recycles_connection(monkeypatch):
+    conn = FakeConnection()
+    fake_pool = FakePool([conn])
+
+    async def fake_create_pool(**kwargs):
+        return fake_pool
+
+    monkeypatch.setattr("services.mssql_pool.create_pool", fake_create_pool)
+    pool = MsSqlPool("dsn", pre_ping=False)
+
+    with pytest.raises(pyodbc.Error):
+        async with pool.acquire():
+            raise pyodbc.Error("08S01", "Communication link failure")
+
+    assert conn.closed
+    assert fake_pool.released == [conn]
+    assert pool.get_metrics()["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_query_error_keeps_connection(monkeypatch):
+    conn = FakeConnection()
+    fake_pool = FakePool([conn])
+
+    async def fake_create_pool(**kwargs):
+        return fake_pool
+
+    monkeypatch.setattr("services.mssql_pool.create_pool", fake_create_pool)
+    pool = MsSqlPool("dsn", pre_ping=False)
+
+    with pytest.raises(ValueError):
+        async with pool.acquire():
+            raise ValueError("bad row")
+
+    assert not conn.closed
+    assert pool.get_metrics()["recycled"] == 0
+
+
+def test_is_connection_error():
+    assert is_connection_error(pyodbc.Error("08001", "Unable to connect"))
+    assert is_connection_error(pyodbc.Error("HYT00", "Timeout expired"))
+    assert not is_connection_error(pyodbc.Error("42000", "Syntax error"))
+    assert not is_connection_error(ValueError("08S01"))
@@ -0,0 +1,122 @@
+import asyncio
+import pytest
+from models.services.mssql_tag import MsSqlTag
+from services.mssql_tag_cache import MsSqlTagCache
+from tests.mock_logging import MockLogger
+
+
+class FakeTagsRepository:
+    def __init__(self, tags):
+        self.tags = tags
+        self.load_all_calls = 0
+        self.load_by_names_calls = []
+        self.fail = False
+
+    async def a_load_all(self, logger):
+        self.load_all_calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise Exception("SQL unavailable")
+        return [MsSqlTag(t.name, t.description, t.enable_cqa, t.enable_enrichment, t.id_monitoring_question)
+                for t in self.tags]
+
+    async def a_load_by_names(self, logger, tag_names):
+        self.load_by_names_calls.append(tag_names)
+        if self.fail:
+            raise Exception("SQL unavailable")
+        return [t for t in self.tags if t.name in tag_names]
+
+
+@pytest.mark.asyncio
+async def test_tags_are_served_from_cache():
+    repository = FakeTagsRepository([MsSqlTag("auu", "Assegno unico", True, False, 1)])
+    tag_cache = MsSqlTagCache(repository.a_load_all, repository.a_load_by_names)
+
+    first = await tag_cache.a_get(MockLogger(), ["AUU"])
+    second = await tag_cache.a_get(MockLogger(), ["auu"])
+
+    assert repository.load_all_calls == 1
+    assert repository.load_by_names_calls == []
+    assert first[0].description == "Assegno unico"
+    assert second[0].enable_cqa is True
+
+
+@pytest.mark.asyncio
+async def test_returned_tags_are_copies():
+    repository = FakeTagsRepository([MsSqlTag("auu", "Assegno unico", True, False, 1)])
+    tag_cache = MsSqlTagCache(repository.a_load_all, repository.a_load_by_names)
+
+    tag_info = (await tag_cache.a_get(MockLogger(), ["auu"]))[0]
+    tag_info.enable_cqa = False
+
+    assert (await tag_cache.a_get(MockLogger(), ["auu"]))[0].enable_cqa is True
+
+
+@pytest.mark.asyncio
+async def test_missing_tag_is_loaded_on_demand():
+    repository = FakeTagsRepository([MsSqlTag("auu", "Assegno unico")])
+    tag_cache = MsSqlTagCache(repository.a_load_all, repository.a_load_by_names)
+    await tag_cache.a_preload(MockLogger())
+
+    repository.tags.append(MsSqlTag("naspi", "NASpI"))
+    tags = await tag_cache.a_get(MockLogger(), ["naspi"])
+
+    assert [t.name for t in tags] == ["naspi"]
+    assert repository.load_by_names_calls == [["naspi"]]
+
+
+@pytest.mark.asyncio
+async def test_expired_cache_serves_stale_data_when_sql_fails():
+    repository = FakeTagsRepository([MsSqlTag("auu", "Assegno unico")])
+    tag_cache = MsSqlTagCache(repository.a_load_all, repository.a_load_by_names, ttl_seconds=0)
+    await tag_cache.a_preload(MockLogger())
+
+    repository.fail = True
+    tags = await tag_cache.a_get(MockLogger(), ["auu"])
+    await tag_cache._refresh_task
+
+    assert [t.name for t in tags] == ["auu"]
+    assert repository.load_all_calls == 2
+    assert (await tag_cache.a_get(MockLogger(), ["auu"]))[0].description == "Assegno unico"
+
+
+@pytest.mark.asyncio
+async def test_invalidate():
+    repository = FakeTagsRepository([MsSqlTag("auu", "Assegno unico")])
+    tag_cache = MsSqlTagCache(repository.a_load_all, repository.a_load_by_names)
+    await tag_cache.a_get(MockLogger(), ["auu"])
+
+    repository.tags[0].description = "Assegno unico universale"
+    tag_cache.invalidate(["auu"])
+    assert (await tag_cache.a_get(MockLogger(), ["auu"]))[0].description == "Assegno unico universale"
+
+    tag_cache.invalidate()
+    await tag_cache.a_get(MockLogger(), ["auu"])
+    assert repository.load_all_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_the_initial_load():
+    repository = FakeTagsRepository([MsSqlTag("auu", "Assegno unico")])
+    tag_cache = MsSqlTagCache(repository.a_load_all, repository.a_load_by_names)
+
+    results = await asyncio.gather(*(tag_cache.a_get(MockLogger(), ["auu"]) for _ in range(10)))
+
+    assert repository.load_all_calls == 1
+    assert all(result[0].name == "auu" for result in results)
+
+
+@pytest.mark.asyncio
+async def test_unknown_tag_is_cached_as_miss():
+    repository = FakeTagsRepository([MsSqlTag("auu", "Assegno unico")])
+    tag_cache = MsSqlTagCache(repository.a_load_all, repository.a_load_by_names)
+
+    assert await tag_cache.a_get(MockLogger(), ["unknown"]) == []
+    assert await tag_cache.a_get(MockLogger(), ["UNKNOWN", "auu"]) != []
+    assert repository.load_by_names_calls == [["unknown"]]
+
+    tag_cache.negative_ttl_seconds = -1
+    tag_cache.invalidate(["unknown"])
+    await tag_cache.a_get(MockLogger(), ["unknown"])
+    await tag_cache.a_get(MockLogger(), ["unknown"])
+    assert len(repository.load_by_names_calls) == 3
@@ -1,5 +1,6 @@
 import pytest
 from langchain_openai import AzureChatOpenAI
+from langchain_core.messages import AIMessageChunk
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers.pydantic import PydanticOutputParser
 from constants import llm
@@ -7,7 +8,9 @@ from models.apis.prompt_editor_response_body import PromptEditorResponseBody, Op
 from models.apis.prompt_template_response_body import TemplateResolveResponse
 from models.configurations.llm_consumer import LLMConsumer
 from models.services.llm_context_document import LlmContextContent
+from models.services.openai_rag_response import RagResponse
 from services.openai import (
+    a_generate_embeddings_from_texts,
     a_get_answer_from_context as openai_get_answer_from_context,
     a_get_answer_from_domus,
     a_get_enriched_query as openai_get_enriched_query,
@@ -15,7 +18,9 @@ from services.openai import (
     a_resolve_template,
     check_prompt_variables,
 )
+from services.token_stream import TokenStream, reset_token_stream, set_token_stream
 from tests.mock_env import set_mock_env
+from utils.settings import get_embedding_cache_settings
 from tests.mock_logging import MockLogger
 
 
@@ -257,3 +262,63 @@ def test_check_prompt_variables(mocker):
 
     # Assert
     assert len(result) == 1
+
+
+@pytest.mark.asyncio
+async def test_openai_get_answer_from_context_streaming(mocker, monkeypatch):
+    set_mock_env(monkeypatch)
+    mock_prompt_data = PromptEditorResponseBody(
+        version="1",
+        llm_model=llm.openai,
+        prompt=[],
+        parameters=[],
+        model_parameters=OpenAIModelParameters(0.0, 0.8, 2000, None),
+        id="guid",
+        label="tag",
+        validation_messages=[],
+    )
+    mocker.patch("services.openai.check_prompt_variables", return_value=[0])
+
+    async def fake_astream(self, *args, **kwargs):
+        yield AIMessageChunk(content='{"response": "Pa')
+        yield AIMessageChunk(content='ris", "references": [1]}', response_metadata={"finish_reason": "stop"})
+
+    mocker.patch.object(AzureChatOpenAI, "astream", fake_astream)
+    mock_ainvoke = mocker.patch.object(AzureChatOpenAI, "ainvoke")
+    token_stream = TokenStream()
+    reset_token = set_token_stream(token_stream)
+    try:
+        result = await openai_get_answer_from_context(
+            "What is the capital of France?",
+            "en",
+            [LlmContextContent("id", 1, 5.0)],
+            mock_prompt_data,
+            MockLogger(),
+            [],
+            LLMConsumer("test_consumer", "1234567890abcdef"),
+        )
+    finally:
+        reset_token_stream(reset_token)
+    token_stream.close()
+
+    assert result == RagResponse("Paris", [1], "stop")
+    assert [text async for text in token_stream] == ["Pa", "ris"]
+    mock_ainvoke.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_generate_embeddings_from_texts(mocker, monkeypatch):
+    set_mock_env(monkeypatch)
+    monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "false")
+    get_embedding_cache_settings.cache_clear()
+    mock_embeddings = mocker.Mock()
+    mock_embeddings.aembed_documents = mocker.AsyncMock(return_value=[[1.0], [2.0]])
+    mocker.patch("services.openai.get_azure_openai_embeddings", return_value=mock_embeddings)
+
+    try:
+        result = await a_generate_embeddings_from_texts(["uno", "due", "uno"])
+    finally:
+        get_embedding_cache_settings.cache_clear()
+
+    assert result == [[1.0], [2.0], [1.0]]
+    mock_embeddings.aembed_documents.assert_awaited_once_with(["uno", "due"])
@@ -0,0 +1,101 @@
+import pytest
+from unittest.mock import AsyncMock
+from constants import llm as llm_const
+from models.apis.rag_orchestrator_request import PromptEditorCredential
+from services.prompt_cache import PromptCache
+from tests.mock_env import set_mock_env
+from tests.mock_logging import MockLogger
+
+
+def build_body(label: str, version: str = "1") -> dict:
+    return {
+        "version": version,
+        "id": "guid",
+        "llm_model": "OPENAI",
+        "prompt": [{"role": "system", "content": "Sei un assistente"}],
+        "parameters": [],
+        "model_parameters": {"top_p": 1.0, "temperature": 0.5, "max_length": 100, "stop_sequence": None},
+        "label": label,
+        "validation_messages": [],
+    }
+
+
+def test_prompt_info_is_cached_per_tag_and_model():
+    prompt_cache = PromptCache()
+    infos = [PromptEditorCredential(type=llm_const.completion, id="1", version="v1")]
+    prompt_cache.set_prompt_info("AUU", "OPENAI", [llm_const.completion], infos)
+
+    cached = prompt_cache.get_prompt_info("auu", "OPENAI", [llm_const.completion])
+
+    assert cached[0].id == "1"
+    assert cached[0] is not infos[0]
+    assert prompt_cache.get_prompt_info("auu", "MISTRAL", [llm_const.completion]) is None
+
+
+def test_prompt_info_expires():
+    prompt_cache = PromptCache(info_ttl_seconds=-1)
+    prompt_cache.set_prompt_info("auu", "OPENAI", [llm_const.completion], [])
+
+    assert prompt_cache.get_prompt_info("auu", "OPENAI", [llm_const.completion]) is None
+
+
+def test_new_prompt_version_invalidates_bodies():
+    prompt_cache = PromptCache()
+    types = [llm_const.completion]
+    assert not prompt_cache.set_prompt_info(
+        "auu", "OPENAI", types, [PromptEditorCredential(type=types[0], id="1", version="v1")]
+    )
+    prompt_cache.set_body("1", "v1", llm_const.completion, build_body(llm_const.completion))
+    prompt_cache.set_body("2", "v1", llm_const.enrichment, build_body(llm_const.enrichment))
+
+    assert prompt_cache.set_prompt_info(
+        "auu", "OPENAI", types, [PromptEditorCredential(type=types[0], id="1", version="v2")]
+    )
+
+    assert prompt_cache.get_body("1", "v1", llm_const.completion) is None
+    assert prompt_cache.get_body("2", "v1", llm_const.enrichment) is not None
+
+
+def test_latest_body_expires_while_versioned_body_does_not():
+    prompt_cache = PromptCache(latest_body_ttl_seconds=-1, max_bodies=2)
+    prompt_cache.set_body("1", None, llm_const.completion, build_body(llm_const.completion))
+    prompt_cache.set_body("1", "v1", llm_const.completion, build_body(llm_const.completion))
+
+    assert prompt_cache.get_body("1", None, llm_const.completion) is None
+    assert prompt_cache.get_body("1", "v1", llm_const.completion) is not None
+
+
+def test_bodies_are_evicted_lru():
+    prompt_cache = PromptCache(max_bodies=2)
+    prompt_cache.set_body("1", "v1", llm_const.completion, build_body(llm_const.completion))
+    prompt_cache.set_body("2", "v1", llm_const.completion, build_body(llm_const.completion))
+    prompt_cache.get_body("1", "v1", llm_const.completion)
+    prompt_cache.set_body("3", "v1", llm_const.completion, build_body(llm_const.completion))
+
+    assert prompt_cache.get_body("2", "v1", llm_const.completion) is None
+    assert prompt_cache.get_body("1", "v1", llm_const.completion) is not None
+
+
+@pytest.mark.asyncio
+async def test_a_get_prompts_data_fetches_only_missing_prompts(mocker, monkeypatch):
+    set_mock_env(monkeypatch)
+    prompt_cache = PromptCache()
+    mocker.patch("services.prompt_editor.get_prompt_cache", return_value=prompt_cache)
+    labels = [llm_const.enrichment, llm_const.completion, llm_const.msd_intent_recognition, llm_const.msd_completion]
+    prompt_infos = [PromptEditorCredential(type=label, id=f"id-{label}", version="v1") for label in labels]
+    prompt_cache.set_body(f"id-{llm_const.enrichment}", "v1", llm_const.enrichment, build_body(llm_const.enrichment))
+    mock_api = mocker.patch(
+        "services.prompt_editor.a_get_response_from_prompts_api",
+        new_callable=AsyncMock,
+        return_value=[build_body(label) for label in labels[1:]],
+    )
+
+    from services.prompt_editor import a_get_prompts_data
+    first = await a_get_prompts_data([], prompt_infos, MockLogger(), None)
+    first[1].prompt[0].content = "risolto"
+    second = await a_get_prompts_data([], prompt_infos, MockLogger(), None)
+
+    assert mock_api.await_count == 1
+    assert [p.label for p in mock_api.await_args.args[2]] == labels[1:]
+    assert [r.label for r in second] == labels
+    assert second[1].prompt[0].content == "Sei un assistente"
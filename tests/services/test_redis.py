@@ -1,11 +1,114 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from services.redis import get_from_redis, set_to_redis, make_key, get_all_keys_by_conv_id
+from redis.asyncio import BlockingConnectionPool
+from services import redis as redis_service
+from services.redis import (
+    a_get_from_redis,
+    a_set_to_redis,
+    a_get_many_from_redis,
+    a_set_many_to_redis,
+    make_key,
+    a_get_all_keys_by_conv_id,
+    a_delete_keys_by_conv_id,
+    get_redis_client,
+)
 
 import azure.functions as func
 
 
+def build_settings(**kwargs):
+    settings = dict(
+        host="localhost", port=6379, password="", ssl=False, expiration_seconds=60,
+        max_connections=5, socket_timeout=1.0, socket_connect_timeout=1.0, health_check_interval=30,
+        pool_timeout=3.0,
+    )
+    settings.update(kwargs)
+    return MagicMock(**settings)
+
+
+class FakeRedis:
+    """Client Redis in memoria con le sole operazioni usate da services.redis."""
+
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+        self.expirations = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def mget(self, keys):
+        return [self.values.get(k) for k in keys]
+
+    async def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    async def srem(self, key, *members):
+        self.sets.get(key, set()).difference_update(members)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, key, value, ex=None):
+        self.commands.append(("set", key, value, ex))
+
+    def sadd(self, key, *members):
+        self.commands.append(("sadd", key, members))
+
+    def expire(self, key, seconds):
+        self.commands.append(("expire", key, seconds))
+
+    def exists(self, key):
+        self.commands.append(("exists", key))
+
+    def delete(self, *keys):
+        self.commands.append(("delete", keys))
+
+    async def execute(self):
+        results = []
+        c = self.client
+        for command in self.commands:
+            if command[0] == "set":
+                c.values[command[1]] = command[2]
+                c.expirations[command[1]] = command[3]
+                results.append(True)
+            elif command[0] == "sadd":
+                c.sets.setdefault(command[1], set()).update(command[2])
+                results.append(len(command[2]))
+            elif command[0] == "expire":
+                c.expirations[command[1]] = command[2]
+                results.append(True)
+            elif command[0] == "exists":
+                results.append(int(command[1] in c.values))
+            elif command[0] == "delete":
+                deleted = 0
+                for key in command[1]:
+                    deleted += int(c.values.pop(key, None) is not None or c.sets.pop(key, None) is not None)
+                results.append(deleted)
+        self.commands = []
+        return results
+
+
 @pytest.fixture
+def mock_client():
+    client = FakeRedis()
+    with patch("services.redis.get_redis_client", return_value=client), \
+         patch("services.redis.get_redis_settings", return_value=build_settings()):
+        yield client
+
+
 # Test per make_key
 def test_make_key_list():
     assert make_key("list", "ABC123") == "list_abc123"
@@ -17,46 +120,75 @@ def test_make_key_invalid_prefix():
     with pytest.raises(ValueError):
         make_key("invalid", "ABC123")
 
-# Test per get_from_redis
-@patch("services.redis.Redis")
-@patch("services.redis.RedisSettings")
-def test_get_from_redis(mock_settings, mock_redis):
-    mock_settings.return_value = MagicMock(
-        host="localhost", port=6379, password="", ssl=False
-    )
-    mock_instance = MagicMock()
-    mock_instance.get.return_value = "test_value"
-    mock_redis.return_value = mock_instance
+# Test per a_get_from_redis
+@pytest.mark.asyncio
+async def test_get_from_redis(mock_client):
+    mock_client.values["mykey"] = "test_value"
 
-    result = get_from_redis("MyKey")
+    result = await a_get_from_redis("MyKey")
     assert result == "test_value"
-    mock_instance.get.assert_called_with("mykey")
-
-# Test per set_to_redis
-@patch("services.redis.Redis")
-@patch("services.redis.RedisSettings")
-def test_set_to_redis(mock_settings, mock_redis):
-    mock_settings.return_value = MagicMock(
-        host="localhost", port=6379, password="", ssl=False, expiration_seconds=60
-    )
-    mock_instance = MagicMock()
-    mock_redis.return_value = mock_instance
-
-    set_to_redis("MyKey", "MyValue")
-    mock_instance.set.assert_called_with("mykey", "MyValue", ex=60)
-
-# Test per get_all_keys_by_conv_id
-@patch("services.redis.Redis")
-@patch("services.redis.RedisSettings")
-def test_get_all_keys_by_conv_id(mock_settings, mock_redis):
-    mock_settings.return_value = MagicMock(
-        host="localhost", port=6379, password="", ssl=False
-    )
-    mock_instance = MagicMock()
-    mock_instance.scan_iter.return_value = ["list_abc123", "dett_abc123_DET456", "other_key"]
-    mock_redis.return_value = mock_instance
-
-    result = get_all_keys_by_conv_id("abc123")
-    assert "list_abc123" in result
-    assert "dett_abc123_DET456" in result
-    assert "other_key" not in result
\ No newline at end of file
+
+# Test per a_set_to_redis
+@pytest.mark.asyncio
+async def test_set_to_redis(mock_client):
+    await a_set_to_redis("MyKey", "MyValue")
+    assert mock_client.values == {"mykey": "MyValue"}
+    assert mock_client.expirations["mykey"] == 60
+    assert mock_client.sets == {}
+
+@pytest.mark.asyncio
+async def test_set_to_redis_updates_conversation_index(mock_client):
+    await a_set_to_redis(make_key("list", "ABC123"), "[]", "ABC123")
+    assert mock_client.sets["conv_abc123"] == {"list_abc123"}
+    assert mock_client.expirations["conv_abc123"] == 60
+
+@pytest.mark.asyncio
+async def test_get_many_from_redis(mock_client):
+    mock_client.values["keya"] = "a"
+
+    result = await a_get_many_from_redis(["KeyA", "KeyB"])
+    assert result == ["a", None]
+
+@pytest.mark.asyncio
+async def test_set_many_to_redis(mock_client):
+    await a_set_many_to_redis({"KeyA": "a", "KeyB": "b"}, "conv1")
+    assert mock_client.values == {"keya": "a", "keyb": "b"}
+    assert mock_client.sets["conv_conv1"] == {"keya", "keyb"}
+
+# Test per a_get_all_keys_by_conv_id
+@pytest.mark.asyncio
+async def test_get_all_keys_by_conv_id(mock_client):
+    await a_set_to_redis(make_key("list", "abc123"), "[]", "abc123")
+    await a_set_to_redis(make_key("dett", "abc123", "DET456"), "{}", "abc123")
+    await a_set_to_redis("other_key", "x", "other")
+    # chiave scaduta ma ancora nell'indice
+    mock_client.sets["conv_abc123"].add("dett_abc123_expired")
+
+    result = await a_get_all_keys_by_conv_id("ABC123")
+    assert result == ["dett_abc123_det456", "list_abc123"]
+    assert "dett_abc123_expired" not in mock_client.sets["conv_abc123"]
+
+@pytest.mark.asyncio
+async def test_delete_keys_by_conv_id(mock_client):
+    await a_set_to_redis(make_key("list", "abc123"), "[]", "abc123")
+    await a_set_to_redis("other_key", "x", "other")
+
+    assert await a_delete_keys_by_conv_id("abc123") == 1
+    assert mock_client.values == {"other_key": "x"}
+    assert "conv_abc123" not in mock_client.sets
+    assert await a_get_all_keys_by_conv_id("abc123") == []
+
+@pytest.mark.asyncio
+async def test_client_is_shared_within_event_loop():
+    with patch("services.redis.get_redis_settings", return_value=build_settings()):
+        await redis_service.a_close_redis()
+        first = get_redis_client()
+        second = get_redis_client()
+        assert first is second
+        pool_kwargs = first.connection_pool.connection_kwargs
+        assert pool_kwargs["socket_timeout"] == 1.0
+        assert first.connection_pool.max_connections == 5
+        # Pool esaurito: si attende una connessione invece di sollevare "Too many connections"
+        assert isinstance(first.connection_pool, BlockingConnectionPool)
+        assert first.connection_pool.timeout == 3.0
+        await redis_service.a_close_redis()
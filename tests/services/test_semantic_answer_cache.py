@@ -0,0 +1,134 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from models.apis.prompt_editor_response_body import PromptEditorResponseBody
+from models.apis.rag_orchestrator_request import Interaction, RagOrchestratorRequest
+from models.apis.rag_orchestrator_response import RagOrchestratorResponse
+from models.configurations.llm_consumer import LLMConsumer
+from models.services.mssql_tag import EnumMonitorFormApplication, MsSqlTag
+from services.semantic_answer_cache import SemanticAnswerCache, SemanticCacheScope
+from tests.mock_env import set_mock_env
+from tests.mock_logging import MockLogger
+
+
+def build_scope(**kwargs):
+    values = dict(
+        tags=("auu",), environment="staging", lang="it", index="idx", llm_model_id="OPENAI", model_name="gpt",
+        consumer="app", deployment_model="gpt-4o", enrichment_enabled=True, enrichment_prompt="e:1", completion_prompt="c:1",
+    )
+    values.update(kwargs)
+    return SemanticCacheScope(**values)
+
+
+def test_similar_question_is_served_from_cache():
+    semantic_cache = SemanticAnswerCache(similarity_threshold=0.95)
+    semantic_cache.put(build_scope(), [1.0, 0.0, 0.0], RagOrchestratorResponse("risposta", "domanda", None, None))
+
+    hit = semantic_cache.get(build_scope(), [0.99, 0.05, 0.0])
+    assert hit.response.answer_text == "risposta"
+    assert hit.similarity > 0.95
+    assert semantic_cache.get(build_scope(), [0.0, 1.0, 0.0]) is None
+
+
+def test_scope_change_misses():
+    semantic_cache = SemanticAnswerCache()
+    semantic_cache.put(build_scope(), [1.0, 0.0], RagOrchestratorResponse("risposta", None, None, None))
+
+    assert semantic_cache.get(build_scope(completion_prompt="c:2"), [1.0, 0.0]) is None
+    assert semantic_cache.get(build_scope(index="idx-v2"), [1.0, 0.0]) is None
+    assert semantic_cache.get(build_scope(tags=("auu", "naspi")), [1.0, 0.0]) is None
+    assert semantic_cache.get(build_scope(consumer="other-app"), [1.0, 0.0]) is None
+    assert semantic_cache.get(build_scope(deployment_model="gpt-4o-mini"), [1.0, 0.0]) is None
+
+
+def test_entries_expire_and_are_bounded():
+    semantic_cache = SemanticAnswerCache(max_entries_per_scope=2)
+    for i in range(3):
+        vector = [0.0, 0.0, 0.0]
+        vector[i] = 1.0
+        semantic_cache.put(build_scope(), vector, RagOrchestratorResponse(str(i), None, None, None))
+    assert semantic_cache.get(build_scope(), [1.0, 0.0, 0.0]) is None
+    assert semantic_cache.get_metrics()["entries"] == 2
+
+    semantic_cache.ttl_seconds = -1
+    assert semantic_cache.get(build_scope(), [0.0, 0.0, 1.0]) is None
+
+
+def test_invalidate_by_tag():
+    semantic_cache = SemanticAnswerCache()
+    semantic_cache.put(build_scope(), [1.0], RagOrchestratorResponse("a", None, None, None))
+    semantic_cache.put(build_scope(tags=("auu", "naspi")), [1.0], RagOrchestratorResponse("b", None, None, None))
+    semantic_cache.put(build_scope(tags=("naspi",)), [1.0], RagOrchestratorResponse("c", None, None, None))
+
+    semantic_cache.invalidate(["AUU"])
+    assert semantic_cache.get(build_scope(), [1.0]) is None
+    assert semantic_cache.get(build_scope(tags=("auu", "naspi")), [1.0]) is None
+    assert semantic_cache.get(build_scope(tags=("naspi",)), [1.0]).response.answer_text == "c"
+
+
+def test_build_scope_uses_all_tags_and_consumer(monkeypatch):
+    set_mock_env(monkeypatch)
+    from logics.rag_orchestrator import build_semantic_cache_scope
+
+    def build(tags, consumer):
+        request = RagOrchestratorRequest(
+            query="q", llm_model_id="OPENAI", model_name="INPS_gpt4o", tags=tags, environment="staging"
+        )
+        tag_info = MsSqlTag("auu", "Assegno unico", False, True, EnumMonitorFormApplication.OnlyRag.value)
+        return build_semantic_cache_scope(request, tag_info, build_prompt("e"), build_prompt("c"), consumer)
+
+    consumer = LLMConsumer("app", "key", deployment_model="gpt-4o")
+    scope = build(["NASPI", "auu"], consumer)
+    assert scope.tags == ("auu", "naspi")
+    assert scope == build(["auu", "naspi"], consumer)
+    assert scope != build(["auu"], consumer)
+    assert scope != build(["auu", "naspi"], LLMConsumer("other-app", "key", deployment_model="gpt-4o"))
+
+
+def build_prompt(label):
+    return PromptEditorResponseBody(
+        id=label, label=label, version="1", llm_model="OPENAI", prompt=[], parameters=[],
+        model_parameters=None, validation_messages=[],
+    )
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_skips_pipeline_on_semantic_hit(mocker, monkeypatch):
+    set_mock_env(monkeypatch)
+    import logics.rag_orchestrator as orchestrator
+
+    mocker.patch.object(orchestrator, "get_semantic_cache_settings", return_value=SimpleNamespace(enabled=True))
+    mocker.patch.object(orchestrator, "get_semantic_answer_cache", return_value=SemanticAnswerCache())
+    mocker.patch.object(
+        orchestrator, "a_get_tags_by_tag_names",
+        side_effect=lambda logger, tags: [MsSqlTag("auu", "Assegno unico", False, True, EnumMonitorFormApplication.OnlyRag.value)],
+    )
+    mocker.patch.object(orchestrator, "a_get_prompt_info", return_value=[])
+    mocker.patch.object(
+        orchestrator, "a_get_prompts_data",
+        return_value=tuple(build_prompt(label) for label in ["enrichment", "completion", "msd_intent", "msd_completion"]),
+    )
+    mocker.patch.object(orchestrator.openai, "a_generate_embedding_from_text", new_callable=AsyncMock, return_value=[1.0, 0.0])
+    language_service = mocker.Mock()
+    language_service.a_do_query_enrichment = AsyncMock(
+        return_value=SimpleNamespace(standalone_question="cos'è l'assegno unico?", end_conversation=False)
+    )
+    language_service.a_do_query = AsyncMock(return_value=SimpleNamespace(response="L'assegno unico è...", finish_reason=""))
+    mocker.patch.object(orchestrator.AiQueryServiceFactory, "get_instance", return_value=language_service)
+    consumer = LLMConsumer("test_consumer", "1234567890abcdef")
+
+    def build_request(**kwargs):
+        return RagOrchestratorRequest(
+            query="Cos'è l'assegno unico?", llm_model_id="OPENAI", model_name="INPS_gpt4o",
+            tags=["auu"], environment="staging", **kwargs,
+        )
+
+    first = await orchestrator.a_get_query_response(build_request(), MockLogger(), None, consumer)
+    second = await orchestrator.a_get_query_response(build_request(), MockLogger(), None, consumer)
+    with_history = await orchestrator.a_get_query_response(
+        build_request(interactions=[Interaction(question="q", answer="a")]), MockLogger(), None, consumer
+    )
+
+    assert first.answer_text == second.answer_text == with_history.answer_text == "L'assegno unico è..."
+    assert language_service.a_do_query.await_count == 2
+    assert language_service.a_do_query_enrichment.await_count == 2
@@ -0,0 +1,116 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from models.apis.prompt_editor_response_body import OpenAIModelParameters, PromptEditorResponseBody, PromptMessage
+from models.apis.prompt_template_response_body import TemplateResolveResponse
+from services.openai import a_resolve_template
+from services.template_renderer import LocalTemplateRenderer, UnsupportedTemplateError
+from tests.mock_env import set_mock_env
+from tests.mock_logging import MockLogger
+
+
+def test_render_resolves_jinja_and_returns_langchain_parameters():
+    renderer = LocalTemplateRenderer()
+    message = "Rispondi in {{ lang }}.{% for d in documents %} [{{ d.ref }}]{% endfor %} Domanda: {question}"
+
+    result = renderer.render("guid", "1", message, {"lang": "italiano", "documents": [{"ref": 1}, {"ref": 2}]})
+
+    assert result.resolved_template == "Rispondi in italiano. [1] [2] Domanda: {question}"
+    assert result.parameters == ["question"]
+
+
+def test_compiled_templates_are_cached():
+    renderer = LocalTemplateRenderer(max_templates=1)
+    renderer.render("guid", "1", "{{ a }}", {"a": 1})
+    template = renderer._templates[renderer.template_key("guid", "1", "{{ a }}")]
+
+    renderer.render("guid", "1", "{{ a }}", {"a": 2})
+    assert renderer._templates[renderer.template_key("guid", "1", "{{ a }}")] is template
+
+    renderer.render("guid", "2", "{{ a }}", {"a": 1})
+    assert len(renderer._templates) == 1
+
+
+@pytest.mark.parametrize(
+    "message, context",
+    [
+        ("{{ missing }}", {}),
+        ("{{ a | unknown_filter }}", {"a": 1}),
+        ("{% if a %}", {"a": 1}),
+        ('{"response": ""}', {}),
+    ],
+)
+def test_unsupported_templates_raise(message, context):
+    with pytest.raises(UnsupportedTemplateError):
+        LocalTemplateRenderer().render("guid", "1", message, context)
+
+
+@pytest.mark.asyncio
+async def test_a_resolve_template_falls_back_to_api(mocker, monkeypatch):
+    set_mock_env(monkeypatch)
+    mocker.patch("services.openai.get_template_renderer", return_value=LocalTemplateRenderer())
+    mocker.patch(
+        "services.openai.get_prompt_settings",
+        return_value=SimpleNamespace(template_local_rendering_enabled=True, template_max_concurrency=4),
+    )
+    mock_api = mocker.patch(
+        "services.openai.a_get_prompt_from_resolve_jinja_template_api",
+        return_value=TemplateResolveResponse("risolto da API", ["chat"], []),
+    )
+    prompt_data = PromptEditorResponseBody(
+        id="guid",
+        label="completion",
+        version="1",
+        llm_model="OPENAI",
+        prompt=[PromptMessage("system", "Sei {{ role }}"), PromptMessage("user", "{{ x | custom }} {chat}")],
+        parameters=[],
+        model_parameters=OpenAIModelParameters(0.0, 0.8, 2000, None),
+        validation_messages=[],
+    )
+
+    result = await a_resolve_template(MockLogger(), prompt_data, {"role": "un assistente", "x": 1})
+
+    assert mock_api.call_count == 1
+    assert [m.content for m in result.prompt] == ["Sei un assistente", "risolto da API"]
+    assert result.parameters == ["chat"]
+
+
+@pytest.mark.asyncio
+async def test_a_resolve_template_resolves_remote_messages_concurrently(mocker, monkeypatch):
+    set_mock_env(monkeypatch)
+    mocker.patch(
+        "services.openai.get_prompt_settings",
+        return_value=SimpleNamespace(template_local_rendering_enabled=False, template_max_concurrency=2),
+    )
+    sessions = []
+    in_flight = {"now": 0, "max": 0}
+
+    async def fake_api(logger, message, template_context, session):
+        sessions.append(session)
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        return TemplateResolveResponse(message.upper(), [message], [])
+
+    mocker.patch("services.openai.a_get_prompt_from_resolve_jinja_template_api", side_effect=fake_api)
+    logger = MockLogger()
+    mocker.spy(logger, "track_event")
+    prompt_data = PromptEditorResponseBody(
+        id="guid",
+        label="completion",
+        version="1",
+        llm_model="OPENAI",
+        prompt=[PromptMessage("system", "a"), PromptMessage("user", "b"), PromptMessage("user", "c")],
+        parameters=[],
+        model_parameters=OpenAIModelParameters(0.0, 0.8, 2000, None),
+        validation_messages=[],
+    )
+
+    result = await a_resolve_template(logger, prompt_data, {})
+
+    assert [m.content for m in result.prompt] == ["A", "B", "C"]
+    assert in_flight["max"] == 2
+    assert len(set(map(id, sessions))) == 1
+    events = [c.args[1] for c in logger.track_event.call_args_list]
+    assert all(e["renderer"] == "api" and "duration_ms" in e for e in events)
@@ -0,0 +1,101 @@
+import json
+import pytest
+from langchain_core.messages import AIMessageChunk
+from services.token_stream import RagResponseStreamParser, TokenStream, a_stream_rag_answer
+
+
+def feed_all(parser: RagResponseStreamParser, chunks: list[str]) -> list[str]:
+    return [parser.feed(chunk) for chunk in chunks]
+
+
+def test_parser_emits_response_text_progressively():
+    parser = RagResponseStreamParser()
+
+    deltas = feed_all(parser, ['```json\n{"resp', 'onse": "L\'assegno ', "unico è", '...", "references": [1, 2]}\n```'])
+
+    assert deltas == ["", "L'assegno ", "unico è", "..."]
+    assert parser.completed
+
+
+def test_parser_waits_for_complete_escape_sequences():
+    output = json.dumps({"response": 'Riga "uno"\nè € 5 \U0001F600', "references": []})
+    parser = RagResponseStreamParser()
+
+    deltas = feed_all(parser, [output[i:i + 1] for i in range(len(output))])
+
+    assert "".join(deltas) == 'Riga "uno"\nè € 5 \U0001F600'
+
+
+def test_parser_ignores_text_after_response():
+    parser = RagResponseStreamParser()
+
+    assert parser.feed('{"response": "ok", "references": ["response"]}') == "ok"
+    assert parser.feed(' "response": "altro"') == ""
+
+
+class FakeChain:
+    def __init__(self, chunks: list[str]):
+        self.chunks = chunks
+
+    async def astream(self, variables):
+        for chunk in self.chunks:
+            yield AIMessageChunk(content=chunk)
+
+
+@pytest.mark.asyncio
+async def test_stream_rag_answer_forwards_text_and_returns_full_message():
+    token_stream = TokenStream()
+
+    message = await a_stream_rag_answer(FakeChain(['{"response": "Par', 'is", "references": [1]}']), {}, token_stream)
+    token_stream.close()
+
+    assert message.content == '{"response": "Paris", "references": [1]}'
+    assert [text async for text in token_stream] == ["Par", "is"]
+
+
+class FailingChain(FakeChain):
+    def __init__(self, chunks: list[str], failures: int, fail_after: int = 0):
+        super().__init__(chunks)
+        self.failures = failures
+        self.fail_after = fail_after
+        self.calls = 0
+
+    async def astream(self, variables):
+        self.calls += 1
+        for index, chunk in enumerate(self.chunks):
+            if index == self.fail_after and self.calls <= self.failures:
+                raise ConnectionError("429 Too Many Requests")
+            yield AIMessageChunk(content=chunk)
+
+
+@pytest.mark.asyncio
+async def test_stream_rag_answer_retries_before_first_delta():
+    token_stream = TokenStream()
+    # Il primo frammento non contiene ancora testo della risposta: nulla è stato inoltrato
+    chain = FailingChain(['{"response": ', '"Paris", "references": [1]}'], failures=2, fail_after=1)
+
+    message = await a_stream_rag_answer(chain, {}, token_stream, retry_wait_seconds=0)
+    token_stream.close()
+
+    assert chain.calls == 3
+    assert message.content == '{"response": "Paris", "references": [1]}'
+    assert [text async for text in token_stream] == ["Paris"]
+
+
+@pytest.mark.asyncio
+async def test_stream_rag_answer_does_not_retry_after_first_delta():
+    token_stream = TokenStream()
+    chain = FailingChain(['{"response": "Par', 'is", "references": [1]}'], failures=1, fail_after=1)
+
+    with pytest.raises(ConnectionError):
+        await a_stream_rag_answer(chain, {}, token_stream, retry_wait_seconds=0)
+    assert chain.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_rag_answer_gives_up_after_max_attempts():
+    chain = FailingChain(['{"response": "Paris"}'], failures=5)
+
+    with pytest.raises(ConnectionError):
+        await a_stream_rag_answer(chain, {}, TokenStream(), max_attempts=3, retry_wait_seconds=0)
+    assert chain.calls == 3
@@ -0,0 +1,94 @@
+import pytest
+from logics.context_packing import clear_encodings, count_tokens, get_encoding, get_token_budget, pack_context
+from models.services.openai_rag_context_content import RagContextContent
+from utils.settings import get_context_packing_settings
+
+
+class WordEncoding:
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(mocker):
+    clear_encodings()
+    mocker.patch("logics.context_packing.get_encoding", return_value=WordEncoding())
+    yield
+    clear_encodings()
+
+
+def chunk(reference: int, text: str, score: float) -> RagContextContent:
+    return RagContextContent(f"id{reference}", text, reference, f"file{reference}.pdf", score, "auu")
+
+
+def test_near_duplicates_are_dropped():
+    context = [
+        chunk(1, "L'assegno unico spetta ai nuclei familiari con figli a carico", 3.0),
+        chunk(2, "L'assegno unico spetta ai nuclei familiari con figli a carico.", 2.5),
+        chunk(3, "La domanda si presenta online sul sito INPS", 2.0),
+    ]
+
+    packed = pack_context(context, token_budget=100)
+
+    assert [c.reference for c in packed.context] == [1, 3]
+    assert packed.dropped_duplicates == 1
+
+
+def test_highest_scores_fill_the_budget():
+    context = [
+        chunk(1, "uno due tre", 1.0),
+        chunk(2, "alfa beta gamma delta epsilon", 3.0),
+        chunk(3, "rosso verde blu giallo", 2.0),
+    ]
+
+    packed = pack_context(context, token_budget=8)
+
+    # 5 token del migliore, il secondo (4) non entra, il terzo (3) sì
+    assert [c.reference for c in packed.context] == [2, 1]
+    assert packed.tokens == 8
+    assert packed.dropped_over_budget == 1
+    assert packed.to_event() == {"packed": 2, "tokens": 8, "dropped_duplicates": 0, "dropped_over_budget": 1}
+
+
+def test_best_chunk_is_kept_even_over_budget():
+    packed = pack_context([chunk(1, "a b c d e f", 1.0)], token_budget=2)
+
+    assert len(packed.context) == 1
+
+
+def test_token_budget_per_deployment(monkeypatch):
+    monkeypatch.setenv("CONTEXT_PACKING_TOKEN_BUDGET", "3000")
+    monkeypatch.setenv("CONTEXT_PACKING_DEPLOYMENT_TOKEN_BUDGETS", '{"gpt-4.1-mini": 1500}')
+    get_context_packing_settings.cache_clear()
+    try:
+        assert get_token_budget("gpt-4.1-mini") == 1500
+        assert get_token_budget("INPS_gpt4o") == 3000
+        assert get_token_budget(None) == 3000
+    finally:
+        get_context_packing_settings.cache_clear()
+
+
+def test_tokens_are_estimated_without_encoding(mocker):
+    mocker.patch("logics.context_packing.get_encoding", return_value=None)
+
+    assert count_tokens("o200k_base", "x" * 40) == 11
+
+
+def test_encoding_load_failure_is_retried(mocker):
+    mocker.patch("logics.context_packing.get_encoding", new=get_encoding)
+    clock = mocker.patch("logics.context_packing.time")
+    clock.monotonic.return_value = 100.0
+    load = mocker.patch(
+        "logics.context_packing.tiktoken.get_encoding", side_effect=[ConnectionError("offline"), WordEncoding()]
+    )
+
+    assert get_encoding("o200k_base") is None
+    assert count_tokens("o200k_base", "x" * 40) == 11
+    clock.monotonic.return_value += 30
+    assert get_encoding("o200k_base") is None
+    assert load.call_count == 1
+
+    clock.monotonic.return_value += 31
+    assert count_tokens("o200k_base", "due parole") == 2
+    assert get_encoding("o200k_base") is get_encoding("o200k_base")
+    assert load.call_count == 2
@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
+from services.aad_token import AadTokenProvider
 from utils.db_config import (
     a_get_deployment_config,
     a_get_api_key_from_vault,
@@ -46,31 +47,25 @@ class FakeDefaultAzureCredential:
         return False
 
 
+@pytest.fixture(autouse=True)
+def shared_credential(monkeypatch):
+    """Provider AAD condiviso con credenziale fake"""
+    provider = AadTokenProvider(credential_factory=FakeDefaultAzureCredential)
+    monkeypatch.setattr("utils.db_config.get_aad_token_provider", lambda: provider)
+    return provider
+
+
 # IMPORTANTE: Clear cache prima di ogni test
 @pytest.fixture(autouse=True)
-def clear_cache(mocker):
-    """Clear aiocache before each test"""
-    def passthrough_decorator(ttl=None):
-        def decorator(func):
-            return func
-        return decorator
-    
-    mocker.patch("utils.db_config.cached", passthrough_decorator)
-    
-    # Clear cache se esiste
-    try:
-        from aiocache import caches
-        caches.get('default').clear()
-    except:
-        pass
-    
+def clear_cache():
+    """Svuota le cache single-flight prima e dopo ogni test"""
+    from utils import db_config
+
+    db_config.a_get_deployment_config.cache.clear()
+    db_config.a_get_api_key_from_vault.cache.clear()
     yield
-    
-    try:
-        from aiocache import caches
-        caches.get('default').clear()
-    except:
-        pass
+    db_config.a_get_deployment_config.cache.clear()
+    db_config.a_get_api_key_from_vault.cache.clear()
 
 
 @pytest.fixture(autouse=True)
@@ -245,7 +240,6 @@ async def test_get_api_key_from_vault_success(monkeypatch):
         credential=credential, 
         secret_obj=mock_secret
     ))
-    monkeypatch.setattr("utils.db_config.DefaultAzureCredential", lambda *args, **kwargs: FakeDefaultAzureCredential(*args, **kwargs))
     
     secret_url = "https://az00040-genai1-dev-kvt.vault.azure.net/secrets/OpenAiKey-MS00987/abc"
     api_key = await a_get_api_key_from_vault(secret_url)
@@ -253,6 +247,26 @@ async def test_get_api_key_from_vault_success(monkeypatch):
     assert api_key == "api-key-xyz"
 
 
+@pytest.mark.asyncio
+async def test_get_api_key_from_vault_reuses_shared_credential(monkeypatch, shared_credential):
+    """Test credenziale condivisa tra i recuperi da Key Vault"""
+    mock_secret = MagicMock()
+    mock_secret.value = "api-key-xyz"
+    clients = []
+
+    def fake_secret_client(vault_url, credential):
+        clients.append(FakeSecretClient(vault_url=vault_url, credential=credential, secret_obj=mock_secret))
+        return clients[-1]
+
+    monkeypatch.setattr("utils.db_config.SecretClient", fake_secret_client)
+
+    await a_get_api_key_from_vault("https://az00040-genai1-dev-kvt.vault.azure.net/secrets/OpenAiKey-MS00987/abc")
+    await a_get_api_key_from_vault("https://az00040-genai1-dev-kvt.vault.azure.net/secrets/OpenAiKey-MS00988/abc")
+
+    assert len(clients) == 2
+    assert clients[0].credential is clients[1].credential is shared_credential.get_credential()
+
+
 @pytest.mark.asyncio
 async def test_get_api_key_from_vault_invalid_url():
     """Test URL secret malformato"""
@@ -273,7 +287,6 @@ async def test_get_api_key_from_vault_missing_version(monkeypatch):
         credential=credential, 
         secret_obj=mock_secret
     ))
-    monkeypatch.setattr("utils.db_config.DefaultAzureCredential", lambda *args, **kwargs: FakeDefaultAzureCredential(*args, **kwargs))
     
     # URL senza versione
     secret_url = "https://az00040-genai1-dev-kvt.vault.azure.net/secrets/OpenAiKey-MS00987"
@@ -319,7 +332,6 @@ async def test_get_complete_config_with_model_name(monkeypatch):
             credential=credential, 
             secret_obj=mock_secret
         ))
-        monkeypatch.setattr("utils.db_config.DefaultAzureCredential", lambda *args, **kwargs: FakeDefaultAzureCredential(*args, **kwargs))
         
         # Test con model_name
         config = await a_get_complete_config("MS00987", "INPS_gpt4o")
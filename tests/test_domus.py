@@ -201,7 +201,7 @@ async def test_check_msd_question_no_domus_no_protocollo(mocker, monkeypatch):
 
 # patch del metodo Redis nel test
     mock_redis = mocker.patch(
-        "services.redis.get_from_redis",
+        "services.redis.a_get_from_redis",
         return_value=json.dumps(mock_payload)   #  JSON ben formato
         )
 
@@ -0,0 +1,13 @@
+from utils.histogram import Histogram
+
+
+def test_histogram_buckets():
+    histogram = Histogram([1, 5, 10])
+    for value in [0.5, 1, 3, 10, 50]:
+        histogram.observe(value)
+
+    assert histogram.to_dict() == {
+        "count": 5,
+        "mean": 12.9,
+        "buckets": {"le_1": 2, "le_5": 1, "le_10": 1, "le_inf": 1},
+    }
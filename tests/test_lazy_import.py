@@ -0,0 +1,38 @@
+import sys
+
+import pytest
+
+from utils.lazy_import import LazyModule, get_import_timings, lazy_import
+
+
+@pytest.fixture
+def heavy_module(tmp_path, monkeypatch):
+    (tmp_path / "fake_heavy_sdk.py").write_text("LOADED = True\n\ndef convert(value):\n    return value * 2\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "fake_heavy_sdk"
+    sys.modules.pop("fake_heavy_sdk", None)
+
+
+def test_module_is_imported_on_first_attribute_access(heavy_module):
+    module = lazy_import(heavy_module)
+
+    assert isinstance(module, LazyModule)
+    assert heavy_module not in sys.modules
+
+    assert module.convert(2) == 4
+    assert heavy_module in sys.modules
+    assert heavy_module in get_import_timings()
+
+
+def test_already_imported_module_is_returned_as_is():
+    assert lazy_import("json") is sys.modules["json"]
+
+
+def test_patching_through_lazy_module_reaches_real_module(heavy_module, mocker):
+    module = lazy_import(heavy_module)
+
+    mocker.patch.object(module, "convert", return_value="patched")
+    assert sys.modules[heavy_module].convert(1) == "patched"
+
+    mocker.stopall()
+    assert module.convert(1) == 2
@@ -9,21 +9,8 @@ from types import SimpleNamespace
 # ---------------------------------------
 
 
-class FakePoolContextManager:
-    """Simula il context manager restituito da create_pool."""
-
-    def __init__(self, fake_cursor):
-        self.fake_cursor = fake_cursor
-
-    async def __aenter__(self):
-        return FakePool(self.fake_cursor)
-
-    async def __aexit__(self, exc_type, exc, tb):
-        pass
-
-
 class FakePool:
-    """Simula il pool (il quale ha il metodo acquire())."""
+    """Simula il pool condiviso restituito da get_mssql_pool (il quale ha il metodo acquire())."""
 
     def __init__(self, fake_cursor):
         self.fake_cursor = fake_cursor
@@ -135,21 +122,14 @@ class FakePromptRecord:
 
 @pytest.mark.asyncio
 async def test_a_get_tags_by_tag_names(monkeypatch):
-    # Simula le impostazioni MSSQL
-    dummy_settings = SimpleNamespace(
-        connection_string="dummy_connection_string")
-    monkeypatch.setattr("services.mssql.get_mssql_settings",
-                        lambda: dummy_settings)
-
     # Prepara dei fake record da restituire tramite fetchall()
     fake_records = [
         FakeRecord("tag1", "desc1", True, True, 1),
         FakeRecord("tag2", "desc2", True, True, 1)
     ]
     fake_cursor = FakeCursor(fetchall_return=fake_records)
-    # Sostituisce create_pool con il nostro fake (verrà usato nel context manager)
-    monkeypatch.setattr("services.mssql.create_pool", lambda dsn,
-                        minsize: FakePoolContextManager(fake_cursor))
+    # Sostituisce il pool condiviso con il nostro fake
+    monkeypatch.setattr("services.mssql.get_mssql_pool", lambda: FakePool(fake_cursor))
 
     # Creiamo un logger (qui viene usato solo per loggare)
     import logging
@@ -180,19 +160,13 @@ async def test_a_get_tags_by_tag_names(monkeypatch):
 
 @pytest.mark.asyncio
 async def test_a_get_prompt_info(monkeypatch):
-    dummy_settings = SimpleNamespace(
-        connection_string="dummy_connection_string")
-    monkeypatch.setattr("services.mssql.get_mssql_settings",
-                        lambda: dummy_settings)
-
     # Prepara dei fake record con PromptId come stringa
     fake_records = [
         FakePromptRecord("101", "v1", "typeA"),
         FakePromptRecord("102", "v2", "typeB")
     ]
     fake_cursor = FakeCursor(iter_records=fake_records)
-    monkeypatch.setattr("services.mssql.create_pool", lambda dsn,
-                        minsize: FakePoolContextManager(fake_cursor))
+    monkeypatch.setattr("services.mssql.get_mssql_pool", lambda: FakePool(fake_cursor))
 
     import logging
     logger = logging.getLogger("test_a_get_prompt_info")
@@ -221,18 +195,13 @@ async def test_a_get_prompt_info(monkeypatch):
 
 @pytest.mark.asyncio
 async def test_a_check_status_tag_for_mst(monkeypatch):
-    dummy_settings = SimpleNamespace(
-        connection_string="dummy_connection_string")
-    monkeypatch.setattr("services.mssql.get_mssql_settings",
-                        lambda: dummy_settings)
 
     class FakeRecord:
         def __init__(self, id):
             self.IdMonitoringQuestion = id
     # Simula fetchall() che restituisce una lista non vuota (ad esempio [object()])
     fake_cursor = FakeCursor(fetchall_return=[FakeRecord(1)])
-    monkeypatch.setattr("services.mssql.create_pool", lambda dsn,
-                        minsize: FakePoolContextManager(fake_cursor))
+    monkeypatch.setattr("services.mssql.get_mssql_pool", lambda: FakePool(fake_cursor))
 
     import logging
     logger = logging.getLogger("test_a_check_status_tag_for_mst_true")
@@ -0,0 +1,116 @@
+import json
+import pytest
+import azure.functions as func
+from rag_batch import a_batch_query
+from logics.rag_batch import BatchItemResult, a_run_batch, parse_batch_lines
+from models.apis.rag_orchestrator_request import RagOrchestratorRequest
+from models.apis.rag_query_response_body import RagQueryResponse
+from models.configurations.batch_query import BatchQuerySettings
+from models.configurations.llm_consumer import LLMConsumer
+from tests.mock_env import set_mock_env
+from tests.mock_logging import MockLogger, set_mock_logger_builder
+
+
+def request_line(query: str, model_name: str = "INPS_gpt4o") -> str:
+    return json.dumps({"query": query, "llm_model_id": "OPENAI", "model_name": model_name, "tags": ["auu"]})
+
+
+@pytest.fixture(autouse=True)
+def clear_rate_limiters(monkeypatch):
+    monkeypatch.setattr("logics.rag_batch._consumer_rate_limiters", {})
+
+
+@pytest.fixture
+def batch_mocks(mocker):
+    prompt_data = mocker.Mock(llm_model="OPENAI")
+    mock_prompts = mocker.patch("logics.rag_batch.a_get_completion_prompt_data", return_value=prompt_data)
+
+    async def fake_embeddings(texts, **kwargs):
+        return [[float(len(text))] for text in texts]
+
+    mock_embeddings = mocker.patch("logics.rag_batch.a_generate_embeddings_from_texts", side_effect=fake_embeddings)
+
+    async def fake_execute_query(request, prompt_data, logger, session, consumer, embedding=None, timings=None):
+        if request.query == "errore":
+            raise ValueError("boom")
+        timings["search_ms"] = 1.0
+        timings["completion_ms"] = 2.0
+        return RagQueryResponse(f"{request.query}:{embedding[0]}", [], "stop", [], False, [], [], [])
+
+    mock_execute_query = mocker.patch("logics.rag_batch.a_execute_query", side_effect=fake_execute_query)
+    return mock_prompts, mock_embeddings, mock_execute_query
+
+
+def test_parse_batch_lines():
+    items = parse_batch_lines([request_line("uno"), "", '{"query": "senza modello"}', "non json"])
+
+    assert len(items) == 3
+    assert isinstance(items[0], RagOrchestratorRequest)
+    assert items[1].status == 422
+    assert items[2].status == 422
+
+
+def test_result_json_line():
+    line = BatchItemResult(3, 200, RagQueryResponse("ok", [], "stop", [], False, [], [], []), None, {"total_ms": 1.5})
+
+    data = json.loads(line.to_json_line())
+
+    assert data["index"] == 3
+    assert data["result"]["response"] == "ok"
+    assert data["timings_ms"] == {"total_ms": 1.5}
+
+
+@pytest.mark.asyncio
+async def test_run_batch(mocker, batch_mocks):
+    mock_prompts, mock_embeddings, mock_execute_query = batch_mocks
+    items = parse_batch_lines(
+        [request_line("a"), request_line("bb"), request_line("ccc"), "non json", request_line("errore")]
+    )
+    consumer = LLMConsumer("eval", "key", "embedding-deployment")
+    mock_get_consumer = mocker.AsyncMock(return_value=consumer)
+    settings = BatchQuerySettings(max_concurrency=2, embedding_batch_size=2, requests_per_second=0)
+
+    results = [r async for r in a_run_batch(items, MockLogger(), mocker.Mock(), mock_get_consumer, settings)]
+
+    by_index = {r.index: r for r in results}
+    assert sorted(by_index) == [0, 1, 2, 3, 4]
+    assert by_index[0].result.response == "a:1.0"
+    assert by_index[2].result.response == "ccc:3.0"
+    assert by_index[3].status == 422
+    assert by_index[4].status == 422
+    assert by_index[4].problem["detail"] == "boom"
+    assert set(by_index[1].timings_ms) == {"queued_ms", "embedding_ms", "search_ms", "completion_ms", "total_ms"}
+    # Un solo consumer e un solo prompt per batch, embedding a gruppi di due domande
+    mock_get_consumer.assert_awaited_once()
+    mock_prompts.assert_awaited_once()
+    assert [call.args[0] for call in mock_embeddings.await_args_list] == [["a", "bb"], ["ccc", "errore"]]
+    assert mock_embeddings.await_args.kwargs["deployment_model"] == "embedding-deployment"
+
+
+@pytest.mark.asyncio
+async def test_run_batch_model_mismatch(mocker, batch_mocks):
+    mock_prompts, _, mock_execute_query = batch_mocks
+    mock_prompts.return_value = mocker.Mock(llm_model="MISTRALAI")
+    items = parse_batch_lines([request_line("a")])
+    mock_get_consumer = mocker.AsyncMock(return_value=LLMConsumer("eval", "key"))
+
+    results = [r async for r in a_run_batch(items, MockLogger(), mocker.Mock(), mock_get_consumer)]
+
+    assert results[0].status == 422
+    mock_execute_query.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_buffered_batch_rejects_large_batches(mocker, monkeypatch):
+    set_mock_env(monkeypatch)
+    set_mock_logger_builder(mocker)
+    mock_run_batch = mocker.patch("rag_batch.a_run_batch")
+    body = "\n".join(request_line(str(i)) for i in range(BatchQuerySettings().max_buffered_items + 1))
+    req = func.HttpRequest(method="POST", headers={}, body=body.encode("utf-8"), url="/api/query/batch")
+
+    func_call = a_batch_query.build().get_user_function()
+    response = await func_call(req, mocker.Mock())
+
+    assert response.status_code == 422
+    assert "query/batch/stream" in json.loads(response.get_body())["detail"]
+    mock_run_batch.assert_not_called()
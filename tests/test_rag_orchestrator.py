@@ -16,6 +16,7 @@ from models.apis.rag_orchestrator_request import RagConfiguration, RagOrchestrat
 from models.apis.rag_orchestrator_response import RagOrchestratorResponse
 from models.apis.rag_query_response_body import RagQueryResponse
 from models.services.cqa_response import CQAResponse
+from models.services.mssql_tag import EnumMonitorFormApplication, MsSqlTag
 from services.ai_query_service_mistralai import AiQueryServiceMistralAI
 from services.ai_query_service_openai import AiQueryServiceOpenAI
 from models.apis.rag_orchestrator_request import RagOrchestratorRequest, Interaction
@@ -28,6 +29,8 @@ from services.logging import Logger
 from tests.mock_logging import set_mock_logger_builder
 from rag_orchestrator import a_rag_orchestrator as ragOrchestrator_endpoint
 from services.cqa import a_do_query
+from services.cqa_answer_cache import get_cqa_answer_cache
+from services.mssql import get_tag_cache
 import constants.llm as llm_constants
 from utils.settings import (
     get_cqa_settings,
@@ -38,6 +41,15 @@ from utils.settings import (
 )
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    get_cqa_answer_cache().invalidate()
+    get_tag_cache().invalidate()
+    yield
+    get_cqa_answer_cache().invalidate()
+    get_tag_cache().invalidate()
+
+
 @pytest.mark.asyncio
 async def test_query_no_configuration(mocker, monkeypatch):
     # Arrange
@@ -258,21 +270,8 @@ async def test_cqa_answer_exception(mocker, monkeypatch):
 # ---------------------------------------
 
 
-class FakePoolContextManager:
-    """Simula il context manager restituito da create_pool."""
-
-    def __init__(self, fake_cursor):
-        self.fake_cursor = fake_cursor
-
-    async def __aenter__(self):
-        return FakePool(self.fake_cursor)
-
-    async def __aexit__(self, exc_type, exc, tb):
-        pass
-
-
 class FakePool:
-    """Simula il pool (il quale ha il metodo acquire())."""
+    """Simula il pool condiviso restituito da get_mssql_pool (il quale ha il metodo acquire())."""
 
     def __init__(self, fake_cursor):
         self.fake_cursor = fake_cursor
@@ -369,15 +368,12 @@ async def test_rag_orchestrator_cqa_success(mocker, monkeypatch):
     mock_cqa_do_query_result = CQAResponse(text_answer="L'assegno unico è...", cqa_data={"fake": "fake"})
     mocker.patch("logics.rag_orchestrator.cqa_do_query", return_value=mock_cqa_do_query_result)
 
-    # Simula le impostazioni MSSQL
-    dummy_settings = SimpleNamespace(connection_string="dummy_connection_string")
-    monkeypatch.setattr("services.mssql.get_mssql_settings", lambda: dummy_settings)
 
     # Prepara dei fake record da restituire tramite fetchall()
     fake_records = [FakeRecord("tag1", "desc1", True, True, 1), FakeRecord("tag2", "desc2", True, True, 1)]
     fake_cursor = FakeCursor(fetchall_return=fake_records)
-    # Sostituisce create_pool con il nostro fake (verrà usato nel context manager)
-    monkeypatch.setattr("services.mssql.create_pool", lambda dsn, minsize: FakePoolContextManager(fake_cursor))
+    # Sostituisce il pool condiviso con il nostro fake
+    monkeypatch.setattr("services.mssql.get_mssql_pool", lambda: FakePool(fake_cursor))
 
     # Importa e chiama la funzione da testare
     from services.mssql import a_get_tags_by_tag_names
@@ -410,15 +406,12 @@ async def test_rag_orchestrator_no_tags(mocker, monkeypatch):
     mock_cqa_do_query_result = CQAResponse(text_answer="L'assegno unico è...", cqa_data={"fake": "fake"})
     mocker.patch("logics.rag_orchestrator.cqa_do_query", return_value=mock_cqa_do_query_result)
 
-    # Simula le impostazioni MSSQL
-    dummy_settings = SimpleNamespace(connection_string="dummy_connection_string")
-    monkeypatch.setattr("services.mssql.get_mssql_settings", lambda: dummy_settings)
 
     # Prepara dei fake record da restituire tramite fetchall()
     fake_records = []
     fake_cursor = FakeCursor(fetchall_return=fake_records)
-    # Sostituisce create_pool con il nostro fake (verrà usato nel context manager)
-    monkeypatch.setattr("services.mssql.create_pool", lambda dsn, minsize: FakePoolContextManager(fake_cursor))
+    # Sostituisce il pool condiviso con il nostro fake
+    monkeypatch.setattr("services.mssql.get_mssql_pool", lambda: FakePool(fake_cursor))
 
     # Importa e chiama la funzione da testare
     from services.mssql import a_get_tags_by_tag_names
@@ -518,15 +511,12 @@ async def test_get_query_response_cqa_fail_then_succeed(mocker, monkeypatch):
         model_name="INPS_gpt4o",
     )
 
-    # Simula le impostazioni MSSQL
-    dummy_settings = SimpleNamespace(connection_string="dummy_connection_string")
-    monkeypatch.setattr("services.mssql.get_mssql_settings", lambda: dummy_settings)
 
     # Prepara dei fake record da restituire tramite fetchall()
     fake_records = [FakeRecord("tag1", "desc1", True, True, 1), FakeRecord("tag2", "desc2", True, True, 1)]
     fake_cursor = FakeCursor(fetchall_return=fake_records)
-    # Sostituisce create_pool con il nostro fake (verrà usato nel context manager)
-    monkeypatch.setattr("services.mssql.create_pool", lambda dsn, minsize: FakePoolContextManager(fake_cursor))
+    # Sostituisce il pool condiviso con il nostro fake
+    monkeypatch.setattr("services.mssql.get_mssql_pool", lambda: FakePool(fake_cursor))
 
     # Importa e chiama la funzione da testare
     from services.mssql import a_get_tags_by_tag_names
@@ -536,8 +526,8 @@ async def test_get_query_response_cqa_fail_then_succeed(mocker, monkeypatch):
     result = await logics.rag_orchestrator.a_get_query_response(request, logger, mock_session, mock_consumer)
 
     assert isinstance(result, RagOrchestratorResponse)
-    assert result.answer_text
-    assert result.cqa_data == None
+    assert result.answer_text == "L'assegno unico è..."
+    assert result.cqa_data == {"fake": "fake"}
     assert result.llm_data == None
     mock_language_service.a_do_query_enrichment.assert_called_once_with(
         request, mock_prompt_data[0], logger, mock_consumer
@@ -626,15 +616,12 @@ async def test_get_query_response_cqa_fail_twice_then_llm_succeed(mocker, monkey
         model_name="INPS_gpt4o",
     )
 
-    # Simula le impostazioni MSSQL
-    dummy_settings = SimpleNamespace(connection_string="dummy_connection_string")
-    monkeypatch.setattr("services.mssql.get_mssql_settings", lambda: dummy_settings)
 
     # Prepara dei fake record da restituire tramite fetchall()
     fake_records = [FakeRecord("tag1", "desc1", True, True, 1), FakeRecord("tag2", "desc2", True, True, 1)]
     fake_cursor = FakeCursor(fetchall_return=fake_records)
-    # Sostituisce create_pool con il nostro fake (verrà usato nel context manager)
-    monkeypatch.setattr("services.mssql.create_pool", lambda dsn, minsize: FakePoolContextManager(fake_cursor))
+    # Sostituisce il pool condiviso con il nostro fake
+    monkeypatch.setattr("services.mssql.get_mssql_pool", lambda: FakePool(fake_cursor))
 
     # Importa e chiama la funzione da testare
     from services.mssql import a_get_tags_by_tag_names
@@ -729,15 +716,12 @@ async def test_intent_recognition_altro(mocker, monkeypatch):
         model_name="INPS_gpt4o",
     )
 
-    # Simula le impostazioni MSSQL
-    dummy_settings = SimpleNamespace(connection_string="dummy_connection_string")
-    monkeypatch.setattr("services.mssql.get_mssql_settings", lambda: dummy_settings)
 
     # Prepara dei fake record da restituire tramite fetchall()
     fake_records = [FakeRecord("tag1", "desc1", True, True, 2), FakeRecord("tag2", "desc2", True, True, 2)]
     fake_cursor = FakeCursor(fetchall_return=fake_records)
-    # Sostituisce create_pool con il nostro fake (verrà usato nel context manager)
-    monkeypatch.setattr("services.mssql.create_pool", lambda dsn, minsize: FakePoolContextManager(fake_cursor))
+    # Sostituisce il pool condiviso con il nostro fake
+    monkeypatch.setattr("services.mssql.get_mssql_pool", lambda: FakePool(fake_cursor))
 
     # Importa e chiama la funzione da testare
     from services.mssql import a_get_tags_by_tag_names
@@ -862,15 +846,12 @@ async def test_intent_recognition_authenticated_user(mocker, monkeypatch):
         model_name="INPS_gpt4o",
     )
 
-    # Simula le impostazioni MSSQL
-    dummy_settings = SimpleNamespace(connection_string="dummy_connection_string")
-    monkeypatch.setattr("services.mssql.get_mssql_settings", lambda: dummy_settings)
 
     # Prepara dei fake record da restituire tramite fetchall()
     fake_records = [FakeRecord("tag1", "desc1", True, True, 2), FakeRecord("tag2", "desc2", True, True, 2)]
     fake_cursor = FakeCursor(fetchall_return=fake_records)
-    # Sostituisce create_pool con il nostro fake (verrà usato nel context manager)
-    monkeypatch.setattr("services.mssql.create_pool", lambda dsn, minsize: FakePoolContextManager(fake_cursor))
+    # Sostituisce il pool condiviso con il nostro fake
+    monkeypatch.setattr("services.mssql.get_mssql_pool", lambda: FakePool(fake_cursor))
 
     # Importa e chiama la funzione da testare
     from services.mssql import a_get_tags_by_tag_names
@@ -963,3 +944,53 @@ async def test_extract_chat_history_empty(monkeypatch):
     service = TestAiQueryService()
     result = service.extract_chat_history([])
     assert result == ""
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "id_monitoring_question, started",
+    [
+        (EnumMonitorFormApplication.OnlyRag.value, True),
+        (EnumMonitorFormApplication.Rag_MonitoringQuestion.value, True),
+        (EnumMonitorFormApplication.OnlyMonitoringQuestion.value, False),
+    ],
+)
+async def test_speculative_search_only_in_rag_modes(mocker, monkeypatch, id_monitoring_question, started):
+    set_mock_env(monkeypatch)
+    orchestrator = logics.rag_orchestrator
+    mocker.patch.object(
+        orchestrator, "get_speculative_search_settings", return_value=SimpleNamespace(enabled=True, similarity_threshold=0.9)
+    )
+    mocker.patch.object(
+        orchestrator,
+        "a_get_tags_by_tag_names",
+        return_value=[MsSqlTag("auu", "Assegno unico", False, True, id_monitoring_question)],
+    )
+    mocker.patch.object(orchestrator, "a_get_prompt_info", return_value=[])
+    prompt_data = PromptEditorResponseBody(
+        version="1", llm_model="OPENAI", prompt=[], parameters=[], model_parameters=None,
+        id="guid", label="tag", validation_messages=[],
+    )
+    mocker.patch.object(orchestrator, "a_get_prompts_data", return_value=(prompt_data,) * 4)
+    mock_search = mocker.patch.object(orchestrator, "a_search", new_callable=AsyncMock)
+    mocker.patch.object(
+        orchestrator, "check_msd_question", new_callable=AsyncMock,
+        return_value=RagOrchestratorResponse("msd", None, None, None),
+    )
+    mock_language_service = mocker.Mock(spec=AiQueryServiceBase)
+    mock_language_service.a_do_query_enrichment.return_value = mocker.Mock(
+        standalone_question="Cos'è l'assegno unico?", end_conversation=False
+    )
+    mock_language_service.a_do_query.return_value = RagQueryResponse(
+        "L'assegno unico è un ....", [], "stop", None, None, None, None, None
+    )
+    mocker.patch.object(orchestrator.AiQueryServiceFactory, "get_instance", return_value=mock_language_service)
+
+    request = RagOrchestratorRequest(
+        query="Aseno unco", llm_model_id="OPENAI", tags=["auu"], environment="staging", model_name="INPS_gpt4o"
+    )
+    await orchestrator.a_get_query_response(
+        request, mocker.Mock(spec=Logger), mocker.Mock(), LLMConsumer("test_consumer", "1234567890abcdef")
+    )
+
+    assert mock_search.called is started
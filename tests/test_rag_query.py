@@ -1,8 +1,10 @@
+import asyncio
 import json
 import os
 import azure.functions as func
 import pytest
 import constants
+from models.configurations.context_packing import ContextPackingSettings
 from models.configurations.llm_consumer import LLMConsumer
 from tests.mock_env import set_mock_env
 from logics.rag_query import (
@@ -10,6 +12,8 @@ from logics.rag_query import (
     build_response_for_user,
     a_execute_query,
     extract_chat_history,
+    query_similarity,
+    SpeculativeSearch,
 )
 from models.apis.prompt_editor_response_body import PromptEditorResponseBody, PromptMessage
 from models.apis.rag_query_response_body import RagQueryResponse
@@ -96,6 +100,7 @@ def test_build_question_context_from_search_ok(mocker, monkeypatch):
     mock_search_result_value.filename = "filename"
     mock_search_result_value.search_captions = [mocker.Mock(text="caption")]
     mock_search_result_value.search_rerankerScore = 2
+    mock_search_result_value.local_rerank_score = None
     mock_search_result_value.tags = ["auu"]
 
     mock_search_result = mocker.Mock()
@@ -234,6 +239,7 @@ async def test_execute_query_mistralai_ok(mocker, monkeypatch):
             filename="filename",
             search_captions=[mock_caption],
             search_rerankerScore=1,
+            local_rerank_score=None,
             tags=["auu"],
         )
     ]
@@ -287,6 +293,7 @@ async def test_execute_query_openai_ok(mocker, monkeypatch):
             filename="filename",
             search_captions=[mock_caption],
             search_rerankerScore=1,
+            local_rerank_score=None,
             tags=["auu"],
         )
     ]
@@ -311,6 +318,67 @@ async def test_execute_query_openai_ok(mocker, monkeypatch):
     assert result.finish_reason == "stop"
 
 
+@pytest.mark.asyncio
+async def test_execute_query_domus_reference_after_packing(mocker, monkeypatch):
+    # Arrange
+    set_mock_env(monkeypatch)
+    mock_prompt_data = PromptEditorResponseBody(
+        version="1",
+        llm_model=llm_const.openai,
+        prompt=[],
+        parameters=[],
+        model_parameters=None,
+        id="guid",
+        label="tag",
+        validation_messages=[],
+    )
+    mocker.patch("logics.rag_query.openai_generate_embedding_from_text", return_value=[0.1])
+
+    mock_search_result = mocker.Mock()
+    mock_search_result.value = [
+        mocker.Mock(
+            chunk_id=f"id{i}",
+            chunk_text=f"text {i}",
+            filename=f"file{i}.pdf",
+            search_rerankerScore=4 - i,
+            local_rerank_score=None,
+            tags=["auu"],
+        )
+        for i in (1, 2, 3)
+    ]
+    mocker.patch("logics.rag_query.query_azure_ai_search", return_value=mock_search_result)
+    # Il packing scarta il chunk intermedio: restano i reference 1 e 3
+    mocker.patch("logics.rag_query.get_context_packing_settings", return_value=ContextPackingSettings(enabled=True))
+    mocker.patch(
+        "logics.rag_query.pack_search_context",
+        side_effect=lambda context, *args: [c for c in context if c.reference != 2],
+    )
+
+    mock_rag_response = mocker.Mock()
+    mock_rag_response.response = "query answer"
+    mock_rag_response.finish_reason = "stop"
+    mock_rag_response.references = [3, 4]
+    mocker.patch("logics.rag_query.openai_get_answer_from_context", return_value=mock_rag_response)
+
+    request = RagOrchestratorRequest(
+        query="query", llm_model_id=llm_const.openai, tags=["auu"], environment="staging", model_name="INPS_gpt4o"
+    )
+
+    # Act
+    result = await a_execute_query(
+        request,
+        mock_prompt_data,
+        MockLogger(),
+        mocker.Mock(),
+        consumer=LLMConsumer("test_consumer", "1234567890abcdef"),
+        domusData="domus data",
+    )
+
+    # Assert
+    assert [d.reference for d in result.best_documents] == [1, 3, 4]
+    assert result.links == ["file3.pdf", ""]
+
+
 @pytest.mark.asyncio
 async def test_query_ok(mocker, monkeypatch):
     # Arrange
@@ -538,3 +606,60 @@ def test_extract_chat_history_multiple_interactions(mocker):
         + "assistant: ML stands for Machine Learning."
     )
     assert result == expected_result
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "enriched_query, reused",
+    [
+        ("Quando arriva l'assegno unico?", True),
+        ("Qual è l'importo della NASpI per i lavoratori stagionali?", False),
+    ],
+)
+async def test_execute_query_speculative_search(mocker, monkeypatch, enriched_query, reused):
+    # Arrange
+    set_mock_env(monkeypatch)
+    mock_prompt_data = PromptEditorResponseBody(
+        version="1",
+        llm_model="OPENAI",
+        prompt=[],
+        parameters=[],
+        model_parameters=None,
+        id="guid",
+        label="tag",
+        validation_messages=[],
+    )
+    speculative_result = mocker.Mock()
+    speculative_result.value = []
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(speculative_result)
+    speculative_search = SpeculativeSearch("quando arriva l'assegno unico", future, similarity_threshold=0.9)
+
+    mock_embedding = mocker.patch("logics.rag_query.openai_generate_embedding_from_text", return_value=[0.1])
+    fresh_result = mocker.Mock()
+    fresh_result.value = []
+    mock_search = mocker.patch("logics.rag_query.query_azure_ai_search", return_value=fresh_result)
+
+    request = RagOrchestratorRequest(
+        query=enriched_query, llm_model_id="llm", tags=["auu"], environment="staging", model_name="INPS_gpt4o"
+    )
+
+    # Act
+    result = await a_execute_query(
+        request,
+        mock_prompt_data,
+        MockLogger(),
+        mocker.Mock(),
+        consumer=LLMConsumer("test_consumer", "1234567890abcdef"),
+        speculative_search=speculative_search,
+    )
+
+    # Assert
+    assert result.response == llm_const.default_answer
+    assert mock_search.called is not reused
+    assert mock_embedding.called is not reused
+
+
+def test_query_similarity():
+    assert query_similarity("Quando arriva l'assegno?", "quando arriva  l'assegno") == 1.0
+    assert query_similarity("assegno unico", "naspi") < 0.5
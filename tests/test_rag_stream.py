@@ -0,0 +1,97 @@
+import asyncio
+import importlib
+import json
+import sys
+import pytest
+from logics.rag_stream import (
+    NDJSON_MEDIA_TYPE,
+    SSE_MEDIA_TYPE,
+    a_stream_events,
+    encode_event,
+    get_stream_media_type,
+)
+from services.token_stream import get_token_stream
+
+
+def test_media_type_from_accept_header():
+    assert get_stream_media_type(None) == SSE_MEDIA_TYPE
+    assert get_stream_media_type("text/event-stream") == SSE_MEDIA_TYPE
+    assert get_stream_media_type("application/x-ndjson") == NDJSON_MEDIA_TYPE
+
+
+def test_encode_event():
+    assert encode_event(SSE_MEDIA_TYPE, "result", '{"a": 1}') == b'event: result\ndata: {"a": 1}\n\n'
+    assert encode_event(NDJSON_MEDIA_TYPE, "result", '{"a": 1}') == b'{"event": "result", "data": {"a": 1}}\n'
+
+
+@pytest.mark.asyncio
+async def test_stream_events_forwards_tokens_then_result():
+    payload = json.dumps({"answer_text": "Parigi è la capitale"}, ensure_ascii=False)
+
+    async def a_run():
+        token_stream = get_token_stream()
+        token_stream.put("Parigi ")
+        await asyncio.sleep(0)
+        token_stream.put("è la capitale")
+        return payload
+
+    events = [event async for event in a_stream_events(a_run, NDJSON_MEDIA_TYPE, str)]
+
+    assert [json.loads(event) for event in events] == [
+        {"event": "delta", "data": {"text": "Parigi "}},
+        {"event": "delta", "data": {"text": "è la capitale"}},
+        {"event": "result", "data": {"answer_text": "Parigi è la capitale"}},
+    ]
+    # Payload finale identico alla risposta non in streaming
+    assert events[-1].decode("utf-8") == f'{{"event": "result", "data": {payload}}}\n'
+    assert get_token_stream() is None
+
+
+@pytest.mark.asyncio
+async def test_stream_events_reports_errors():
+    async def a_run():
+        raise ValueError("boom")
+
+    events = [
+        event
+        async for event in a_stream_events(a_run, SSE_MEDIA_TYPE, lambda e: json.dumps({"status": 422, "detail": str(e)}))
+    ]
+
+    assert events == [b'event: error\ndata: {"status": 422, "detail": "boom"}\n\n']
+
+
+@pytest.mark.asyncio
+async def test_stream_events_cancels_work_when_client_disconnects():
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def a_run():
+        get_token_stream().put("primo")
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    events = a_stream_events(a_run, SSE_MEDIA_TYPE, str)
+    await events.__anext__()
+    await started.wait()
+    await events.aclose()
+    await asyncio.sleep(0)
+
+    assert cancelled.is_set()
+
+
+def test_function_app_loads_without_streams_extension(monkeypatch):
+    # Senza l'estensione HTTP streams gli altri endpoint devono restare disponibili
+    monkeypatch.setitem(sys.modules, "azurefunctions.extensions.http.fastapi", None)
+    monkeypatch.delitem(sys.modules, "rag_stream", raising=False)
+    monkeypatch.delitem(sys.modules, "function_app", raising=False)
+
+    function_app = importlib.import_module("function_app")
+
+    function_names = {f.get_function_name() for f in function_app.app.get_functions()}
+    assert function_app.rag_stream is None
+    assert "a_rag_orchestrator" in function_names
+    assert not any(name.endswith("_stream") for name in function_names)
@@ -0,0 +1,115 @@
+import json
+import pytest
+
+# Gli endpoint in streaming richiedono l'estensione HTTP streams di Azure Functions
+pytest.importorskip("azurefunctions.extensions.http.fastapi")
+
+from starlette.requests import Request
+
+import constants.llm as llm_const
+import rag_stream
+from models.apis.prompt_editor_response_body import PromptEditorResponseBody
+from models.apis.rag_orchestrator_response import RagOrchestratorResponse
+from models.apis.rag_query_response_body import RagQueryResponse
+from models.configurations.llm_consumer import LLMConsumer
+from services.token_stream import get_token_stream
+from tests.mock_env import set_mock_env
+from tests.mock_logging import set_mock_logger_builder
+
+
+def build_request(path: str, body: dict, accept: str = rag_stream.NDJSON_MEDIA_TYPE) -> Request:
+    payload = json.dumps(body).encode("utf-8")
+
+    async def receive():
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "headers": [(b"content-type", b"application/json"), (b"accept", accept.encode("utf-8"))],
+        "query_string": b"",
+    }
+    return Request(scope, receive)
+
+
+async def a_read_events(response) -> list[dict]:
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    return [json.loads(line) for line in body.decode("utf-8").splitlines()]
+
+
+REQUEST_BODY = {
+    "query": "Cos'è l'assegno unico?",
+    "llm_model_id": llm_const.openai,
+    "tags": ["auu"],
+    "environment": "staging",
+    "model_name": "INPS_gpt4o",
+}
+
+
+@pytest.fixture
+def stream_env(mocker, monkeypatch):
+    set_mock_env(monkeypatch)
+    set_mock_logger_builder(mocker)
+    mocker.patch("rag_stream.handle_access_control", return_value=LLMConsumer("test_consumer", "1234567890abcdef"))
+    mocker.patch("rag_stream.get_http_session", return_value=mocker.Mock())
+
+
+@pytest.mark.asyncio
+async def test_rag_stream_sends_deltas_then_result(mocker, stream_env):
+    async def fake_query_response(request, logger, session, consumer):
+        get_token_stream().put("L'assegno ")
+        get_token_stream().put("unico è...")
+        return RagOrchestratorResponse(llm_const.default_answer, request.query, None, None)
+
+    mocker.patch("rag_stream.a_get_query_response", side_effect=fake_query_response)
+
+    func_call = rag_stream.a_rag_orchestrator_stream.build().get_user_function()
+    response = await func_call(build_request("/api/rag/stream", REQUEST_BODY), mocker.Mock())
+    events = await a_read_events(response)
+
+    assert response.media_type == rag_stream.NDJSON_MEDIA_TYPE
+    assert [e["data"]["text"] for e in events if e["event"] == "delta"] == ["L'assegno ", "unico è..."]
+    # Fa fede il risultato finale, anche se diverso dal testo dei delta
+    assert events[-1]["event"] == "result"
+    assert events[-1]["data"]["answer_text"] == llm_const.default_answer
+
+
+@pytest.mark.asyncio
+async def test_query_stream_sends_result(mocker, stream_env):
+    mocker.patch(
+        "rag_stream.a_get_completion_prompt_data",
+        return_value=PromptEditorResponseBody(
+            version="1", llm_model=llm_const.openai, prompt=[], parameters=[], model_parameters=None,
+            id="guid", label="tag", validation_messages=[],
+        ),
+    )
+    language_service = mocker.Mock()
+
+    async def fake_do_query(request, prompt_data, logger, session, consumer):
+        get_token_stream().put("risposta")
+        return RagQueryResponse("risposta", [1], "stop", ["file.pdf"], True, [], [], [])
+
+    language_service.a_do_query = fake_do_query
+    mocker.patch("rag_stream.AiQueryServiceFactory.get_instance", return_value=language_service)
+
+    func_call = rag_stream.a_query_stream.build().get_user_function()
+    response = await func_call(build_request("/api/query/stream", REQUEST_BODY), mocker.Mock())
+    events = await a_read_events(response)
+
+    assert events[0] == {"event": "delta", "data": {"text": "risposta"}}
+    assert events[-1]["event"] == "result"
+    assert events[-1]["data"]["links"] == ["file.pdf"]
+
+
+@pytest.mark.asyncio
+async def test_query_stream_error_event(mocker, stream_env):
+    mocker.patch("rag_stream.a_get_completion_prompt_data", side_effect=ValueError("bad prompt"))
+    mocker.patch("rag_stream.AiQueryServiceFactory.get_instance", return_value=mocker.Mock())
+
+    func_call = rag_stream.a_query_stream.build().get_user_function()
+    response = await func_call(build_request("/api/query/stream", REQUEST_BODY), mocker.Mock())
+    events = await a_read_events(response)
+
+    assert events == [{"event": "error", "data": events[0]["data"]}]
+    assert events[0]["data"]["status"] == 422
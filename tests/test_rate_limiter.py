@@ -0,0 +1,53 @@
+import pytest
+from utils.rate_limiter import AsyncRateLimiter
+
+
+@pytest.fixture
+def clock(mocker):
+    clock = mocker.patch("utils.rate_limiter.time")
+    clock.monotonic.return_value = 100.0
+    return clock
+
+
+@pytest.fixture
+def sleeps(mocker, clock):
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock.monotonic.return_value += seconds
+
+    mocker.patch("utils.rate_limiter.asyncio.sleep", side_effect=fake_sleep)
+    return sleeps
+
+
+@pytest.mark.asyncio
+async def test_waits_when_rate_is_exceeded(clock, sleeps):
+    limiter = AsyncRateLimiter(rate=2, burst=2)
+
+    for _ in range(4):
+        await limiter.a_acquire()
+
+    assert sleeps == [0.5, 0.5]
+    assert limiter.get_metrics()["waits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_tokens_refill_over_time(clock, sleeps):
+    limiter = AsyncRateLimiter(rate=1)
+    await limiter.a_acquire()
+
+    clock.monotonic.return_value += 1.0
+    await limiter.a_acquire()
+
+    assert sleeps == []
+
+
+@pytest.mark.asyncio
+async def test_no_limit(sleeps):
+    limiter = AsyncRateLimiter(rate=0)
+
+    for _ in range(10):
+        await limiter.a_acquire()
+
+    assert sleeps == []
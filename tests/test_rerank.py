@@ -0,0 +1,153 @@
+import pytest
+from pydantic import ValidationError
+import constants.event_types as event_types
+from logics.rag_query import a_search, build_question_context_from_search
+from logics.rerank import (
+    Bm25Reranker,
+    CosineReranker,
+    MmrReranker,
+    get_reranker_for_tags,
+    rerank_search_result,
+)
+from models.apis.rag_orchestrator_request import RagOrchestratorRequest
+from models.configurations.llm_consumer import LLMConsumer
+from models.services.search_index_response import SearchIndexResponse, Value
+from tests.mock_logging import MockLogger
+from utils.settings import get_rerank_settings
+
+
+def value(chunk_id: str, text: str, vector=None, score: float = 1.0) -> Value:
+    return Value(score, -1, chunk_id, text, f"{chunk_id}.pdf", ["auu"], vector)
+
+
+@pytest.fixture
+def rerank_env(monkeypatch):
+    def set_env(**env):
+        for key, item in env.items():
+            monkeypatch.setenv(f"RERANK_{key.upper()}", item)
+        get_rerank_settings.cache_clear()
+
+    yield set_env
+    get_rerank_settings.cache_clear()
+
+
+def test_bm25_prefers_chunks_with_query_terms():
+    values = [
+        value("a", "Il bonus asilo nido si richiede online"),
+        value("b", "L'assegno unico spetta ai figli a carico; l'assegno unico è mensile"),
+        value("c", "Contributi per i lavoratori domestici"),
+    ]
+
+    ranked = Bm25Reranker().rerank("quando arriva l'assegno unico", None, values)
+
+    assert [v.chunk_id for v, _ in ranked][0] == "b"
+    assert ranked[-1][1] == 0.0
+
+
+def test_cosine_orders_by_similarity():
+    values = [value("a", "", [0.0, 1.0]), value("b", "", [1.0, 0.1]), value("c", "", [0.0, 0.0])]
+
+    ranked = CosineReranker().rerank("", [1.0, 0.0], values)
+
+    assert [v.chunk_id for v, _ in ranked] == ["b", "a", "c"]
+    assert ranked[0][1] == pytest.approx(0.995, abs=1e-3)
+
+
+def test_mmr_promotes_diverse_chunks():
+    values = [value("a", "", [1.0, 0.0]), value("a-copy", "", [0.99, 0.01]), value("b", "", [0.6, 0.8])]
+
+    ranked = MmrReranker(mmr_lambda=0.3).rerank("", [1.0, 0.0], values)
+
+    assert [v.chunk_id for v, _ in ranked] == ["a", "b", "a-copy"]
+
+
+def test_reranker_per_tag(rerank_env):
+    rerank_env(default_reranker="none", tag_rerankers='{"auu": "bm25", "naspi": "mmr"}')
+
+    assert get_reranker_for_tags(["altro"]) is None
+    assert isinstance(get_reranker_for_tags(["altro", "naspi"]), MmrReranker)
+    assert isinstance(get_reranker_for_tags(["auu"]), Bm25Reranker)
+
+
+def test_unknown_reranker_fails_settings_validation(rerank_env):
+    rerank_env(tag_rerankers='{"auu": "cross-encoder"}')
+
+    with pytest.raises(ValidationError):
+        get_rerank_settings()
+
+
+def test_reranker_names_are_normalized(rerank_env):
+    rerank_env(default_reranker=" BM25 ", tag_rerankers='{"auu": ""}')
+
+    assert get_rerank_settings().default_reranker == "bm25"
+    assert get_rerank_settings().tag_rerankers == {"auu": "none"}
+
+
+def test_rerank_sets_local_scores_and_keeps_top_n():
+    search_result = SearchIndexResponse("ctx", 3, [
+        value("a", "", [0.0, 1.0], score=9.0),
+        value("b", "", [1.0, 0.0], score=1.0),
+        value("c", "", [0.7, 0.7], score=5.0),
+    ])
+
+    reranked = rerank_search_result(search_result, "", [1.0, 0.0], CosineReranker(), top_n=2)
+    context = build_question_context_from_search(reranked)
+
+    assert [c.chunk_id for c in context] == ["b", "c"]
+    assert context[0].score == pytest.approx(1.0)
+    assert all(v.chunk_text_vector is None for v in reranked.value)
+
+
+def test_vector_rerankers_need_vectors():
+    search_result = SearchIndexResponse("ctx", 1, [value("a", "testo")])
+
+    assert rerank_search_result(search_result, "testo", [1.0], MmrReranker()) is search_result
+
+
+@pytest.fixture(autouse=True)
+def environments_without_vectors(monkeypatch):
+    environments = set()
+    monkeypatch.setattr("logics.rag_query._environments_without_vectors", environments)
+    return environments
+
+
+@pytest.mark.asyncio
+async def test_search_with_local_reranker(mocker, rerank_env):
+    rerank_env(tag_rerankers='{"auu": "cosine"}')
+    search_result = SearchIndexResponse("ctx", 2, [value("a", "", [0.0, 1.0]), value("b", "", [1.0, 0.0])])
+    mock_query = mocker.patch("logics.rag_query.query_azure_ai_search", return_value=search_result)
+    logger = MockLogger()
+    track_event = mocker.spy(logger, "track_event")
+    request = RagOrchestratorRequest(query="domanda", llm_model_id="OPENAI", model_name="INPS_gpt4o", tags=["auu"])
+
+    result = await a_search(request, logger, mocker.Mock(), LLMConsumer("test", "key"), embedding=[1.0, 0.0])
+
+    assert [v.chunk_id for v in result.value] == ["b", "a"]
+    assert mock_query.await_args.kwargs == {"include_vectors": True, "semantic_ranking": False}
+    assert track_event.call_args.args[1]["reranker"] == "cosine"
+
+
+@pytest.mark.asyncio
+async def test_search_without_vectors_keeps_semantic_ranking(mocker, rerank_env, environments_without_vectors):
+    rerank_env(tag_rerankers='{"auu": "mmr"}')
+    unranked = SearchIndexResponse("ctx", 1, [value("a", "testo")])
+    ranked = SearchIndexResponse("ctx", 1, [value("a", "testo")])
+    mock_query = mocker.patch("logics.rag_query.query_azure_ai_search", side_effect=[unranked, ranked, ranked])
+    logger = MockLogger()
+    track_event = mocker.spy(logger, "track_event")
+    warning = mocker.spy(logger, "warning")
+    request = RagOrchestratorRequest(query="domanda", llm_model_id="OPENAI", model_name="INPS_gpt4o", tags=["auu"])
+
+    result = await a_search(request, logger, mocker.Mock(), LLMConsumer("test", "key"), embedding=[1.0])
+
+    # La ricerca senza semantic ranking non è stata riordinata: viene ripetuta con il semantic ranking
+    assert result is ranked
+    assert [c.kwargs for c in mock_query.await_args_list] == [{"include_vectors": True, "semantic_ranking": False}, {}]
+    assert [c.args[0] for c in track_event.call_args_list] == [event_types.local_rerank_skipped]
+    warning.assert_called_once()
+    assert environments_without_vectors == {"production"}
+
+    # Le richieste successive non tentano più il reranker vettoriale
+    assert await a_search(request, logger, mocker.Mock(), LLMConsumer("test", "key"), embedding=[1.0]) is ranked
+    assert mock_query.await_args_list[-1].kwargs == {}
+    assert mock_query.await_count == 3
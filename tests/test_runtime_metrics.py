@@ -0,0 +1,56 @@
+import json
+import pytest
+import azure.functions as func
+import constants.event_types as event_types
+from health_check import runtime_metrics as runtime_metrics_endpoint
+from logics.runtime_metrics import RuntimeMetricsReporter, collect_runtime_metrics
+from tests.mock_env import set_mock_env
+
+
+def test_collect_runtime_metrics_covers_shared_components(monkeypatch):
+    set_mock_env(monkeypatch)
+
+    metrics = collect_runtime_metrics()
+
+    assert {"mssql_pool", "http_session", "embedding_batcher", "vault_secret_cache", "batch_rate_limiters"} <= set(metrics)
+    assert "batches" in metrics["embedding_batcher"]
+
+
+def test_reporter_tracks_at_most_once_per_interval(mocker, monkeypatch):
+    set_mock_env(monkeypatch)
+    clock = mocker.patch("logics.runtime_metrics.time")
+    clock.monotonic.return_value = 100.0
+    logger = mocker.Mock()
+    reporter = RuntimeMetricsReporter(interval_seconds=60)
+
+    assert reporter.maybe_track(logger)
+    clock.monotonic.return_value = 130.0
+    assert not reporter.maybe_track(logger)
+    clock.monotonic.return_value = 161.0
+    assert reporter.maybe_track(logger)
+
+    assert logger.track_event.call_count == 2
+    name, properties = logger.track_event.call_args.args
+    assert name == event_types.runtime_metrics
+    assert json.loads(properties["embedding_batcher"])["errors"] == 0
+
+
+def test_reporter_survives_collection_errors(mocker):
+    mocker.patch("logics.runtime_metrics.collect_runtime_metrics", side_effect=RuntimeError("boom"))
+    logger = mocker.Mock()
+
+    assert not RuntimeMetricsReporter(interval_seconds=60).maybe_track(logger)
+    logger.track_event.assert_not_called()
+    logger.warning.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(mocker, monkeypatch):
+    set_mock_env(monkeypatch)
+    req = func.HttpRequest(method='GET', headers={}, body=None, url='/api/health/metrics')
+
+    func_call = runtime_metrics_endpoint.build().get_user_function()
+    response = await func_call(req, mocker.Mock())
+
+    assert response.status_code == 200
+    assert "mssql_pool" in json.loads(response.get_body())
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from utils.single_flight_cache import SingleFlightCache, single_flight_cached
+
+
+class NotFound(Exception):
+    pass
+
+
+class Loader:
+    def __init__(self, delay_seconds: float = 0):
+        self.delay_seconds = delay_seconds
+        self.calls = 0
+        self.error = None
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay_seconds)
+        if self.error:
+            raise self.error
+        return f"value-{self.calls}"
+
+
+def mock_clock(mocker):
+    clock = mocker.patch("utils.single_flight_cache.time")
+    clock.monotonic.return_value = 0
+    return clock
+
+
+async def a_run_pending_tasks():
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    cache = SingleFlightCache(ttl_seconds=60)
+    loader = Loader(delay_seconds=0.01)
+
+    values = await asyncio.gather(*(cache.a_get("key", loader) for _ in range(10)))
+
+    assert values == ["value-1"] * 10
+    assert loader.calls == 1
+    metrics = cache.get_metrics()
+    assert metrics["misses"] == 1
+    assert metrics["coalesced"] == 9
+
+
+@pytest.mark.asyncio
+async def test_value_is_refreshed_in_background_before_expiry(mocker):
+    clock = mock_clock(mocker)
+    cache = SingleFlightCache(ttl_seconds=100, refresh_ahead_seconds=10)
+    loader = Loader()
+
+    assert await cache.a_get("key", loader) == "value-1"
+
+    clock.monotonic.return_value = 95
+    # Valore ancora servito, ricaricamento in background
+    assert await cache.a_get("key", loader) == "value-1"
+    await a_run_pending_tasks()
+    assert loader.calls == 2
+    assert await cache.a_get("key", loader) == "value-2"
+    assert cache.get_metrics()["background_refreshes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_background_refresh_keeps_cached_value(mocker):
+    clock = mock_clock(mocker)
+    cache = SingleFlightCache(ttl_seconds=100, refresh_ahead_seconds=10)
+    loader = Loader()
+    await cache.a_get("key", loader)
+
+    loader.error = RuntimeError("Key Vault down")
+    clock.monotonic.return_value = 95
+    assert await cache.a_get("key", loader) == "value-1"
+    await a_run_pending_tasks()
+    assert await cache.a_get("key", loader) == "value-1"
+
+
+@pytest.mark.asyncio
+async def test_negative_cache_only_for_configured_exceptions(mocker):
+    clock = mock_clock(mocker)
+    cache = SingleFlightCache(ttl_seconds=100, negative_ttl_seconds=5, negative_exceptions=(NotFound,))
+    loader = Loader()
+
+    loader.error = NotFound("missing")
+    for _ in range(3):
+        with pytest.raises(NotFound):
+            await cache.a_get("missing", loader)
+    assert loader.calls == 1
+    assert cache.get_metrics()["negative_hits"] == 2
+
+    clock.monotonic.return_value = 6
+    loader.error = None
+    assert await cache.a_get("missing", loader) == "value-2"
+
+    loader.error = RuntimeError("transient")
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await cache.a_get("other", loader)
+    assert loader.calls == 4
+
+
+@pytest.mark.asyncio
+async def test_decorator_keys_by_arguments():
+    calls = []
+
+    @single_flight_cached(ttl=60)
+    async def a_load(source: str, model: str):
+        calls.append((source, model))
+        return f"{source}/{model}"
+
+    assert await a_load("MS1", "gpt") == "MS1/gpt"
+    assert await a_load("MS1", "gpt") == "MS1/gpt"
+    assert await a_load("MS1", "mini") == "MS1/mini"
+    assert calls == [("MS1", "gpt"), ("MS1", "mini")]
+
+    a_load.cache.clear()
+    await a_load("MS1", "gpt")
+    assert len(calls) == 3
@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from utils.stage_graph import StageGraph
+
+
+@pytest.mark.asyncio
+async def test_independent_stages_run_concurrently():
+    stages = StageGraph()
+
+    async def slow(value):
+        await asyncio.sleep(0.05)
+        return value
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    stages.add("a", lambda: slow(1))
+    stages.add("b", lambda: slow(2))
+    stages.add("c", lambda a, b: slow(a + b), depends_on=["a", "b"])
+
+    assert await stages.a_result("c") == 3
+    assert loop.time() - started < 0.14
+    assert set(stages.get_timings()["stages_ms"]) == {"a", "b", "c"}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_stages_are_reported():
+    stages = StageGraph()
+    finished = []
+
+    async def never_needed():
+        await asyncio.sleep(10)
+        finished.append(True)
+
+    stages.add("prompts", never_needed)
+    assert await stages.a_run("cqa", lambda: asyncio.sleep(0, result="risposta")) == "risposta"
+    stages.cancel("prompts")
+    await stages.a_close()
+
+    assert finished == []
+    assert stages.get_timings()["cancelled"] == ["prompts"]
+
+
+@pytest.mark.asyncio
+async def test_close_collects_unobserved_errors():
+    stages = StageGraph()
+
+    async def failing():
+        raise ValueError("sql down")
+
+    stages.add("prompt_info", failing)
+    await asyncio.sleep(0)
+    await stages.a_close()
+
+    with pytest.raises(ValueError):
+        await stages.a_result("prompt_info")
@@ -0,0 +1,87 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import azure.functions as func
+import pytest
+
+import logics.warmup as warmup
+from health_check import readiness_check
+
+
+@pytest.fixture(autouse=True)
+def reset_state(mocker):
+    warmup.get_warmup_state.cache_clear()
+    mocker.patch(
+        "logics.warmup.app_settings.get_warmup_settings",
+        return_value=SimpleNamespace(enabled=True, prefetch_deployments=True, max_deployments=10, timeout_seconds=5),
+    )
+    mocker.patch("health_check.get_warmup_settings", return_value=SimpleNamespace(enabled=True))
+    yield
+    warmup.get_warmup_state.cache_clear()
+
+
+def mock_steps(mocker, error_step: str = None, delay_seconds: float = 0):
+    async def a_step():
+        await asyncio.sleep(delay_seconds)
+        return None
+
+    steps = {}
+    for name in ["a_load_settings", "a_prefetch_deployments", "a_load_mappings", "a_open_pools", "a_load_tokenizer"]:
+        steps[name] = mocker.patch(f"logics.warmup.{name}", side_effect=a_step)
+    async def a_load_tags(logger):
+        return await a_step()
+
+    steps["a_load_tags"] = mocker.patch("logics.warmup.a_load_tags", side_effect=a_load_tags)
+    if error_step:
+        steps[error_step].side_effect = Exception("unavailable")
+    return steps
+
+
+@pytest.mark.asyncio
+async def test_warm_up_runs_once_and_reports_failed_steps(mocker):
+    steps = mock_steps(mocker, error_step="a_open_pools")
+    logger = MagicMock()
+
+    state = await warmup.a_warm_up(logger)
+    await warmup.a_warm_up(logger)
+
+    assert state.ready
+    assert steps["a_load_settings"].call_count == 1
+    assert state.steps["pools"]["status"] == "error"
+    assert state.steps["mappings"]["status"] == "ok"
+    logger.warning.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_prefetch_deployments_warms_complete_configs(mocker):
+    mocker.patch(
+        "logics.warmup.app_settings.get_access_control_settings",
+        return_value=SimpleNamespace(enable_access_control=True),
+    )
+    mocker.patch("logics.warmup.a_get_known_deployments", return_value=[("MS1", "gpt"), ("MS2", "gpt")])
+    complete_config = mocker.patch(
+        "logics.warmup.a_get_complete_config", side_effect=[{"api_key": "k"}, Exception("Key Vault down")]
+    )
+
+    result = await warmup.a_prefetch_deployments()
+
+    assert result == {"loaded": 1, "failed": 1}
+    assert complete_config.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_readiness_returns_503_until_warm_up_completes(mocker):
+    mock_steps(mocker, delay_seconds=0.01)
+    req = func.HttpRequest(method="GET", body=b"", url="/api/health/ready")
+    func_call = readiness_check.build().get_user_function()
+
+    response = await func_call(req, MagicMock())
+    assert response.status_code == 503
+    assert json.loads(response.get_body())["status"] == warmup.RUNNING
+
+    await warmup.get_warmup_state()._task
+    response = await func_call(req, MagicMock())
+    assert response.status_code == 200
+    assert json.loads(response.get_body())["status"] == warmup.READY
@@ -5,12 +5,12 @@ Sostituisce la logica basata su secretmap.json in Key Vault.
 
 import os
 import logging
-from typing import Dict, Optional
-from aiocache import cached
+from typing import Dict, List, Optional, Tuple
 import aioodbc
 import pyodbc
-from azure.identity.aio import DefaultAzureCredential
 from azure.keyvault.secrets.aio import SecretClient
+from services.aad_token import get_aad_token_provider
+from utils.single_flight_cache import single_flight_cached
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +36,9 @@ class InvalidSecretUrlError(Exception):
     pass
 
 
-@cached(ttl=3600)  # Cache 1 ora - deployment config cambiano raramente
+# Cache 1 ora - deployment config cambiano raramente; rinnovo in background negli ultimi 5 minuti.
+# Le combinazioni inesistenti restano in cache negativa per 1 minuto.
+@single_flight_cached(ttl=3600, refresh_ahead=300, negative_ttl=60, negative_exceptions=(DeploymentNotFoundError,))
 async def a_get_deployment_config(
     source_identifier: str,
     model_name: str  # ← NUOVO: deployment name obbligatorio
@@ -162,7 +164,7 @@ async def a_get_deployment_config(
         raise DatabaseConnectionError(f"Errore imprevisto: {str(e)}")
 
 
-@cached(ttl=600)  # Cache 10 minuti - API keys possono ruotare
+@single_flight_cached(ttl=600, refresh_ahead=60)  # Cache 10 minuti - API keys possono ruotare
 async def a_get_api_key_from_vault(secret_url: str) -> str:
     """
     Recupera API key da Azure Key Vault usando l'URL completo del secret.
@@ -197,20 +199,19 @@ async def a_get_api_key_from_vault(secret_url: str) -> str:
         secret_name = path_parts[1]
         secret_version = path_parts[2] if len(path_parts) > 2 else None
         
-        # Usa Managed Identity per autenticazione (async)
-        credential = DefaultAzureCredential()
-        client = SecretClient(vault_url=vault_url, credential=credential)
+        # Usa Managed Identity per autenticazione (async), con la credenziale condivisa del worker:
+        # alla chiusura del client la credenziale resta aperta
+        client = SecretClient(vault_url=vault_url, credential=get_aad_token_provider().get_credential())
         
         # Recupera il secret (async)
         async with client:
-            async with credential:
-                if secret_version:
-                    secret = await client.get_secret(secret_name, version=secret_version)
-                else:
-                    secret = await client.get_secret(secret_name)
-                
-                if not secret or not secret.value:
-                    raise SecretRetrievalError(f"Secret vuoto o non trovato: {secret_name}")
+            if secret_version:
+                secret = await client.get_secret(secret_name, version=secret_version)
+            else:
+                secret = await client.get_secret(secret_name)
+            
+            if not secret or not secret.value:
+                raise SecretRetrievalError(f"Secret vuoto o non trovato: {secret_name}")
         
         logger.info(
             f"API key recuperata da Key Vault",
@@ -237,6 +238,27 @@ async def a_get_api_key_from_vault(secret_url: str) -> str:
         raise SecretRetrievalError(f"Impossibile recuperare secret da Key Vault: {str(e)}")
 
 
+async def a_get_known_deployments(max_deployments: int) -> List[Tuple[str, str]]:
+    """
+    Elenca le coppie (source_identifier, model) presenti in dbo.secrets_mapping,
+    usate dal warm-up per precaricare le configurazioni dei consumer.
+    """
+    connection_string = os.getenv("ConnectionStrings_DatabaseSql")
+    if not connection_string:
+        raise DatabaseConnectionError("ConnectionStrings_DatabaseSql mancante nelle variabili d'ambiente")
+
+    async with aioodbc.connect(dsn=connection_string) as conn:
+        async with conn.cursor() as cursor:
+            query = """
+                SELECT TOP (?) source_identifier, model
+                FROM dbo.secrets_mapping
+                WHERE model IS NOT NULL
+            """
+            await cursor.execute(query, (max_deployments,))
+            rows = await cursor.fetchall()
+    return [(row[0], row[1]) for row in rows]
+
+
 async def a_get_complete_config(
     source_identifier: str,
     model_name: str  # ← NUOVO: parametro obbligatorio
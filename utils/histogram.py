@@ -0,0 +1,28 @@
+import bisect
+
+
+class Histogram:
+    """
+    Istogramma a bucket fissi: ogni valore viene contato nel primo bucket con limite superiore >= valore,
+    i valori oltre l'ultimo limite nel bucket "+Inf".
+    """
+
+    def __init__(self, bounds: list[float]):
+        self.bounds = sorted(bounds)
+        self._counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self._counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def to_dict(self) -> dict:
+        buckets = {f"le_{bound:g}": count for bound, count in zip(self.bounds, self._counts)}
+        buckets["le_inf"] = self._counts[-1]
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else 0.0,
+            "buckets": buckets,
+        }
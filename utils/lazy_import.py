@@ -0,0 +1,63 @@
+import importlib
+import sys
+import time
+from types import ModuleType
+
+# Durata (ms) del caricamento effettivo di ogni modulo lazy, al primo utilizzo
+_import_timings: dict[str, float] = {}
+
+
+class LazyModule(ModuleType):
+    """
+    Segnaposto di un modulo che viene importato al primo accesso a un suo attributo.
+
+    Usato per gli SDK pesanti che servono solo ad alcuni blueprint: il worker che serve /rag
+    non paga all'avvio l'import di mammoth, BeautifulSoup, Document Intelligence e così via.
+    Vale anche per i moduli usati solo nelle clausole except (es. openai_sdk.RateLimitError):
+    l'attributo viene valutato, e il modulo importato, solo quando un'eccezione arriva alla clausola.
+    Lettura, scrittura e cancellazione degli attributi sono inoltrate al modulo reale,
+    quindi mocker.patch("pacchetto.modulo.sdk.funzione") continua a funzionare.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_target"] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__["_lazy_target"]
+        if module is None:
+            started = time.perf_counter()
+            module = importlib.import_module(self.__name__)
+            _import_timings[self.__name__] = round((time.perf_counter() - started) * 1000, 3)
+            self.__dict__["_lazy_target"] = module
+        return module
+
+    def __getattr__(self, name: str):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name: str, value):
+        setattr(self._load(), name, value)
+
+    def __delattr__(self, name: str):
+        delattr(self._load(), name)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_lazy_target"] is not None else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Restituisce il modulo se è già stato importato, altrimenti un LazyModule.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
+
+
+def get_import_timings() -> dict[str, float]:
+    return dict(_import_timings)
@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+
+class AsyncRateLimiter:
+    """
+    Token bucket asincrono: al massimo rate acquisizioni al secondo, con raffiche fino a burst.
+    Con rate <= 0 non limita.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waits = 0
+
+    async def a_acquire(self):
+        if self.rate <= 0:
+            return
+        # Il lock serializza l'attesa: i chiamanti vengono serviti in ordine di arrivo
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens < 1:
+                self.waits += 1
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._tokens = 1.0
+                self._updated_at = time.monotonic()
+            self._tokens -= 1
+
+    def get_metrics(self) -> dict:
+        return {"rate": self.rate, "burst": self.burst, "waits": self.waits}
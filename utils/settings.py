@@ -1,13 +1,28 @@
 from functools import lru_cache
+from models.configurations.aad_token import AadTokenSettings
+from models.configurations.batch_query import BatchQuerySettings
+from models.configurations.context_packing import ContextPackingSettings
 from models.configurations.cqa import CQASettings
+from models.configurations.cqa_cache import CqaCacheSettings
 from models.configurations.document_intelligence import DocumentIntelligenceSettings
+from models.configurations.embedding_batch import EmbeddingBatchSettings
+from models.configurations.embedding_cache import EmbeddingCacheSettings
+from models.configurations.http_session import HttpSessionSettings
+from models.configurations.mapping_cache import MappingCacheSettings
 from models.configurations.mistralai import MistralAISettings
 from models.configurations.mssql import MsSqlSettings
 from models.configurations.openai import OpenAISettings
 from models.configurations.prompt import PromptSettings
+from models.configurations.prompt_cache import PromptCacheSettings
 from models.configurations.redis import RedisSettings
+from models.configurations.rerank import RerankSettings
+from models.configurations.runtime_metrics import RuntimeMetricsSettings
 from models.configurations.search import SearchSettings
+from models.configurations.semantic_cache import SemanticCacheSettings
+from models.configurations.speculative_search import SpeculativeSearchSettings
 from models.configurations.storage import BlobStorageSettings
+from models.configurations.tag_cache import TagCacheSettings
+from models.configurations.warmup import WarmupSettings
 from models.configurations.access_control import AccessControlSettings
 
 @lru_cache
@@ -49,3 +64,63 @@ def get_redis_settings():
 @lru_cache
 def get_access_control_settings() -> AccessControlSettings:
     return AccessControlSettings()
+
+@lru_cache
+def get_tag_cache_settings() -> TagCacheSettings:
+    return TagCacheSettings()
+
+@lru_cache
+def get_prompt_cache_settings() -> PromptCacheSettings:
+    return PromptCacheSettings()
+
+@lru_cache
+def get_embedding_cache_settings() -> EmbeddingCacheSettings:
+    return EmbeddingCacheSettings()
+
+@lru_cache
+def get_semantic_cache_settings() -> SemanticCacheSettings:
+    return SemanticCacheSettings()
+
+@lru_cache
+def get_speculative_search_settings() -> SpeculativeSearchSettings:
+    return SpeculativeSearchSettings()
+
+@lru_cache
+def get_http_session_settings() -> HttpSessionSettings:
+    return HttpSessionSettings()
+
+@lru_cache
+def get_aad_token_settings() -> AadTokenSettings:
+    return AadTokenSettings()
+
+@lru_cache
+def get_warmup_settings() -> WarmupSettings:
+    return WarmupSettings()
+
+@lru_cache
+def get_mapping_cache_settings() -> MappingCacheSettings:
+    return MappingCacheSettings()
+
+@lru_cache
+def get_cqa_cache_settings() -> CqaCacheSettings:
+    return CqaCacheSettings()
+
+@lru_cache
+def get_batch_query_settings() -> BatchQuerySettings:
+    return BatchQuerySettings()
+
+@lru_cache
+def get_embedding_batch_settings() -> EmbeddingBatchSettings:
+    return EmbeddingBatchSettings()
+
+@lru_cache
+def get_context_packing_settings() -> ContextPackingSettings:
+    return ContextPackingSettings()
+
+@lru_cache
+def get_rerank_settings() -> RerankSettings:
+    return RerankSettings()
+
+@lru_cache
+def get_runtime_metrics_settings() -> RuntimeMetricsSettings:
+    return RuntimeMetricsSettings()
@@ -0,0 +1,150 @@
+import asyncio
+import functools
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    error: Optional[BaseException]
+    expires_at: float
+    refresh_at: float
+
+
+class SingleFlightCache:
+    """
+    Cache in memoria per caricamenti asincroni costosi (SQL, Key Vault).
+
+    - single-flight: per ogni chiave c'è al più un caricamento in corso, le richieste concorrenti lo attendono;
+    - stale-while-revalidate: a refresh_ahead_seconds dalla scadenza il valore viene ancora servito
+      mentre un task in background lo ricarica; se il ricaricamento fallisce resta valido fino al TTL;
+    - cache negativa: le eccezioni in negative_exceptions vengono memorizzate per negative_ttl_seconds
+      e risollevate senza rifare il caricamento. Le altre eccezioni non vengono memorizzate.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        refresh_ahead_seconds: float = 0,
+        negative_ttl_seconds: float = 0,
+        negative_exceptions: tuple[type[BaseException], ...] = (),
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.refresh_ahead_seconds = refresh_ahead_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.negative_exceptions = negative_exceptions
+        self._entries: dict[Hashable, _Entry] = {}
+        self._loading: dict[Hashable, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.negative_hits = 0
+        self.background_refreshes = 0
+
+    def _check_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # I task in corso appartengono al loop precedente
+            self._loading = {}
+            self._loop = loop
+
+    async def _a_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+        except self.negative_exceptions as ex:
+            if self.negative_ttl_seconds > 0:
+                now = time.monotonic()
+                expires_at = now + self.negative_ttl_seconds
+                self._entries[key] = _Entry(None, ex, expires_at, expires_at)
+            raise
+        finally:
+            self._loading.pop(key, None)
+        now = time.monotonic()
+        self._entries[key] = _Entry(
+            value, None, now + self.ttl_seconds, now + max(self.ttl_seconds - self.refresh_ahead_seconds, 0)
+        )
+        return value
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._loading[key] = asyncio.create_task(self._a_load(key, loader))
+        return task
+
+    @staticmethod
+    def _log_refresh_error(key: Hashable) -> Callable[[asyncio.Task], None]:
+        def callback(task: asyncio.Task):
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning(f"Background refresh failed for {key}, serving cached value: {task.exception()}")
+
+        return callback
+
+    async def a_get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        self._check_loop()
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > now:
+            if entry.error is not None:
+                self.negative_hits += 1
+                raise entry.error
+            self.hits += 1
+            if entry.refresh_at <= now and key not in self._loading:
+                self.background_refreshes += 1
+                self._start_load(key, loader).add_done_callback(self._log_refresh_error(key))
+            return entry.value
+
+        task = self._loading.get(key)
+        if task is None:
+            self.misses += 1
+            task = self._start_load(key, loader)
+        else:
+            self.coalesced += 1
+        # shield: la cancellazione di un chiamante non interrompe il caricamento atteso dagli altri
+        return await asyncio.shield(task)
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries = {}
+        self._loading = {}
+
+    def get_metrics(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "loading": len(self._loading),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "negative_hits": self.negative_hits,
+            "background_refreshes": self.background_refreshes,
+        }
+
+
+def single_flight_cached(
+    ttl: float,
+    refresh_ahead: float = 0,
+    negative_ttl: float = 0,
+    negative_exceptions: tuple[type[BaseException], ...] = (),
+):
+    """
+    Decoratore per funzioni asincrone con argomenti hashable: la chiave è data dagli argomenti.
+    La cache è esposta come attributo .cache della funzione decorata.
+    """
+
+    def decorator(fn: Callable[..., Awaitable[Any]]):
+        cache = SingleFlightCache(ttl, refresh_ahead, negative_ttl, negative_exceptions)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            return await cache.a_get(key, lambda: fn(*args, **kwargs))
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
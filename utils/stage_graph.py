@@ -0,0 +1,63 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Iterable
+
+
+class StageGraph:
+    """
+    Esegue le fasi di una richiesta come task asyncio, rispettando le dipendenze dichiarate.
+
+    Una fase parte appena sono disponibili i risultati delle fasi da cui dipende,
+    che le vengono passati come argomenti nell'ordine di depends_on.
+    Le fasi non più necessarie si possono cancellare; a_close cancella quelle ancora
+    in corso e raccoglie gli errori delle fasi di cui nessuno ha atteso il risultato.
+    La durata di ogni fase (in ms) esclude l'attesa delle dipendenze.
+    """
+
+    def __init__(self):
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._timings: dict[str, float] = {}
+        self._cancelled: list[str] = []
+
+    def add(self, name: str, fn: Callable[..., Awaitable[Any]], depends_on: Iterable[str] = ()) -> asyncio.Task:
+        dependencies = [self._tasks[d] for d in depends_on]
+
+        async def a_run_stage():
+            args = [await dependency for dependency in dependencies]
+            started = time.perf_counter()
+            try:
+                return await fn(*args)
+            finally:
+                self._timings[name] = round((time.perf_counter() - started) * 1000, 3)
+
+        self._tasks[name] = asyncio.create_task(a_run_stage(), name=name)
+        return self._tasks[name]
+
+    async def a_result(self, name: str) -> Any:
+        return await self._tasks[name]
+
+    async def a_run(self, name: str, fn: Callable[..., Awaitable[Any]], depends_on: Iterable[str] = ()) -> Any:
+        """
+        Aggiunge la fase e ne attende subito il risultato.
+        """
+        self.add(name, fn, depends_on)
+        return await self.a_result(name)
+
+    def cancel(self, *names: str):
+        for name in names:
+            task = self._tasks.get(name)
+            if task is not None and not task.done() and name not in self._cancelled:
+                task.cancel()
+                self._cancelled.append(name)
+
+    async def a_close(self):
+        pending = [name for name, task in self._tasks.items() if not task.done()]
+        self.cancel(*pending)
+        # Attende le fasi cancellate e recupera le eccezioni non osservate
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def get_timings(self) -> dict:
+        return {
+            "stages_ms": dict(self._timings),
+            "cancelled": list(self._cancelled),
+        }
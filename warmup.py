@@ -0,0 +1,14 @@
+import azure.functions as func
+from logics.warmup import a_warm_up
+from services.logging import LoggerBuilder
+
+bp = func.Blueprint()
+
+
+@bp.warm_up_trigger("warmup")
+async def warmup(warmup, context: func.Context) -> None:
+    """
+    Invocato dalla piattaforma su ogni nuova istanza prima di instradarvi traffico (piani Premium/Dedicated).
+    """
+    with LoggerBuilder(__name__, context) as logger:
+        await a_warm_up(logger)